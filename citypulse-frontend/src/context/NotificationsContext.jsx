@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import React, { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 import { jwtDecode } from 'jwt-decode';
 
 import { useAuth } from './AuthContext';
@@ -6,6 +6,9 @@ import { notificationsAPI } from '../utils/api';
 
 const NotificationsContext = createContext();
 
+// Read-acks are collected for this long and sent as one socket frame
+const ACK_BATCH_MS = 300;
+
 export const useNotifications = () => {
   const context = useContext(NotificationsContext);
   if (!context) {
@@ -20,6 +23,16 @@ export const NotificationsProvider = ({ children }) => {
   const [unreadCount, setUnreadCount] = useState(0);
   const [socket, setSocket] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  // Newest notification id received, so a reconnect replays only what was missed
+  const lastSeenId = useRef(null);
+  const pendingAcks = useRef(new Set());
+  const ackTimer = useRef(null);
+
+  const rememberSeen = (items) => {
+    items.forEach(({ id }) => {
+      if (lastSeenId.current === null || id > lastSeenId.current) lastSeenId.current = id;
+    });
+  };
 
   const isTokenExpired = (token) => {
     try {
@@ -38,6 +51,7 @@ export const NotificationsProvider = ({ children }) => {
       const response = await notificationsAPI.getUnread();
       setNotifications(response.data);
       setUnreadCount(response.data.length);
+      rememberSeen(response.data);
     } catch (error) {
       console.error('Error fetching notifications:', error);
     } finally {
@@ -64,7 +78,8 @@ export const NotificationsProvider = ({ children }) => {
           ? 'citypulse.aicraftalchemy.com'
           : window.location.host;
 
-      const wsUrl = `${protocol}//${baseHost}/backend/ws/notifications/?token=${validToken}`;
+      const resume = lastSeenId.current === null ? '' : `&last_seen_id=${lastSeenId.current}`;
+      const wsUrl = `${protocol}//${baseHost}/backend/ws/notifications/?token=${validToken}${resume}`;
 
       ws = new WebSocket(wsUrl);
 
@@ -76,15 +91,33 @@ export const NotificationsProvider = ({ children }) => {
       ws.onmessage = (event) => {
         const data = JSON.parse(event.data);
         console.log('📬 Message received:', data);
-        const newNotification = data;
 
-        console.log('📩 New notification received:', data);
-        setNotifications(prev => [data, ...prev]);
-        setUnreadCount(prev => prev + 1);
+        if (data.type === 'error') {
+          console.error('🚨 WebSocket protocol error:', data.error);
+          return;
+        }
+        if (data.type === 'acked') return;
+
+        // The server pushes the authoritative badge count on connect and on every change
+        if (data.unread_count !== null && data.unread_count !== undefined) {
+          setUnreadCount(data.unread_count);
+        }
+        if (data.type !== 'notifications' || data.notifications.length === 0) return;
+
+        // One frame per burst (or per reconnect replay), oldest first
+        const incoming = data.notifications;
+        console.log('📩 New notifications received:', incoming);
+        rememberSeen(incoming);
+        setNotifications(prev => {
+          const known = new Set(prev.map(n => n.id));
+          return [...incoming.filter(n => !known.has(n.id)).reverse(), ...prev];
+        });
+        // The server dropped some for a slow connection, or the replay was capped
+        if (data.more || data.dropped) fetchUnreadNotifications();
 
         if ('Notification' in window && Notification.permission === 'granted') {
           new Notification('CityPulse Notification', {
-            body: newNotification.message,
+            body: incoming.length === 1 ? incoming[0].message : `${incoming.length} new notifications`,
           });
         } else if ('Notification' in window && Notification.permission !== 'denied') {
           Notification.requestPermission();
@@ -93,6 +126,7 @@ export const NotificationsProvider = ({ children }) => {
 
       ws.onclose = () => {
         console.log('🔌 WebSocket closed. Reconnecting...');
+        setSocket(null);
         setTimeout(connectWebSocket, 3000);
       };
 
@@ -110,7 +144,7 @@ export const NotificationsProvider = ({ children }) => {
         ws.close();
       }
     };
-  }, [isAuthenticated, user, token, refreshAccessToken]);
+  }, [isAuthenticated, user, token, refreshAccessToken, fetchUnreadNotifications]);
 
   useEffect(() => {
     if (isAuthenticated) {
@@ -121,9 +155,30 @@ export const NotificationsProvider = ({ children }) => {
     }
   }, [isAuthenticated, fetchUnreadNotifications]);
 
+  const isOpen = (ws) => ws && ws.readyState === WebSocket.OPEN;
+
+  const flushAcks = () => {
+    ackTimer.current = null;
+    const ids = [...pendingAcks.current];
+    pendingAcks.current.clear();
+    if (ids.length === 0) return;
+    if (isOpen(socket)) {
+      socket.send(JSON.stringify({ type: 'ack', ids }));
+    } else {
+      ids.forEach(id => notificationsAPI.markAsRead(id).catch(error => {
+        console.error('Error marking notification as read:', error);
+      }));
+    }
+  };
+
   const markAsRead = async (notificationId) => {
     try {
-      await notificationsAPI.markAsRead(notificationId);
+      if (isOpen(socket)) {
+        pendingAcks.current.add(notificationId);
+        if (!ackTimer.current) ackTimer.current = setTimeout(flushAcks, ACK_BATCH_MS);
+      } else {
+        await notificationsAPI.markAsRead(notificationId);
+      }
       setNotifications(prev =>
         prev.map(notification =>
           notification.id === notificationId
@@ -141,7 +196,11 @@ export const NotificationsProvider = ({ children }) => {
 
   const markAllAsRead = async () => {
     try {
-      await notificationsAPI.markAllAsRead();
+      if (isOpen(socket)) {
+        socket.send(JSON.stringify({ type: 'ack', all: true }));
+      } else {
+        await notificationsAPI.markAllAsRead();
+      }
       setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
       setUnreadCount(0);
       return true;
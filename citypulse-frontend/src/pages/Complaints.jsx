@@ -73,7 +73,7 @@ const Complaints = () => {
 
   const fetchComplaints = async () => {
     try {
-      const response = await complaintsAPI.getAll();
+      const response = await complaintsAPI.getAllPages();
       setComplaints(response.data);
     } catch (error) {
       console.error('Error fetching complaints:', error);
@@ -403,11 +403,11 @@ const Complaints = () => {
               </div>
             </div>
 
-            {selectedComplaint.image && (
+            {selectedComplaint.image_url && (
               <div className="detail-section">
                 <h4 className="detail-section-title">Image</h4>
                 <img
-                  src={selectedComplaint.image}
+                  src={selectedComplaint.image_url}
                   alt="Complaint"
                   className="detail-image"
                 />
@@ -10,7 +10,7 @@ import {
   MapPin,
   Calendar
 } from 'lucide-react';
-import { complaintsAPI, usersAPI, workersAPI } from '../utils/api';
+import { analyticsAPI, complaintsAPI, usersAPI, workersAPI } from '../utils/api';
 import LoadingSpinner from '../components/UI/LoadingSpinner';
 import StatusBadge from '../components/UI/StatusBadge';
 import './dashboard.css';
@@ -34,20 +34,27 @@ const Dashboard = () => {
 
   const fetchDashboardData = async () => {
     try {
-      const [complaintsRes, usersRes, workersRes] = await Promise.all([
+      // The summary is admin-only; other roles get a 403 for it and the
+      // dashboard falls back to counting every page of the complaint list
+      const [summaryRes, complaintsRes, usersRes, workersRes] = await Promise.allSettled([
+        analyticsAPI.getSummary(),
         complaintsAPI.getAll(),
         usersAPI.getAll(),
         workersAPI.getAll(),
       ]);
+      const dataOf = (result) => (result.status === 'fulfilled' ? result.value.data : null);
 
-      const complaints = complaintsRes.data;
-      const users = usersRes.data;
-      const workers = workersRes.data;
+      const summary = dataOf(summaryRes);
+      const complaints = dataOf(complaintsRes) || [];
+      const users = dataOf(usersRes) || [];
+      const workers = dataOf(workersRes) || [];
+      const allComplaints = summary ? complaints : (await complaintsAPI.getAllPages()).data;
+      const countStatus = (status) => allComplaints.filter(complaint => complaint.status === status).length;
 
       setStats({
-        totalComplaints: complaints.length,
-        pendingComplaints: complaints.filter(c => c.status === 'pending').length,
-        resolvedComplaints: complaints.filter(c => c.status === 'resolved').length,
+        totalComplaints: summary ? summary.total : allComplaints.length,
+        pendingComplaints: summary ? summary.by_status.pending || 0 : countStatus('pending'),
+        resolvedComplaints: summary ? summary.by_status.resolved || 0 : countStatus('resolved'),
         totalUsers: users.length,
         totalWorkers: workers.length,
       });
@@ -271,11 +271,11 @@ useEffect(() => {
               </div>
             </div>
             
-            {complaintDetails.image && (
+            {complaintDetails.image_url && (
               <div className="detail-section">
                 <h4 className="detail-section-title">Image</h4>
                 <img
-                  src={complaintDetails.image}
+                  src={complaintDetails.image_url}
                   alt="Complaint"
                   className="detail-image"
                 />
@@ -58,14 +58,14 @@ const Users = () => {
 
     if (searchTerm) {
       filtered = filtered.filter(user =>
-        user.user.username.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        user.user.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        `${user.user.first_name} ${user.user.last_name}`.toLowerCase().includes(searchTerm.toLowerCase())
+        user.username.toLowerCase().includes(searchTerm.toLowerCase()) ||
+        user.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
+        `${user.first_name} ${user.last_name}`.toLowerCase().includes(searchTerm.toLowerCase())
       );
     }
 
     if (selectedRole !== 'all') {
-      filtered = filtered.filter(user => user.profile?.role === selectedRole);
+      filtered = filtered.filter(user => user.role === selectedRole);
     }
 
     setFilteredUsers(filtered);
@@ -190,45 +190,45 @@ const Users = () => {
       {filteredUsers.length > 0 ? (
         <div className="users-grid">
           {filteredUsers.map((userData) => (
-            <div key={userData.user.id} className="user-card">
+            <div key={userData.id} className="user-card">
               <div className="user-card-header">
                 <div className="user-info">
                   <div className="user-avatar">
                     <span className="avatar-text">
-                      {userData.user.first_name?.[0] || userData.user.username[0].toUpperCase()}
+                      {userData.first_name?.[0] || userData.username[0].toUpperCase()}
                     </span>
                   </div>
                   <div>
                     <h3 className="user-name">
-                      {userData.user.first_name && userData.user.last_name
-                        ? `${userData.user.first_name} ${userData.user.last_name}`
-                        : userData.user.username}
+                      {userData.first_name && userData.last_name
+                        ? `${userData.first_name} ${userData.last_name}`
+                        : userData.username}
                     </h3>
-                    <p className="user-email">{userData.user.email}</p>
+                    <p className="user-email">{userData.email}</p>
                   </div>
                 </div>
-                {userData.profile && (
+                {userData.role && (
                   <div className="user-role">
-                    {getRoleIcon(userData.profile.role)}
-                    <span className={`badge ${getRoleBadge(userData.profile.role)}`}>
-                      {userData.profile.role}
+                    {getRoleIcon(userData.role)}
+                    <span className={`badge ${getRoleBadge(userData.role)}`}>
+                      {userData.role}
                     </span>
                   </div>
                 )}
               </div>
 
-              {userData.profile && (
+              {userData.role && (
                 <div className="user-details">
-                  {userData.profile.phone && (
+                  {userData.phone && (
                     <div className="detail-row">
                       <span className="detail-label">Phone:</span>
-                      <span className="detail-value">{userData.profile.phone}</span>
+                      <span className="detail-value">{userData.phone}</span>
                     </div>
                   )}
-                  {userData.profile.address && (
+                  {userData.address && (
                     <div className="address-row">
                       <span className="detail-label">Address:</span>
-                      <span className="address-value">{userData.profile.address}</span>
+                      <span className="address-value">{userData.address}</span>
                     </div>
                   )}
                 </div>
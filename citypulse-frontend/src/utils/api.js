@@ -63,6 +63,31 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints are cursor-paginated ({ next, results }); unwrap the first page
+const unwrapPage = (request) =>
+  request.then((response) => ({ ...response, data: response.data.results, next: response.data.next }));
+
+// Largest page the API serves (KeysetPagination.max_page_size)
+const MAX_PAGE_SIZE = 200;
+
+// Follow `next` until the last page, for views that need the whole list
+// (totals, pickers). Only the cursor is taken from `next`, so requests keep
+// going through API_BASE_URL.
+const unwrapAllPages = async (url, params = {}) => {
+  let response = await api.get(url, { params: { page_size: MAX_PAGE_SIZE, ...params } });
+  const results = [...response.data.results];
+  while (response.data.next) {
+    const cursor = new URL(response.data.next).searchParams.get('cursor');
+    response = await api.get(url, { params: { page_size: MAX_PAGE_SIZE, ...params, cursor } });
+    results.push(...response.data.results);
+  }
+  return { ...response, data: results, next: null };
+};
+
+// Delta sync: pass '0' first, then the `since` from the last response.
+// Resolves to { results, deleted, since, next }; a 410 means start over from '0'.
+const sync = (url) => (since, params = {}) => api.get(url, { params: { ...params, since } });
+
 // Auth API
 export const authAPI = {
   login: (credentials) => api.post('/api/token/', credentials),
@@ -72,8 +97,13 @@ export const authAPI = {
 
 // Complaints API
 export const complaintsAPI = {
-  getAll: () => api.get('/complaints/'),
-  getUserComplaints: () => api.get('/complaints/user/'),
+  getAll: (filters) => unwrapPage(api.get('/complaints/', { params: filters })),
+  getAllPages: (filters) => unwrapAllPages('/complaints/', filters),
+  getUserComplaints: () => unwrapPage(api.get('/complaints/user/')),
+  sync: sync('/complaints/'),
+  syncUserComplaints: sync('/complaints/user/'),
+  // Resolves to { count, next, facets, results }
+  search: (q, filters = {}) => api.get('/complaints/search/', { params: { q, ...filters } }),
   create: (complaintData) => {
     // Special handling for multipart/form-data (file uploads)
     const config = {
@@ -88,15 +118,16 @@ export const complaintsAPI = {
 
 // Users API
 export const usersAPI = {
-  getAll: () => api.get('/list-all-users/'),
+  getAll: () => unwrapAllPages('/list-all-users/'),
   addWorkerOrUser: (userData) => api.post('/add-worker-or-user/', userData),
   getCurrentUser: () => api.get('/me/'),
 };
 
 // Workers API
 export const workersAPI = {
-  getAll: () => api.get('/workers/'),
-  getTasks: () => api.get('/tasks/'),
+  getAll: () => unwrapAllPages('/workers/'),
+  getTasks: (filters) => unwrapPage(api.get('/tasks/', { params: filters })),
+  syncTasks: sync('/tasks/'),
   getWorkerTasks: (workerId) => api.get(`/tasks/worker/${workerId}/`),
   getAssignedTasks: (workerId) => api.get(`/tasks/assigned/?worker_id=${workerId}`),
   assignTask: (taskData) => api.post('/task/assign/', taskData),
@@ -104,11 +135,18 @@ export const workersAPI = {
 
 // Notifications API
 export const notificationsAPI = {
-  getByUser: () => api.get('/notifications/user/'),
+  getByUser: () => unwrapAllPages('/notifications/user/'),
+  sync: sync('/notifications/user/'),
   getUnread: () => api.get('/notifications/unread/'),
+  getUnreadCount: () => api.get('/notifications/unread/count/'),
   getByTime: (days) => api.get(`/notifications/time/${days}/`),
   markAsRead: (notificationId) => api.post(`/notifications/mark-read/${notificationId}/`),
   markAllAsRead: () => api.post('/notifications/mark-read/'),
 };
 
+// Analytics API
+export const analyticsAPI = {
+  getSummary: (days) => api.get('/analytics/summary/', { params: days ? { days } : {} }),
+};
+
 export default api;
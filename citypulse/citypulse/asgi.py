@@ -9,9 +9,12 @@ from django.core.asgi import get_asgi_application
 from channels.auth import AuthMiddlewareStack
 from citypulse.middleware import JWTAuthMiddleware
 from citypulse_notifications.routing import websocket_urlpatterns
+from citypulse_jobs.worker import start_in_process_worker
 
 
 django_asgi_app = get_asgi_application()
+# Jobs (notification fan-out, thumbnails) run here unless runjobs is deployed
+start_in_process_worker()
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,  # ✅ Fix: Include HTTP
@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+
+class LocalCache:
+    """
+    Process-local LRU cache with a TTL, for per-user values read on every
+    request or handshake (WebSocket users, roles). Owners drop entries when
+    the underlying rows change in this process; the TTL bounds staleness
+    for changes made by other processes. get() returns None on a miss.
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_response_cache_settings():
+    defaults = {
+        'ALIAS': 'default',
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'response',
+    }
+    defaults.update(getattr(settings, 'RESPONSE_CACHE', {}))
+    return defaults
+
+
+def get_response_cache():
+    return caches[get_response_cache_settings()['ALIAS']]
+
+
+def _scope_key(scope):
+    return f"{get_response_cache_settings()['KEY_PREFIX']}:scope:{scope}"
+
+
+def scope_versions(scopes):
+    """
+    Current version token of each scope. A scope missing from the cache
+    (never written, or evicted) gets a fresh token, which orphans anything
+    cached under the old one.
+    """
+    cache = get_response_cache()
+    keys = [_scope_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_scopes(*scopes):
+    """
+    Retire every cached response built from these scopes: now, and again
+    when the current transaction commits, since a reader may cache the
+    pre-commit data in between.
+    """
+    def bump():
+        get_response_cache().set_many({_scope_key(scope): uuid4().hex for scope in scopes}, timeout=None)
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def response_cache_key(request, view_name, scopes, per_user):
+    # Imported here: the users app imports this module for LocalCache
+    from citypulse_users.roles import get_user_role
+
+    parts = [
+        view_name,
+        *scope_versions(scopes),
+        str(request.user.pk) if per_user else '',
+        get_user_role(request.user, request.auth) or '',
+        request.get_host(),
+        getattr(request, 'accepted_media_type', ''),
+        *sorted(f'{key}={value}' for key, values in request.query_params.lists() for value in values),
+    ]
+    digest = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+    return f"{get_response_cache_settings()['KEY_PREFIX']}:{digest}"
+
+
+def _not_modified(request, etag):
+    return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+
+def _finish(request, response, etag):
+    response['ETag'] = etag
+    # Clients keep the body but revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def cache_response(scopes, per_user=False, timeout=None, skip_params=()):
+    """
+    Cache a GET handler's rendered 200 responses under the view, the
+    versions of the data `scopes` it reads, the user (when `per_user`), the
+    user's role, and the query string. Hits skip the handler and serializer entirely, and a
+    matching If-None-Match gets a 304. Writes call invalidate_scopes(),
+    usually from model signals. Requests carrying any of `skip_params` are
+    never cached.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if any(param in request.query_params for param in skip_params):
+                return handler(self, request, *args, **kwargs)
+            cache = get_response_cache()
+            view_name = f'{type(self).__module__}.{type(self).__qualname__}'
+            key = response_cache_key(request, view_name, scopes, per_user)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type, etag = cached
+                if _not_modified(request, etag):
+                    return _finish(request, HttpResponseNotModified(), etag)
+                return _finish(request, HttpResponse(content, content_type=content_type), etag)
+
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            etag = f'"{hashlib.sha256(response.content).hexdigest()[:32]}"'
+            cache.set(
+                key, (response.content, response['Content-Type'], etag),
+                timeout if timeout is not None else get_response_cache_settings()['TIMEOUT'],
+            )
+            if _not_modified(request, etag):
+                return _finish(request, HttpResponseNotModified(), etag)
+            return _finish(request, response, etag)
+        return wrapper
+    return decorator
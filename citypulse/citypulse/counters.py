@@ -0,0 +1,73 @@
+# citypulse/counters.py
+"""
+Counter tables: rows keyed by a few fields with a `count`, kept in step
+with the rows they count (map cells, dashboard rollups) so readers don't
+have to aggregate. Writes apply deltas in bulk; rebuilds recount from
+scratch. Both take the counter model as an argument so migrations can
+pass historical versions.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F
+
+# Counter rows per statement when a batch moves many rows at once
+COUNTER_BATCH_SIZE = 500
+# Counter rows per INSERT when rebuilding
+RECOUNT_BATCH_SIZE = 1000
+
+
+def adjust_counts(model, fields, deltas, **computed):
+    """
+    Apply {key: delta} to the `model` rows whose `fields` match each key.
+    Zero deltas are dropped; then one INSERT creates rows seen for the
+    first time and one UPDATE per distinct delta applies them, batched for
+    large moves. A row can only lose what it already counts, so only
+    growing rows may be missing. `computed` maps further fields to
+    functions of the key, for new rows.
+
+    Rows are looked up by the first field, so it should be indexed and
+    shared by many keys.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [
+            model(**dict(zip(fields, key)), **{name: compute(key) for name, compute in computed.items()})
+            for key, delta in deltas.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+        batch_size=COUNTER_BATCH_SIZE,
+    )
+
+    lookups = list({key[0] for key in deltas})
+    ids_by_amount = defaultdict(list)
+    for start in range(0, len(lookups), COUNTER_BATCH_SIZE):
+        rows = model.objects.filter(
+            **{f'{fields[0]}__in': lookups[start:start + COUNTER_BATCH_SIZE]}
+        ).values_list('id', *fields)
+        for row_id, *key in rows:
+            delta = deltas.get(tuple(key))
+            if delta:
+                ids_by_amount[delta].append(row_id)
+    for delta, ids in ids_by_amount.items():
+        for start in range(0, len(ids), COUNTER_BATCH_SIZE):
+            model.objects.filter(id__in=ids[start:start + COUNTER_BATCH_SIZE]).update(count=F('count') + delta)
+
+
+def recount(model, queryset, fields, **constants):
+    """
+    Insert a `model` row per group of `queryset` rows, counting them.
+    `fields` maps counter fields to the queryset fields or annotations
+    they are grouped by; `constants` are set on every row. The caller
+    clears the table first.
+    """
+    groups = queryset.values(*fields.values()).annotate(total=Count('id')).order_by()
+    model.objects.bulk_create(
+        [
+            model(**{name: group[source] for name, source in fields.items()}, count=group['total'], **constants)
+            for group in groups
+        ],
+        batch_size=RECOUNT_BATCH_SIZE,
+    )
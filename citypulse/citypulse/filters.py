@@ -0,0 +1,133 @@
+# citypulse/filters.py
+"""
+Declarative, whitelisted query-string filters and orderings for list
+views. A FilterSet names the parameters a view accepts and the lookups
+they become, so every filter runs in the database as part of the page
+query; anything not declared is ignored, and a malformed value raises
+ValueError for the view to turn into a 400. Orderings are whole keyset
+orderings (see KeysetPagination), each ending in a unique column.
+"""
+import abc
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+ORDERING_PARAM = 'ordering'
+# Values accepted per comma-separated parameter
+MAX_FILTER_VALUES = 50
+TRUE_VALUES = {'1', 'true', 'yes'}
+FALSE_VALUES = {'0', 'false', 'no'}
+
+
+def start_of_day(day):
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if timezone.is_naive(start) else start
+
+
+class Filter(abc.ABC):
+    """
+    One query parameter. Subclasses turn its raw value into a Q object.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    @abc.abstractmethod
+    def to_q(self, name, value):
+        pass
+
+
+class ListFilter(Filter):
+    """
+    `?name=a,b` matches rows whose field is any of the values. `parse`
+    converts one value; `choices`, if given, whitelists them.
+    """
+
+    def __init__(self, field, parse=str, choices=None):
+        super().__init__(field)
+        self.parse = parse
+        self.choices = choices
+
+    def to_q(self, name, value):
+        values = []
+        for part in value.split(',')[:MAX_FILTER_VALUES]:
+            try:
+                parsed = self.parse(part.strip())
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}: invalid value {part.strip()!r}")
+            if self.choices is not None and parsed not in self.choices:
+                raise ValueError(f"{name} must be among {', '.join(sorted(self.choices))}")
+            values.append(parsed)
+        return self.values_q(values)
+
+    def values_q(self, values):
+        if len(values) == 1:
+            return Q(**{self.field: values[0]})
+        return Q(**{f'{self.field}__in': values})
+
+
+class BooleanFilter(Filter):
+    def to_q(self, name, value):
+        value = value.lower()
+        if value not in TRUE_VALUES | FALSE_VALUES:
+            raise ValueError(f"{name} must be true or false")
+        return Q(**{self.field: value in TRUE_VALUES})
+
+
+class NullFilter(Filter):
+    """
+    `?name=true` matches rows where the field is set, `false` where it is
+    NULL (e.g. completed vs open tasks).
+    """
+
+    def to_q(self, name, value):
+        return ~BooleanFilter(f'{self.field}__isnull').to_q(name, value)
+
+
+class DateFilter(Filter):
+    """
+    A YYYY-MM-DD bound on a datetime field, the whole day included:
+    `after=False` for `?to=`, `after=True` for `?from=`.
+    """
+
+    def __init__(self, field, after=True):
+        super().__init__(field)
+        self.after = after
+
+    def to_q(self, name, value):
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+        if self.after:
+            return Q(**{f'{self.field}__gte': start_of_day(day)})
+        return Q(**{f'{self.field}__lt': start_of_day(day + timedelta(days=1))})
+
+
+class FilterSet:
+    """
+    Subclasses declare `filters` ({param: Filter}) and `orderings`
+    ({param value: keyset ordering}); the first ordering is the default.
+    """
+    filters = {}
+    orderings = {}
+
+    def __init__(self, params):
+        self.params = params
+
+    def filter_queryset(self, queryset):
+        conditions = Q()
+        for name, spec in self.filters.items():
+            value = self.params.get(name)
+            if value:
+                conditions &= spec.to_q(name, value)
+        return queryset.filter(conditions)
+
+    def get_ordering(self):
+        value = self.params.get(ORDERING_PARAM)
+        if not value:
+            return next(iter(self.orderings.values()))
+        if value not in self.orderings:
+            raise ValueError(f"{ORDERING_PARAM} must be one of {', '.join(self.orderings)}")
+        return self.orderings[value]
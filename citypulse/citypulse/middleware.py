@@ -1,15 +1,45 @@
+import asyncio
+import itertools
 from urllib.parse import parse_qs
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth import get_user_model
-from jwt import decode as jwt_decode
 from django.conf import settings
+from citypulse.cache import LocalCache
 
 User = get_user_model()
 
+
+# Authenticated users, so WebSocket reconnect storms don't turn into one
+# User query per handshake; dropped when the user is saved or deleted here
+_cache_config = getattr(settings, 'WEBSOCKET_USER_CACHE', {})
+user_cache = LocalCache(
+    max_size=_cache_config.get('MAX_SIZE', 10000),
+    ttl=_cache_config.get('TTL', 300),
+)
+# In-flight lookups, so concurrent handshakes for one user share one query
+_pending_lookups = {}
+# Per-user generations, bumped on every invalidation, so a lookup that read
+# the user before a save doesn't cache the old row after it. Values are
+# never reused, so an evicted generation only costs a skipped cache write.
+_user_generations = LocalCache(max_size=user_cache.max_size, ttl=user_cache.ttl)
+_generation_counter = itertools.count(1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = str(instance.pk)
+    _user_generations.set(user_id, next(_generation_counter))
+    user_cache.invalidate(user_id)
+
+
 @database_sync_to_async
 def get_user(user_id):
     try:
@@ -17,6 +47,32 @@ def get_user(user_id):
     except User.DoesNotExist:
         return AnonymousUser()
 
+
+async def get_cached_user(user_id):
+    # Token claims may carry the id as int or str
+    user_id = str(user_id)
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    pending = _pending_lookups.get(user_id)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    generation = _user_generations.get(user_id)
+    pending = asyncio.ensure_future(get_user(user_id))
+    _pending_lookups[user_id] = pending
+    try:
+        # Shielded, so cancelling this handshake doesn't fail the ones
+        # waiting on the same lookup
+        user = await asyncio.shield(pending)
+    finally:
+        _pending_lookups.pop(user_id, None)
+    if user.is_authenticated and _user_generations.get(user_id) == generation:
+        user_cache.set(user_id, user)
+    return user
+
+
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
         query_string = parse_qs(scope["query_string"].decode())
@@ -27,13 +83,12 @@ class JWTAuthMiddleware(BaseMiddleware):
             return await super().__call__(scope, receive, send)
 
         try:
-            # Validate token
-            UntypedToken(token)
-            # Decode manually to extract user_id
-            decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user = await get_user(decoded_data["user_id"])
-            scope["user"] = user
-        except ( TokenError, InvalidToken):
+            # Validates the signature and expiry; the claims come from the
+            # same decode pass
+            validated = UntypedToken(token)
+            user = await get_cached_user(validated[jwt_settings.USER_ID_CLAIM])
+            scope["user"] = user if user.is_active else AnonymousUser()
+        except (TokenError, InvalidToken, KeyError):
             scope["user"] = AnonymousUser()
 
         return await super().__call__(scope, receive, send)
@@ -0,0 +1,29 @@
+class SparseFieldsetMixin:
+    """
+    Restricts a serializer's output to the comma separated ``fields`` query
+    parameter (or a ``fields`` list in the serializer context), e.g.
+    ``/complaints/?fields=id,title,status``. Only the top-level serializer is
+    trimmed; nested serializers and write operations keep all their fields.
+    """
+    fields_query_param = 'fields'
+
+    def get_requested_fields(self):
+        requested = self.context.get('fields')
+        if requested is None:
+            request = self.context.get('request')
+            if request is None or not request.query_params.get(self.fields_query_param):
+                return None
+            requested = request.query_params[self.fields_query_param].split(',')
+        return {name.strip() for name in requested if name.strip()}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.root is not self and self.root is not self.parent:
+            return fields
+        if hasattr(self.root, 'initial_data'):
+            return fields
+
+        requested = self.get_requested_fields()
+        if not requested:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested}
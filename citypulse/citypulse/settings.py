@@ -43,6 +43,9 @@ INSTALLED_APPS = [
     'citypulse_complaints',
     'citypulse_workers',
     'citypulse_notifications',
+    'citypulse_jobs',
+    'citypulse_analytics',
+    'citypulse_sync',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
@@ -97,16 +100,84 @@ WSGI_APPLICATION = 'citypulse.wsgi.application'
 ASGI_APPLICATION = 'citypulse.asgi.application'
 
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
-        # For production, use Redis:
-        # "BACKEND": "channels_redis.core.RedisChannelLayer",
-        # "CONFIG": {
-        #     "hosts": [("redis-server-name", 6379)],
-        # },
-    },
+# Set REDIS_URL (e.g. redis://redis-server-name:6379/0) in production so
+# notifications reach WebSocket clients connected to any Daphne process.
+# Without it the in-memory layer only delivers within a single process, so
+# a separate `manage.py runjobs` process (JOB_WORKER=external) can't reach
+# the sockets and refuses to start unless given --allow-in-memory-layer.
+REDIS_URL = os.environ.get('REDIS_URL')
+# Connections per event loop; channels_redis keeps one pool per loop
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', '50'))
+# Messages buffered per channel (one per open socket) before the layer drops
+# new ones, and seconds an undelivered message is kept
+CHANNEL_CAPACITY = int(os.environ.get('CHANNEL_CAPACITY', '100'))
+CHANNEL_EXPIRY = int(os.environ.get('CHANNEL_EXPIRY', '60'))
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [{"address": REDIS_URL, "max_connections": REDIS_MAX_CONNECTIONS}],
+                "capacity": CHANNEL_CAPACITY,
+                "expiry": CHANNEL_EXPIRY,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+            "CONFIG": {
+                "capacity": CHANNEL_CAPACITY,
+                "expiry": CHANNEL_EXPIRY,
+            },
+        },
+    }
+
+# Response cache (citypulse/cache.py). The local-memory cache only sees
+# invalidations made in its own process, so multi-process deployments share
+# Redis instead.
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+    }
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    # Seconds; signals retire entries sooner when their data changes
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'response',
+}
+# ?since= sync (citypulse_sync.sync): rows per response, how long to wait
+# for writes to commit before moving a cursor past them, after how long a
+# running job or bulk write no longer holds cursors back, and how long
+# deletions are remembered
+SYNC = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    'SETTLE_SECONDS': 2,
+    'MAX_HOLD_SECONDS': 600,
+    'TOMBSTONE_DAYS': 30,
 }
+# Roles are cached per process and the admin id set in ALIAS (see
+# citypulse_users.roles); TTL (seconds) bounds staleness for changes made
+# by other processes
+ROLE_CACHE = {
+    'ALIAS': 'default',
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -121,6 +192,14 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     )
 }
+# Access tokens carry the user's role (citypulse_users.tokens)
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'citypulse_users.tokens.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'citypulse_users.tokens.RoleTokenRefreshSerializer',
+}
+
+# Default page size for list endpoints (citypulse.pagination.KeysetPagination)
+KEYSET_PAGINATION_PAGE_SIZE = 50
 
 
 # Password validation
@@ -169,4 +248,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATIC_ROOT=os.path.join(BASE_DIR,'static')
 
-MEDIA_ROOT=os.path.join(BASE_DIR,'media')
\ No newline at end of file
+MEDIA_ROOT=os.path.join(BASE_DIR,'media')
+
+# Users authenticated by citypulse.middleware.JWTAuthMiddleware are cached
+# per process; TTL (seconds) bounds staleness for changes made elsewhere
+WEBSOCKET_USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
+
+# Notification WebSocket protocol (citypulse_notifications/consumers.py):
+# bursts within COALESCE_SECONDS share a frame, reconnects replay at most
+# REPLAY_LIMIT missed notifications, and an ack frame carries <= MAX_ACK_IDS.
+# A socket queues MAX_PENDING notifications before OVERFLOW_POLICY
+# (drop_oldest, drop_newest or close) kicks in.
+NOTIFICATION_SOCKET = {
+    'COALESCE_SECONDS': 0.05,
+    'REPLAY_LIMIT': 100,
+    'MAX_ACK_IDS': 500,
+    'MAX_PENDING': 100,
+    'OVERFLOW_POLICY': 'drop_oldest',
+}
+
+# Batches the notification dispatcher holds before dropping new ones
+NOTIFICATION_DISPATCH = {
+    'MAX_QUEUED_BATCHES': 1000,
+}
+
+# Database-backed background job queue. Each web process runs a worker
+# thread; set JOB_WORKER=external when `manage.py runjobs` runs as its own
+# process instead (see Procfile), which needs REDIS_URL.
+JOB_QUEUE = {
+    'IN_PROCESS': os.environ.get('JOB_WORKER') != 'external',
+    'IN_PROCESS_CONCURRENCY': 1,
+    'CONCURRENCY': 4,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    # Retry n waits BACKOFF_BASE ** n seconds, capped at BACKOFF_MAX
+    'BACKOFF_BASE': 2,
+    'BACKOFF_MAX': 3600,
+    # Running jobs locked for longer than this are assumed orphaned
+    'LOCK_TIMEOUT': 300,
+    # Seconds between sweeps for orphaned jobs while a worker runs
+    'REQUEUE_INTERVAL': 60,
+}
+
+# Content-addressed storage for complaint images (see citypulse_complaints/storage.py)
+BLOB_STORAGE = {
+    'BACKEND': 'citypulse_complaints.storage.LocalBlobStorage',
+    'OPTIONS': {
+        'location': os.path.join(MEDIA_ROOT, 'blobs'),
+    },
+}
+
+# Automatic task assignment (citypulse_workers.assignment)
+TASK_ASSIGNMENT = {
+    # Extra distance that costs as much as one more open task
+    'KM_PER_TASK': 5,
+    # Workers with this many open tasks get no more; None for no cap
+    'MAX_OPEN_TASKS': None,
+    # Seconds before the in-memory load index is reloaded, which also picks
+    # up assignments made by other processes
+    'INDEX_TTL': 60,
+}
@@ -0,0 +1,139 @@
+import re
+import threading
+import unittest
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Maximum number of SQL queries any list endpoint may run for a single page,
+# regardless of how many rows it returns.
+LIST_ENDPOINT_QUERY_BUDGET = 3
+
+# Every paginated list endpoint in the project; new ones belong here so the
+# budget test covers them.
+LIST_ENDPOINTS = [
+    '/complaints/',
+    '/complaints/user/',
+    '/tasks/',
+    '/workers/',
+    '/notifications/user/',
+    '/list-all-users/',
+]
+
+
+# EXPLAIN output that means a query reads the whole table or sorts it
+SQLITE_TABLE_SCAN = re.compile(r'^SCAN (?!.*USING (COVERING )?INDEX)')
+SQLITE_TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+POSTGRES_TABLE_SCAN = 'Seq Scan'
+
+
+def explain(sql):
+    """
+    Return the plan lines the current database chooses for ``sql``.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are cheaper to scan; only fall back to a
+            # sequential scan when no index can answer the query at all
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+    raise unittest.SkipTest(f'No query plan checks for {connection.vendor}')
+
+
+def plan_problems(sql, plan):
+    """
+    Lines of ``plan`` showing a full table scan or an unindexed sort. On
+    SQLite a bare SCAN is tolerated for an unfiltered query with a LIMIT, since
+    it walks the primary key in order and stops after one page.
+    """
+    if connection.vendor == 'postgresql':
+        return [line for line in plan if POSTGRES_TABLE_SCAN in line]
+
+    bounded_walk = ' WHERE ' not in sql and ' LIMIT ' in sql
+    problems = []
+    for line in plan:
+        detail = line.strip()
+        if SQLITE_TEMP_SORT in detail:
+            problems.append(detail)
+        elif SQLITE_TABLE_SCAN.match(detail) and not bounded_walk:
+            problems.append(detail)
+    return problems
+
+
+class QueryPlanMixin:
+    """
+    TestCase mixin that EXPLAINs every SELECT a block runs and fails if any
+    of them degrades to a full table scan or an unindexed sort.
+    """
+
+    @contextmanager
+    def assertIndexedQueries(self, label=''):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(sql)
+            problems = plan_problems(sql, plan)
+            if problems:
+                self.fail(
+                    f'{label or "Block"} ran an unindexed query:\n{sql}\n'
+                    f'Plan:\n' + '\n'.join(plan)
+                )
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin asserting that a block runs at most ``budget`` queries.
+    Unlike assertNumQueries it tolerates fewer queries, and the failure
+    message lists every captured statement.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label=''):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        if len(context.captured_queries) > budget:
+            statements = '\n'.join(
+                f'{index}. {query["sql"]}' for index, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{label or "Block"} ran {len(context.captured_queries)} queries, '
+                f'budget is {budget}:\n{statements}'
+            )
+
+
+@contextmanager
+def fake_redis_server():
+    """
+    Run a fakeredis TCP server in a background thread and yield its URL.
+    Other processes can connect to it, which the in-memory layer cannot do.
+    """
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(('127.0.0.1', 0), server_type='redis')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def redis_channel_layers(url, **config):
+    """
+    CHANNEL_LAYERS for channels_redis pointed at ``url``, mirroring settings.
+    """
+    return {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [{"address": url, "max_connections": 10}], **config},
+        },
+    }
@@ -13,4 +13,5 @@ urlpatterns = [
     path('', include('citypulse_users.urls')),  # we'll create this
     path('', include('citypulse_notifications.urls')),  # we'll create this
     path('', include('citypulse_workers.urls')),  # we'll create this
+    path('', include('citypulse_analytics.urls')),
 ]
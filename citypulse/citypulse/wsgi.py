@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'citypulse.settings')
 
 application = get_wsgi_application()
+
+# Jobs (notification fan-out, thumbnails) run here unless runjobs is deployed
+from citypulse_jobs.worker import start_in_process_worker  # noqa: E402
+
+start_in_process_worker()
@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+# Register your models here.
+from citypulse_analytics.models import ComplaintRollup, WorkerResolutionRollup
+
+admin.site.register(ComplaintRollup)
+admin.site.register(WorkerResolutionRollup)
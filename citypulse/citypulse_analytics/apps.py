@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CitypulseAnalyticsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'citypulse_analytics'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from citypulse_analytics.models import ComplaintRollup, WorkerResolutionRollup
+from citypulse_analytics.rollups import rebuild_rollups
+from citypulse_complaints.models import Complaint
+from citypulse_workers.models import AssignedTask
+
+
+class Command(BaseCommand):
+    help = "Recount the dashboard rollups from the complaints and tasks tables."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_rollups(Complaint, AssignedTask, ComplaintRollup, WorkerResolutionRollup)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {ComplaintRollup.objects.count()} complaint rollup(s) and "
+            f"{WorkerResolutionRollup.objects.count()} worker rollup(s)."
+        ))
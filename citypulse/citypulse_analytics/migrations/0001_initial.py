@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    from citypulse_analytics.rollups import rebuild_rollups
+
+    rebuild_rollups(
+        apps.get_model('citypulse_complaints', 'Complaint'),
+        apps.get_model('citypulse_workers', 'AssignedTask'),
+        apps.get_model('citypulse_analytics', 'ComplaintRollup'),
+        apps.get_model('citypulse_analytics', 'WorkerResolutionRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('citypulse_complaints', '0014_status_timeline'),
+        ('citypulse_workers', '0004_worker_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('garbage', 'Garbage'), ('road', 'Road'), ('water', 'Water'), ('lights', 'Street Lights')], max_length=20)),
+                ('severity', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'severity', 'status'), name='complaint_rollup_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkerResolutionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('resolved', models.IntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resolution_rollups', to='citypulse_workers.worker')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('worker', 'day'), name='worker_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import models
+
+from citypulse_complaints.models import Complaint
+from citypulse_workers.models import Worker
+
+
+class ComplaintRollup(models.Model):
+    """
+    Complaints filed on `day`, by category, severity and current status.
+    Kept current by the signals in signals.py; see rollups.py.
+    """
+    day = models.DateField()
+    category = models.CharField(max_length=20, choices=Complaint.CATEGORY_CHOICES)
+    severity = models.CharField(max_length=10, choices=Complaint.SEVERITY_CHOICES)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'severity', 'status'], name='complaint_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category}/{self.severity}/{self.status}: {self.count}"
+
+
+class WorkerResolutionRollup(models.Model):
+    """
+    Tasks a worker completed on `day` and their summed time from
+    assignment to completion.
+    """
+    worker = models.ForeignKey(Worker, on_delete=models.CASCADE, related_name='resolution_rollups')
+    day = models.DateField()
+    resolved = models.IntegerField(default=0)
+    resolution_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['worker', 'day'], name='worker_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.worker_id} {self.day}: {self.resolved}"
@@ -0,0 +1,98 @@
+# citypulse_analytics/rollups.py
+"""
+Dashboard rollups. Complaint counts per (day, category, severity, status)
+and worker resolution totals per (worker, day) are adjusted as complaints
+and tasks are written, so the dashboard reads a few hundred rollup rows
+however many complaints there are.
+"""
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from citypulse.counters import RECOUNT_BATCH_SIZE, adjust_counts, recount
+from .models import ComplaintRollup, WorkerResolutionRollup
+
+COMPLAINT_ROLLUP_FIELDS = ('day', 'category', 'severity', 'status')
+
+
+def rollup_day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def complaint_rollup_key(created_at, category, severity, status):
+    return (rollup_day(created_at), category, severity, status)
+
+
+def add_complaint_rollups(complaints):
+    """
+    Count newly created complaints into their rollup rows.
+    """
+    adjust_complaint_rollups(Counter(
+        complaint_rollup_key(complaint.created_at, complaint.category, complaint.severity, complaint.status)
+        for complaint in complaints
+    ))
+
+
+def adjust_complaint_rollups(deltas):
+    """
+    Apply {(day, category, severity, status): delta}: one INSERT for rows
+    seen for the first time, then one UPDATE per distinct delta.
+    """
+    adjust_counts(ComplaintRollup, COMPLAINT_ROLLUP_FIELDS, deltas)
+
+
+def task_resolution(worker_id, assigned_at, completed_at):
+    """
+    ((worker_id, day), seconds) for a completed task, or None for an open one.
+    """
+    if completed_at is None:
+        return None
+    seconds = max(int((completed_at - assigned_at).total_seconds()), 0)
+    return (worker_id, rollup_day(completed_at)), seconds
+
+
+def adjust_worker_rollup(worker_id, day, resolved, seconds):
+    # Only a growing row may be missing; a shrinking one may already be
+    # gone with its worker
+    if resolved > 0:
+        WorkerResolutionRollup.objects.get_or_create(worker_id=worker_id, day=day)
+    WorkerResolutionRollup.objects.filter(worker_id=worker_id, day=day).update(
+        resolved=F('resolved') + resolved,
+        resolution_seconds=F('resolution_seconds') + seconds,
+    )
+
+
+def rebuild_rollups(complaint_model, task_model, complaint_rollup_model, worker_rollup_model):
+    """
+    Recount both rollup tables from the complaints and completed tasks,
+    for the initial backfill and the rebuild_rollups command when the
+    rollups have drifted.
+    """
+    complaint_rollup_model.objects.all().delete()
+    recount(
+        complaint_rollup_model,
+        complaint_model.objects.annotate(day=TruncDate('created_at')),
+        {field: field for field in COMPLAINT_ROLLUP_FIELDS},
+    )
+
+    # Durations are summed here rather than in SQL, which SQLite can't do
+    worker_rollup_model.objects.all().delete()
+    resolved, seconds = Counter(), Counter()
+    tasks = (
+        task_model.objects.filter(completed_at__isnull=False)
+        .values_list('worker_id', 'assigned_at', 'completed_at')
+        .iterator(chunk_size=1000)
+    )
+    for task in tasks:
+        key, task_seconds = task_resolution(*task)
+        resolved[key] += 1
+        seconds[key] += task_seconds
+    worker_rollup_model.objects.bulk_create(
+        [
+            worker_rollup_model(worker_id=worker_id, day=day, resolved=count, resolution_seconds=seconds[worker_id, day])
+            for (worker_id, day), count in resolved.items()
+        ],
+        batch_size=RECOUNT_BATCH_SIZE,
+    )
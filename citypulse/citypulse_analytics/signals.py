@@ -0,0 +1,82 @@
+# citypulse_analytics/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from citypulse_complaints.models import Complaint
+from citypulse_workers.models import AssignedTask
+from .rollups import add_complaint_rollups, adjust_complaint_rollups, adjust_worker_rollup, complaint_rollup_key, task_resolution
+
+ROLLUP_FIELDS = {'category', 'severity', 'status'}
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_complaint_rollup_key(sender, instance, update_fields=None, **kwargs):
+    instance._previous_rollup_key = None
+    if instance._state.adding or (update_fields is not None and not ROLLUP_FIELDS & set(update_fields)):
+        return
+    previous = (
+        Complaint.objects.filter(pk=instance.pk)
+        .values_list('created_at', 'category', 'severity', 'status')
+        .first()
+    )
+    if previous is not None:
+        instance._previous_rollup_key = complaint_rollup_key(*previous)
+
+
+@receiver(post_save, sender=Complaint)
+def update_complaint_rollups(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        add_complaint_rollups([instance])
+        return
+    if update_fields is not None and not ROLLUP_FIELDS & set(update_fields):
+        return
+    current = complaint_rollup_key(instance.created_at, instance.category, instance.severity, instance.status)
+    deltas = {current: 1}
+    previous = getattr(instance, '_previous_rollup_key', None)
+    if previous is not None:
+        if previous == current:
+            return
+        deltas[previous] = -1
+    adjust_complaint_rollups(deltas)
+
+
+@receiver(post_delete, sender=Complaint)
+def release_complaint_rollup(sender, instance, **kwargs):
+    adjust_complaint_rollups(
+        {complaint_rollup_key(instance.created_at, instance.category, instance.severity, instance.status): -1}
+    )
+
+
+@receiver(pre_save, sender=AssignedTask)
+def remember_task_resolution(sender, instance, **kwargs):
+    instance._previous_resolution = None
+    if not instance._state.adding:
+        previous = (
+            AssignedTask.objects.filter(pk=instance.pk)
+            .values_list('worker_id', 'assigned_at', 'completed_at')
+            .first()
+        )
+        if previous is not None:
+            instance._previous_resolution = task_resolution(*previous)
+
+
+@receiver(post_save, sender=AssignedTask)
+def update_worker_rollup(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_previous_resolution', None)
+    current = task_resolution(instance.worker_id, instance.assigned_at, instance.completed_at)
+    if previous == current:
+        return
+    if previous is not None:
+        (worker_id, day), seconds = previous
+        adjust_worker_rollup(worker_id, day, -1, -seconds)
+    if current is not None:
+        (worker_id, day), seconds = current
+        adjust_worker_rollup(worker_id, day, 1, seconds)
+
+
+@receiver(post_delete, sender=AssignedTask)
+def release_worker_rollup(sender, instance, **kwargs):
+    resolution = task_resolution(instance.worker_id, instance.assigned_at, instance.completed_at)
+    if resolution is not None:
+        (worker_id, day), seconds = resolution
+        adjust_worker_rollup(worker_id, day, -1, -seconds)
@@ -0,0 +1,154 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models.signals import pre_save
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from citypulse_complaints.models import Complaint
+from citypulse_complaints.signals import remember_cluster_key
+from citypulse_complaints.status import transition
+from citypulse_users.models import Profile
+from citypulse_workers.assignment import assign_backlog, worker_load_index
+from citypulse_workers.models import AssignedTask, Worker
+from .models import ComplaintRollup, WorkerResolutionRollup
+from .rollups import rebuild_rollups
+
+
+def rollup_snapshot():
+    return (
+        sorted(
+            ComplaintRollup.objects.filter(count__gt=0)
+            .values_list('day', 'category', 'severity', 'status', 'count')
+        ),
+        sorted(
+            WorkerResolutionRollup.objects.filter(resolved__gt=0)
+            .values_list('worker_id', 'day', 'resolved', 'resolution_seconds')
+        ),
+    )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        worker_load_index.invalidate()
+        self.addCleanup(worker_load_index.invalidate)
+        self.citizen = User.objects.create_user(username='citizen')
+        admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=admin, role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.worker = Worker.objects.create(
+            user=User.objects.create_user(username='fixer'), name='fixer', phone='555-0100', specialization='road',
+        )
+
+    def make_complaint(self, category='road', severity='medium'):
+        return Complaint.objects.create(
+            user=self.citizen, title='Complaint', description='...',
+            location_lat='17.385000', location_lng='78.486700', category=category, severity=severity,
+        )
+
+    def complete(self, task, hours):
+        task.completed_at = task.assigned_at + timedelta(hours=hours)
+        task.save()
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        complaints = [self.make_complaint(severity=severity) for severity in ('low', 'medium', 'high', 'high')]
+        self.make_complaint(category='water')
+        self.assertEqual(assign_backlog(), (4, 1))
+        for complaint in complaints:
+            complaint.refresh_from_db()
+        transition(complaints[0], 'in_progress')
+        transition(complaints[1], 'resolved')
+        complaints[3].category = 'lights'
+        complaints[3].save()
+        complaints[2].delete()
+
+        tasks = list(AssignedTask.objects.order_by('id'))
+        self.complete(tasks[0], 2)
+        self.complete(tasks[1], 4)
+        # Completion moved to another day, then reopened
+        self.complete(tasks[1], 30)
+        tasks[1].completed_at = None
+        tasks[1].save()
+        self.complete(tasks[1], 6)
+
+        incremental = rollup_snapshot()
+        rebuild_rollups(Complaint, AssignedTask, ComplaintRollup, WorkerResolutionRollup)
+        self.assertEqual(rollup_snapshot(), incremental)
+        self.assertEqual(sum(row[-1] for row in incremental[0]), 4)
+        self.assertEqual(sum(row[2] for row in incremental[1]), 2)
+
+    def test_rollups_do_not_rely_on_the_complaints_app_receivers(self):
+        complaint = self.make_complaint()
+        pre_save.disconnect(remember_cluster_key, sender=Complaint)
+        self.addCleanup(pre_save.connect, remember_cluster_key, sender=Complaint)
+        complaint.severity = 'high'
+        complaint.save()
+        transition(complaint, 'rejected')
+
+        incremental = rollup_snapshot()
+        rebuild_rollups(Complaint, AssignedTask, ComplaintRollup, WorkerResolutionRollup)
+        self.assertEqual(rollup_snapshot(), incremental)
+
+    def test_summary(self):
+        for severity in ('low', 'high', 'high'):
+            self.make_complaint(severity=severity)
+        self.make_complaint(category='water')
+        assign_backlog()
+        task = AssignedTask.objects.first()
+        self.complete(task, 3)
+        transition(task.complaint, 'resolved')
+        # Filed long ago, outside the window below
+        old = self.make_complaint(category='lights')
+        Complaint.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=30))
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        response = self.client.get('/analytics/summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 5)
+        self.assertEqual(response.data['by_status'], {'assigned': 2, 'resolved': 1, 'pending': 2})
+        self.assertEqual(response.data['by_category'], {'road': 3, 'water': 1, 'lights': 1})
+        self.assertEqual(response.data['by_severity'], {'low': 1, 'high': 2, 'medium': 2})
+        self.assertEqual(response.data['workers'], [
+            {'worker': self.worker.id, 'name': 'fixer', 'resolved': 1, 'avg_resolution_hours': 3.0},
+        ])
+
+        recent = self.client.get('/analytics/summary/?days=7').data
+        self.assertEqual(recent['total'], 4)
+        self.assertNotIn('lights', recent['by_category'])
+        self.assertEqual(self.client.get('/analytics/summary/?days=x').status_code, 400)
+
+    def test_resolving_through_transitions_counts_for_the_worker(self):
+        resolved, rejected = self.make_complaint(), self.make_complaint()
+        assign_backlog()
+        AssignedTask.objects.update(assigned_at=timezone.now() - timedelta(hours=5))
+        for complaint, status in ((resolved, 'resolved'), (rejected, 'rejected')):
+            complaint.refresh_from_db()
+            transition(complaint, status)
+
+        workers = self.client.get('/analytics/summary/').data['workers']
+        self.assertEqual(len(workers), 1)
+        self.assertEqual((workers[0]['worker'], workers[0]['resolved']), (self.worker.id, 2))
+        self.assertAlmostEqual(workers[0]['avg_resolution_hours'], 5.0, places=1)
+
+    def test_summary_cost_does_not_grow_with_complaints(self):
+        def fetch():
+            # Complaint rollups and worker rollups
+            with self.assertNumQueries(2):
+                return self.client.get('/analytics/summary/').data['total']
+
+        # Caches the admin's role
+        self.client.get('/analytics/summary/')
+        self.make_complaint()
+        self.assertEqual(fetch(), 1)
+        for _ in range(30):
+            self.make_complaint()
+        self.assertEqual(fetch(), 31)
+
+    def test_admins_only(self):
+        client = APIClient()
+        client.force_authenticate(self.citizen)
+        self.assertEqual(client.get('/analytics/summary/').status_code, 403)
@@ -0,0 +1,64 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from citypulse_users.permissions import IsAdminUserRole
+from .models import ComplaintRollup, WorkerResolutionRollup
+
+
+class AnalyticsSummaryView(APIView):
+    """
+    Dashboard counts by status, category, severity and day, plus per-worker
+    resolution times, read from the rollup tables. `?days=N` limits it to
+    complaints filed (and tasks completed) in the last N days.
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def get(self, request):
+        complaint_rows = ComplaintRollup.objects.filter(count__gt=0)
+        worker_rows = WorkerResolutionRollup.objects.filter(resolved__gt=0)
+        days = request.query_params.get('days')
+        if days is not None:
+            try:
+                days = int(days)
+            except ValueError:
+                return Response({"error": "days must be an integer"}, status=400)
+            if days < 1:
+                return Response({"error": "days must be at least 1"}, status=400)
+            since = timezone.localdate() - timedelta(days=days - 1)
+            complaint_rows = complaint_rows.filter(day__gte=since)
+            worker_rows = worker_rows.filter(day__gte=since)
+
+        by_status, by_category, by_severity, by_day = Counter(), Counter(), Counter(), Counter()
+        for day, category, severity, status, count in complaint_rows.values_list(
+            'day', 'category', 'severity', 'status', 'count'
+        ):
+            by_status[status] += count
+            by_category[category] += count
+            by_severity[severity] += count
+            by_day[day] += count
+
+        workers = (
+            worker_rows.values('worker', 'worker__name')
+            .annotate(resolved_total=Sum('resolved'), seconds=Sum('resolution_seconds'))
+            .order_by('worker')
+        )
+        return Response({
+            "total": sum(by_status.values()),
+            "by_status": dict(by_status),
+            "by_category": dict(by_category),
+            "by_severity": dict(by_severity),
+            "by_day": [{"day": day, "count": count} for day, count in sorted(by_day.items())],
+            "workers": [
+                {
+                    "worker": row['worker'],
+                    "name": row['worker__name'],
+                    "resolved": row['resolved_total'],
+                    "avg_resolution_hours": round(row['seconds'] / row['resolved_total'] / 3600, 2),
+                }
+                for row in workers
+            ],
+        })
@@ -0,0 +1,84 @@
+# citypulse_complaints/bulk.py
+"""
+Bulk complaint import. Items are validated a batch at a time by the normal
+ComplaintSerializer, then written with bulk_create; the bookkeeping save()
+and the per-row signals would do (text signatures, status history, map
+cells, dashboard rollups, thumbnails) goes through the same functions they call, once for the whole
+batch, imported complaints are linked to the ones they duplicate
+like single creates are, and the job queue gets one notification job for
+the whole import.
+"""
+from django.db import transaction
+
+from citypulse.cache import invalidate_scopes
+from citypulse_analytics.rollups import add_complaint_rollups
+from citypulse_sync.sync import hold_horizon
+from .clusters import add_to_cells
+from .duplicates import link_duplicates
+from .images import InvalidImage, store_image
+from .jobs import notify_complaints_imported, schedule_thumbnails
+from .models import Complaint, save_text_signatures
+from .serializers import ComplaintSerializer
+from .status import record_initial_statuses
+
+BULK_BATCH_SIZE = 500
+BULK_MAX_ITEMS = 10_000
+
+
+def validate_complaints(items):
+    """
+    Validate items BULK_BATCH_SIZE at a time, then store the images of a
+    valid import. Returns (validated, errors), errors being
+    [{'index': i, 'errors': {...}}] for the invalid items.
+    """
+    validated, errors = [], []
+    for start in range(0, len(items), BULK_BATCH_SIZE):
+        serializer = ComplaintSerializer(data=items[start:start + BULK_BATCH_SIZE], many=True)
+        if serializer.is_valid():
+            validated.extend(serializer.validated_data)
+        else:
+            # A list with {} for valid items, or {offset: errors} in newer DRF
+            batch_errors = serializer.errors
+            pairs = batch_errors.items() if isinstance(batch_errors, dict) else enumerate(batch_errors)
+            errors.extend(
+                {'index': start + offset, 'errors': item_errors}
+                for offset, item_errors in sorted(pairs)
+                if item_errors
+            )
+    if errors:
+        return validated, errors
+
+    stored = []
+    for index, data in enumerate(validated):
+        try:
+            stored.append(store_image(dict(data)))
+        except InvalidImage as exc:
+            errors.append({'index': index, 'errors': {'image': [str(exc)]}})
+    return stored, errors
+
+
+def import_complaints(user, validated):
+    """
+    Create complaints for `user` from validate_complaints() data. Returns
+    the saved complaints.
+    """
+    complaints = []
+    for data in validated:
+        complaint = Complaint(user=user, **data)
+        complaint.set_geohash()
+        complaint.set_text_signature()
+        complaints.append(complaint)
+
+    # The rows are stamped as they are built, well before the commit
+    with hold_horizon(), transaction.atomic():
+        complaints = Complaint.objects.bulk_create(complaints, batch_size=BULK_BATCH_SIZE)
+        save_text_signatures(complaints)
+        link_duplicates(complaints)
+        record_initial_statuses(complaints)
+        add_to_cells(complaints)
+        add_complaint_rollups(complaints)
+        schedule_thumbnails(complaints)
+        # bulk_create skips the signals that expire cached lists
+        invalidate_scopes('complaints')
+        notify_complaints_imported.enqueue_on_commit(user.id, [complaint.id for complaint in complaints])
+    return complaints
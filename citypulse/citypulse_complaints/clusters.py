@@ -0,0 +1,67 @@
+# citypulse_complaints/clusters.py
+"""
+Map clustering. Every complaint is counted in its geohash cell at each
+precision in CLUSTER_PRECISIONS (a complaint's cells are just prefixes of
+its geohash), so a zoomed-out map reads a few hundred ComplaintCell rows
+instead of every complaint.
+"""
+from collections import Counter
+
+from django.db.models.functions import Substr
+
+from citypulse.counters import adjust_counts, recount
+from .models import ComplaintCell
+
+CLUSTER_PRECISIONS = range(1, 8)
+# (highest web-map zoom, geohash precision): roughly 100-300 cells per screen
+ZOOM_PRECISIONS = [(2, 1), (5, 2), (7, 3), (10, 4), (12, 5), (15, 6)]
+OPEN_STATUSES = ('pending', 'assigned', 'in_progress')
+CELL_FIELDS = ('geohash', 'category', 'severity', 'status')
+
+
+def precision_for_zoom(zoom):
+    for max_zoom, precision in ZOOM_PRECISIONS:
+        if zoom <= max_zoom:
+            return precision
+    return CLUSTER_PRECISIONS[-1]
+
+
+def cluster_key(complaint):
+    return (complaint.geohash, complaint.category, complaint.severity, complaint.status)
+
+
+def add_to_cells(complaints):
+    """
+    Count newly created complaints into their cells.
+    """
+    adjust_cells(Counter(cluster_key(complaint) for complaint in complaints))
+
+
+def adjust_cells(deltas):
+    """
+    Apply {cluster_key: delta} to every precision's cell. Deltas landing
+    on the same cell are summed first.
+    """
+    cell_deltas = Counter()
+    for (geohash, category, severity, status), delta in deltas.items():
+        for precision in CLUSTER_PRECISIONS:
+            cell_deltas[(geohash[:precision], category, severity, status)] += delta
+    adjust_counts(
+        ComplaintCell, CELL_FIELDS, cell_deltas,
+        precision=lambda cell: len(cell[0]),
+    )
+
+
+def rebuild_cells(complaint_model, cell_model):
+    """
+    Recount every cell from scratch. Takes the models as arguments so
+    migrations can pass their historical versions.
+    """
+    cell_model.objects.all().delete()
+    for precision in CLUSTER_PRECISIONS:
+        recount(
+            cell_model,
+            complaint_model.objects.exclude(geohash='').annotate(cell=Substr('geohash', 1, precision)),
+            {'geohash': 'cell', 'category': 'category', 'severity': 'severity', 'status': 'status'},
+            precision=precision,
+        )
@@ -0,0 +1,140 @@
+# citypulse_complaints/duplicates.py
+"""
+Duplicate detection for new complaints. Candidates are open, canonical
+complaints of the same category within DUPLICATE_RADIUS_M (found through the
+geohash index), and text similarity compares their stored MinHash
+signatures (minhash.py, read from ComplaintSignature in the same query), so
+each candidate costs one signature comparison.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .clusters import OPEN_STATUSES
+from .geo import bbox_q, cover_ranges, haversine_m, radius_bbox
+from .minhash import similarity
+
+DUPLICATE_RADIUS_M = 75
+DUPLICATE_SIMILARITY = 0.5
+# Geohash ranges OR'ed into one candidate query (SQLite caps expression depth)
+RANGES_PER_QUERY = 200
+CANDIDATE_FIELDS = (
+    'id', 'location_lat', 'location_lng', 'category', 'status', 'duplicate_of_id', 'signature__minhash'
+)
+
+
+def pick_canonical(lat, lng, category, signature, candidates):
+    """
+    The best match among candidate rows of (id, lat, lng, category, status,
+    duplicate_of_id, signature): the most similar open canonical
+    complaint of the same category within the radius, nearest on ties.
+    """
+    best = None
+    for candidate_id, candidate_lat, candidate_lng, candidate_category, status, duplicate_of_id, candidate_signature in candidates:
+        if (
+            candidate_category != category or status not in OPEN_STATUSES
+            or duplicate_of_id is not None or candidate_signature is None
+        ):
+            continue
+        distance = haversine_m(lat, lng, float(candidate_lat), float(candidate_lng))
+        if distance > DUPLICATE_RADIUS_M:
+            continue
+        score = similarity(signature, candidate_signature)
+        if score >= DUPLICATE_SIMILARITY and (best is None or (score, -distance) > best[:2]):
+            best = (score, -distance, candidate_id)
+    return best[2] if best else None
+
+
+def find_duplicate(complaint):
+    """
+    Return the id of the open canonical complaint this one most likely
+    duplicates, or None.
+    """
+    if complaint.text_signature is None:
+        return None
+    lat, lng = float(complaint.location_lat), float(complaint.location_lng)
+    # Only the geohash ranges go to the database: the handful of rows around
+    # the point are cheaper to filter here than to let the planner pick a
+    # category or status index that matches half the table
+    candidates = (
+        complaint.__class__.objects.filter(bbox_q(*radius_bbox(lat, lng, DUPLICATE_RADIUS_M)))
+        .exclude(id=complaint.id)
+        .values_list(*CANDIDATE_FIELDS)
+    )
+    return pick_canonical(lat, lng, complaint.category, complaint.text_signature, candidates)
+
+
+def link_duplicate(complaint):
+    """
+    Point a freshly saved complaint at its canonical complaint, if any.
+    Returns the canonical id.
+    """
+    canonical_id = find_duplicate(complaint)
+    if canonical_id is not None:
+        complaint.duplicate_of_id = canonical_id
+        complaint.save(update_fields=['duplicate_of'])
+    return canonical_id
+
+
+def link_duplicates(complaints):
+    """
+    link_duplicate() for complaints saved together (bulk import), as if
+    they had been created one at a time in list order: each is compared
+    with existing complaints and the ones before it. Candidates for the
+    whole list are read RANGES_PER_QUERY geohash ranges per query and the
+    links are written with one UPDATE per canonical complaint. Returns
+    {complaint id: canonical id}.
+    """
+    covers = {
+        complaint.id: cover_ranges(*radius_bbox(
+            float(complaint.location_lat), float(complaint.location_lng), DUPLICATE_RADIUS_M
+        ))
+        for complaint in complaints if complaint.text_signature is not None
+    }
+    if not covers:
+        return {}
+    model = complaints[0].__class__
+    ranges = sorted({cell for cover in covers.values() for cell in cover}, key=lambda cell: cell[0])
+    rows = {}
+    for start in range(0, len(ranges), RANGES_PER_QUERY):
+        condition = Q()
+        for low, high in ranges[start:start + RANGES_PER_QUERY]:
+            condition |= Q(geohash__gte=low, geohash__lt=high) if high is not None else Q(geohash__gte=low)
+        for row in model.objects.filter(condition).values_list('geohash', *CANDIDATE_FIELDS):
+            rows[row[1]] = row
+    rows = sorted(rows.values())
+    geohashes = [row[0] for row in rows]
+
+    positions = {complaint.id: index for index, complaint in enumerate(complaints)}
+    links = {}
+    for complaint in complaints:
+        if complaint.id not in covers:
+            continue
+        candidates = []
+        for low, high in covers[complaint.id]:
+            end = bisect_left(geohashes, high) if high is not None else len(rows)
+            for row in rows[bisect_left(geohashes, low):end]:
+                candidate_id = row[1]
+                # Later rows of the import didn't exist yet; earlier ones may have just been linked
+                if positions.get(candidate_id, -1) >= positions[complaint.id]:
+                    continue
+                candidates.append(row[1:6] + (links.get(candidate_id, row[6]), row[7]))
+        canonical_id = pick_canonical(
+            float(complaint.location_lat), float(complaint.location_lng), complaint.category,
+            complaint.text_signature, candidates,
+        )
+        if canonical_id is not None:
+            links[complaint.id] = canonical_id
+
+    by_canonical = defaultdict(list)
+    for complaint in complaints:
+        if complaint.id in links:
+            complaint.duplicate_of_id = links[complaint.id]
+            by_canonical[complaint.duplicate_of_id].append(complaint.id)
+    now = timezone.now()
+    for canonical_id, complaint_ids in by_canonical.items():
+        # update() skips auto_now, and delta sync goes by updated_at
+        model.objects.filter(id__in=complaint_ids).update(duplicate_of_id=canonical_id, updated_at=now)
+    return links
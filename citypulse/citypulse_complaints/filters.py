@@ -0,0 +1,31 @@
+# citypulse_complaints/filters.py
+from django.db.models import Exists, OuterRef, Q
+
+from citypulse.filters import DateFilter, FilterSet, ListFilter
+from .models import Complaint, ComplaintStatus
+
+
+class AssignedWorkerFilter(ListFilter):
+    """
+    Complaints with a task, open or completed, for any of the workers.
+    """
+
+    def values_q(self, values):
+        from citypulse_workers.models import AssignedTask
+
+        return Q(Exists(AssignedTask.objects.filter(complaint=OuterRef('pk'), worker_id__in=values)))
+
+
+class ComplaintFilter(FilterSet):
+    filters = {
+        'status': ListFilter('status', choices={value for value, _ in ComplaintStatus.STATUS_CHOICES}),
+        'category': ListFilter('category', choices={value for value, _ in Complaint.CATEGORY_CHOICES}),
+        'severity': ListFilter('severity', choices={value for value, _ in Complaint.SEVERITY_CHOICES}),
+        'from': DateFilter('created_at'),
+        'to': DateFilter('created_at', after=False),
+        'worker': AssignedWorkerFilter('worker', parse=int),
+    }
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+    }
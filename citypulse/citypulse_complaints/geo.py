@@ -0,0 +1,240 @@
+# citypulse_complaints/geo.py
+"""
+Pure-Python geohash helpers. A geohash interleaves longitude and latitude
+bits, so nearby points share a prefix and every cell is one contiguous range
+of the sorted geohash column; a bounding box becomes a handful of index
+range scans instead of a full table scan.
+"""
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# ~4.8m x 4.8m cells; plenty for street-level complaints
+GEOHASH_PRECISION = 9
+# Upper bound on index ranges per bounding-box query
+MAX_COVER_CELLS = 16
+# Boxes matching at least this many rows are paged via the ordering index
+DENSE_BBOX_ROWS = 5000
+NEARBY_START_RADIUS_M = 250
+EARTH_RADIUS_M = 6371008.8
+
+
+def _bit_counts(precision):
+    total = 5 * precision
+    # Longitude takes the first (and, for odd totals, the extra) bit
+    return (total + 1) // 2, total // 2
+
+
+def _cell_index(value, low, high, bits):
+    index = int((value - low) / (high - low) * (1 << bits))
+    return min(max(index, 0), (1 << bits) - 1)
+
+
+def _interleave(lng_index, lat_index, precision):
+    lng_bits, lat_bits = _bit_counts(precision)
+    value = 0
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            value = (value << 1) | ((lng_index >> (lng_bits - 1 - bit // 2)) & 1)
+        else:
+            value = (value << 1) | ((lat_index >> (lat_bits - 1 - bit // 2)) & 1)
+    return value
+
+
+def _to_string(value, precision):
+    chars = []
+    for _ in range(precision):
+        chars.append(BASE32[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lng_bits, lat_bits = _bit_counts(precision)
+    lng_index = _cell_index(float(lng), -180.0, 180.0, lng_bits)
+    lat_index = _cell_index(float(lat), -90.0, 90.0, lat_bits)
+    return _to_string(_interleave(lng_index, lat_index, precision), precision)
+
+
+def decode_bounds(geohash):
+    """
+    Return (min_lat, min_lng, max_lat, max_lng) of a geohash cell.
+    """
+    min_lat, max_lat, min_lng, max_lng = -90.0, 90.0, -180.0, 180.0
+    is_lng = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if is_lng:
+                middle = (min_lng + max_lng) / 2
+                min_lng, max_lng = (middle, max_lng) if bit else (min_lng, middle)
+            else:
+                middle = (min_lat + max_lat) / 2
+                min_lat, max_lat = (middle, max_lat) if bit else (min_lat, middle)
+            is_lng = not is_lng
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _cover_values(min_lat, min_lng, max_lat, max_lng, max_cells, max_precision=GEOHASH_PRECISION):
+    """
+    Pick the finest precision, up to max_precision, whose cells covering the
+    box number at most max_cells, and return (precision, sorted integer
+    cell values).
+    """
+    for precision in range(min(max_precision, GEOHASH_PRECISION), 0, -1):
+        lng_bits, lat_bits = _bit_counts(precision)
+        lng_range = range(
+            _cell_index(min_lng, -180.0, 180.0, lng_bits),
+            _cell_index(max_lng, -180.0, 180.0, lng_bits) + 1,
+        )
+        lat_range = range(
+            _cell_index(min_lat, -90.0, 90.0, lat_bits),
+            _cell_index(max_lat, -90.0, 90.0, lat_bits) + 1,
+        )
+        if len(lng_range) * len(lat_range) <= max_cells or precision == 1:
+            values = sorted(
+                _interleave(lng_index, lat_index, precision)
+                for lng_index in lng_range
+                for lat_index in lat_range
+            )
+            return precision, values
+
+
+def cover_ranges(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS, max_precision=GEOHASH_PRECISION):
+    """
+    Geohash ranges [low, high) covering the box, adjacent cells merged. A
+    high of None means "to the end of the keyspace". Boxes crossing the
+    antimeridian (min_lng > max_lng) are split in two. Keys shorter than
+    the bounds would sort below them, so columns holding geohashes of
+    precision p (map cells) need max_precision=p.
+    """
+    if min_lng > max_lng:
+        return (
+            cover_ranges(min_lat, min_lng, max_lat, 180.0, max_cells // 2, max_precision)
+            + cover_ranges(min_lat, -180.0, max_lat, max_lng, max_cells // 2, max_precision)
+        )
+
+    precision, values = _cover_values(min_lat, min_lng, max_lat, max_lng, max_cells, max_precision)
+    ranges = []
+    start = previous = values[0]
+    for value in values[1:] + [None]:
+        if value is not None and value == previous + 1:
+            previous = value
+            continue
+        end = previous + 1
+        high = _to_string(end, precision) if end < 32 ** precision else None
+        ranges.append((_to_string(start, precision), high))
+        if value is not None:
+            start = previous = value
+    return ranges
+
+
+def geohash_q(min_lat, min_lng, max_lat, max_lng, prefix='', max_precision=GEOHASH_PRECISION):
+    """
+    Q object matching the geohash index ranges that cover the box. Cells
+    overhang the box, so combine with coordinates_q for exact results.
+    """
+    ranges = Q()
+    for low, high in cover_ranges(min_lat, min_lng, max_lat, max_lng, max_precision=max_precision):
+        condition = Q(**{f'{prefix}geohash__gte': low})
+        if high is not None:
+            condition &= Q(**{f'{prefix}geohash__lt': high})
+        ranges |= condition
+    return ranges
+
+
+def coordinates_q(min_lat, min_lng, max_lat, max_lng, prefix=''):
+    exact = Q(**{f'{prefix}location_lat__gte': min_lat, f'{prefix}location_lat__lte': max_lat})
+    if min_lng <= max_lng:
+        return exact & Q(**{f'{prefix}location_lng__gte': min_lng, f'{prefix}location_lng__lte': max_lng})
+    return exact & (Q(**{f'{prefix}location_lng__gte': min_lng}) | Q(**{f'{prefix}location_lng__lte': max_lng}))
+
+
+def bbox_q(min_lat, min_lng, max_lat, max_lng, prefix=''):
+    return (
+        geohash_q(min_lat, min_lng, max_lat, max_lng, prefix)
+        & coordinates_q(min_lat, min_lng, max_lat, max_lng, prefix)
+    )
+
+
+def filter_bbox(queryset, min_lat, min_lng, max_lat, max_lng):
+    """
+    Restrict a list queryset to a box. A sparse box is answered from the
+    geohash index and its few rows sorted; in a dense box so many rows match
+    that walking the list's ordering index and stopping after one page is
+    cheaper than sorting them all, so only the exact coordinates are applied.
+    Density is probed with a bounded, index-only count.
+    """
+    bbox = (min_lat, min_lng, max_lat, max_lng)
+    candidates = queryset.filter(geohash_q(*bbox)).values('id')[:DENSE_BBOX_ROWS].count()
+    if candidates < DENSE_BBOX_ROWS:
+        return queryset.filter(bbox_q(*bbox))
+    return queryset.filter(coordinates_q(*bbox))
+
+
+def nearest(lat, lng, radius_m, limit, fetch):
+    """
+    The `limit` closest points within radius_m as sorted (distance, id)
+    pairs. `fetch(bbox)` returns (id, lat, lng) rows inside a box. The
+    search starts small and widens, so dense areas never load every point
+    in a large radius.
+    """
+    search_radius = min(radius_m, NEARBY_START_RADIUS_M)
+    while True:
+        found = []
+        for point_id, point_lat, point_lng in fetch(radius_bbox(lat, lng, search_radius)):
+            distance = haversine_m(lat, lng, float(point_lat), float(point_lng))
+            if distance <= search_radius:
+                found.append((distance, point_id))
+        # Enough points inside the smaller circle means none further out can
+        # be among the nearest
+        if len(found) >= limit or search_radius >= radius_m:
+            return sorted(found)[:limit]
+        search_radius = min(search_radius * 4, radius_m)
+
+
+def parse_bbox(value):
+    """
+    Parse "min_lng,min_lat,max_lng,max_lat" (west, south, east, north, the
+    order map libraries use). Raises ValueError on anything malformed.
+    """
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox needs four comma-separated numbers")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise ValueError("bbox latitudes must be within -90..90 and south <= north")
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise ValueError("bbox longitudes must be within -180..180")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def radius_bbox(lat, lng, radius_m):
+    """
+    Bounding box (min_lat, min_lng, max_lat, max_lng) around a circle.
+    """
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    min_lat, max_lat = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return min_lat, -180.0, max_lat, 180.0
+    lng_delta = lat_delta / math.cos(math.radians(lat))
+    if lng_delta >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+    min_lng, max_lng = lng - lng_delta, lng + lng_delta
+    # Wrap across the antimeridian; cover_ranges splits such boxes
+    if min_lng < -180:
+        min_lng += 360
+    if max_lng > 180:
+        max_lng -= 360
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
@@ -0,0 +1,116 @@
+# citypulse_complaints/images.py
+import base64
+import io
+import math
+import time
+import warnings
+
+from django.conf import settings
+from django.core.signing import Signer
+from django.utils.crypto import constant_time_compare
+
+from .storage import get_blob_storage, sniff_content_type
+
+BLOB_URL_SALT = 'citypulse_complaints.blob-url'
+# Signed URLs stay valid between BLOB_URL_MAX_AGE and twice that
+DEFAULT_BLOB_URL_MAX_AGE = 3600
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def store_image(data):
+    """
+    Pop the base64 'image' (plain or a data: URL) from complaint data, put
+    the bytes in blob storage and fill in the image fields. Dimensions and
+    thumbnail are left for generate_complaint_thumbnail. Returns data.
+    """
+    image_base64 = data.pop('image', None)
+    if not image_base64 or not isinstance(image_base64, str):
+        return data
+    try:
+        header, base64_data = image_base64.split(',', 1) if ',' in image_base64 else ('', image_base64)
+        image = base64.b64decode(base64_data)
+    except Exception:
+        raise InvalidImage('Invalid base64 image data.')
+    data['image_digest'] = get_blob_storage().put(image)
+    data['image_content_type'] = sniff_content_type(image)
+    data['image_size'] = len(image)
+    data['image_width'] = None
+    data['image_height'] = None
+    data['thumbnail_digest'] = None
+    return data
+
+
+def make_thumbnail(data):
+    """
+    Decode an uploaded image once and return (width, height, thumbnail_jpeg).
+    Returns Nones when Pillow is not installed or the bytes are not an image.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None, None, None
+
+    size = getattr(settings, 'COMPLAINT_THUMBNAIL_SIZE', (256, 256))
+    try:
+        # Past MAX_IMAGE_PIXELS Pillow warns, and past twice that it raises;
+        # either way the upload is treated as undecodable
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(data)) as img:
+                width, height = img.size
+                img.thumbnail(size)
+                if img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                buffer = io.BytesIO()
+                img.save(buffer, format='JPEG', quality=80, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError, Image.DecompressionBombWarning):
+        return None, None, None
+    return width, height, buffer.getvalue()
+
+
+def sign_blob_path(path, expires):
+    return Signer(salt=BLOB_URL_SALT).signature(f'{path}:{expires}')
+
+
+def blob_url_expiry(now=None):
+    """
+    Expiry timestamp for URLs signed now, rounded up to a multiple of
+    BLOB_URL_MAX_AGE so a URL stays the same (and cacheable) for a while.
+    """
+    max_age = getattr(settings, 'BLOB_URL_MAX_AGE', DEFAULT_BLOB_URL_MAX_AGE)
+    now = time.time() if now is None else now
+    return math.ceil((now + max_age) / max_age) * max_age
+
+
+def blob_version(digest):
+    """
+    The `v` query parameter of blob URLs for this digest.
+    """
+    return digest[:16]
+
+
+def blob_url(request, path, digest):
+    """
+    Build a signed, cacheable URL for a blob endpoint. The signature lets
+    <img> tags load the image without an Authorization header until `exp`;
+    the digest changes whenever the image does, so clients never see a
+    stale copy.
+    """
+    expires = blob_url_expiry()
+    url = f'{path}?v={blob_version(digest)}&exp={expires}&sig={sign_blob_path(path, expires)}'
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def has_valid_blob_signature(request):
+    signature = request.query_params.get('sig', '')
+    try:
+        expires = int(request.query_params.get('exp', ''))
+    except ValueError:
+        return False
+    return (
+        bool(signature) and expires > time.time()
+        and constant_time_compare(signature, sign_blob_path(request.path, expires))
+    )
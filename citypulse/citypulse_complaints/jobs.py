@@ -0,0 +1,108 @@
+# citypulse_complaints/jobs.py
+from django.contrib.auth.models import User
+from django.utils import timezone
+from citypulse.cache import invalidate_scopes
+from citypulse_jobs.queue import job
+from citypulse_notifications.models import Notification
+from citypulse_notifications.utils import send_notifications
+from citypulse_users.roles import admin_user_ids
+from .images import make_thumbnail
+from .models import Complaint
+from .storage import get_blob_storage
+
+
+@job
+def generate_complaint_thumbnail(complaint_id):
+    """
+    Decode the uploaded image once and store its dimensions and thumbnail.
+    """
+    complaint = Complaint.objects.filter(id=complaint_id).only('id', 'image_digest').first()
+    if complaint is None or not complaint.image_digest:
+        return
+
+    storage = get_blob_storage()
+    width, height, thumbnail = make_thumbnail(storage.read(complaint.image_digest))
+    # Guard on the digest so a newer upload is never overwritten
+    Complaint.objects.filter(id=complaint_id, image_digest=complaint.image_digest).update(
+        image_width=width,
+        image_height=height,
+        thumbnail_digest=storage.put(thumbnail) if thumbnail else None,
+        updated_at=timezone.now(),
+    )
+    invalidate_scopes('complaints')
+
+
+def schedule_thumbnails(complaints):
+    """
+    Queue generate_complaint_thumbnail, on commit, for complaints that
+    were just given a new image.
+    """
+    for complaint in complaints:
+        if complaint.image_digest:
+            generate_complaint_thumbnail.enqueue_on_commit(complaint.id)
+
+
+@job
+def notify_complaint_created(complaint_id):
+    """
+    Notify the submitter and every admin about a new complaint in one INSERT.
+    Duplicates of an open complaint only notify the submitter; admins were
+    told about the original.
+    """
+    complaint = Complaint.objects.select_related('user').filter(id=complaint_id).first()
+    if complaint is None:
+        return
+
+    if complaint.duplicate_of_id is not None:
+        send_notifications([
+            Notification(
+                user=complaint.user,
+                message=(
+                    f"Your complaint '{complaint.title}' matches complaint #{complaint.duplicate_of_id}, "
+                    "which is already being handled. We've linked them."
+                ),
+                complaint=complaint
+            )
+        ])
+        return
+
+    admin_ids = admin_user_ids()
+    notifications = [
+        Notification(
+            user=complaint.user,
+            message=f"Your complaint '{complaint.title}' has been submitted.",
+            complaint=complaint
+        )
+    ]
+    notifications += [
+        Notification(
+            user_id=admin_id,
+            message=f"New complaint '{complaint.title}' created by {complaint.user.username}.",
+            complaint=complaint
+        )
+        for admin_id in admin_ids
+    ]
+    send_notifications(notifications)
+
+
+@job
+def notify_complaints_imported(user_id, complaint_ids):
+    """
+    One notification per recipient for a bulk import: the submitter and
+    each admin hear about the batch once, not once per complaint.
+    """
+    if len(complaint_ids) == 1:
+        notify_complaint_created(complaint_ids[0])
+        return
+    user = User.objects.filter(id=user_id).first()
+    if user is None or not complaint_ids:
+        return
+
+    count = len(complaint_ids)
+    notifications = [Notification(user=user, message=f"Your {count} complaints have been submitted.")]
+    admin_ids = [admin_id for admin_id in admin_user_ids() if admin_id != user_id]
+    notifications += [
+        Notification(user_id=admin_id, message=f"{count} new complaints created by {user.username}.")
+        for admin_id in admin_ids
+    ]
+    send_notifications(notifications)
@@ -0,0 +1,94 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from citypulse_complaints.models import Complaint
+from citypulse_users.models import Profile
+from citypulse_workers.assignment import worker_load_index
+from citypulse_workers.models import Worker
+
+CENTRE_LAT, CENTRE_LNG = 17.385, 78.4867
+SPREAD = 0.35
+CATEGORIES = ['garbage', 'road', 'water', 'lights']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the single-item and bulk complaint creation and task assignment "
+        "endpoints in a throwaway test database (the project database is not touched)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=40)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Requests go through the test client, which calls itself "testserver"
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                self.run(random.Random(options['seed']), options['complaints'], options['workers'])
+        finally:
+            worker_load_index.invalidate()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def items(self, rng, count):
+        return [
+            {
+                'title': f'Complaint {index}', 'description': 'Reported during the benchmark',
+                'location_lat': f'{CENTRE_LAT + rng.uniform(-SPREAD, SPREAD):.6f}',
+                'location_lng': f'{CENTRE_LNG + rng.uniform(-SPREAD, SPREAD):.6f}',
+                'category': rng.choice(CATEGORIES), 'severity': rng.choice(['low', 'medium', 'high']),
+            }
+            for index in range(count)
+        ]
+
+    def report(self, label, count, single, bulk):
+        self.stdout.write(
+            f"{label:10} single {count / single:8.0f}/s   bulk {count / bulk:8.0f}/s   "
+            f"({single / bulk:.1f}x)"
+        )
+
+    def run(self, rng, count, worker_count):
+        user = User.objects.create_user(username='importer')
+        Profile.objects.create(user=user, role='admin')
+        client = APIClient()
+        client.force_authenticate(user)
+        for index in range(worker_count):
+            Worker.objects.create(
+                user=User.objects.create_user(username=f'worker{index}'), name=f'worker{index}', phone='555-0100',
+                specialization=CATEGORIES[index % 4],
+            )
+
+        started = time.perf_counter()
+        for item in self.items(rng, count):
+            response = client.post('/complaints-create/', item, format='json')
+            assert response.status_code == 201, response.content
+        single = time.perf_counter() - started
+        single_ids = list(Complaint.objects.order_by('id').values_list('id', flat=True))
+
+        started = time.perf_counter()
+        response = client.post('/complaints/bulk/', self.items(rng, count), format='json')
+        bulk = time.perf_counter() - started
+        assert response.status_code == 201
+        self.report('create', count, single, bulk)
+
+        worker_load_index.invalidate()
+        started = time.perf_counter()
+        for complaint_id in single_ids:
+            # 409 when no worker fits is still a completed request
+            assert client.post('/task/assign/', {'complaint_id': complaint_id}, format='json').status_code in (201, 409)
+        single = time.perf_counter() - started
+
+        started = time.perf_counter()
+        items = [{'complaint_id': complaint_id} for complaint_id in response.data['ids']]
+        assert client.post('/tasks/bulk-assign/', items, format='json').status_code == 201
+        bulk = time.perf_counter() - started
+        self.report('assign', count, single, bulk)
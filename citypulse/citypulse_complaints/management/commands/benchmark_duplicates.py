@@ -0,0 +1,143 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from citypulse_complaints.duplicates import DUPLICATE_RADIUS_M, pick_canonical
+from citypulse_complaints.geo import cover_ranges, encode, radius_bbox
+from citypulse_complaints.minhash import text_signature
+
+CENTRE_LAT, CENTRE_LNG = 17.385, 78.4867
+SPREAD = 0.35
+CATEGORIES = ['garbage', 'road', 'water', 'lights']
+WORDS = (
+    "pothole road broken street light water leak pipe garbage bin overflowing drain sewage "
+    "footpath signal junction market school bus stop near opposite behind since week days "
+    "night dark deep dangerous smell blocked traffic accident children people colony lane"
+).split()
+
+SCHEMA = """
+CREATE TABLE complaint (
+    id INTEGER PRIMARY KEY,
+    location_lat decimal NOT NULL,
+    location_lng decimal NOT NULL,
+    geohash varchar(12) NOT NULL,
+    category varchar(20) NOT NULL,
+    status varchar(20) NOT NULL,
+    duplicate_of_id bigint NULL
+);
+CREATE TABLE complaint_signature (
+    complaint_id INTEGER PRIMARY KEY,
+    minhash BLOB NOT NULL
+);
+"""
+GEOHASH_INDEX = "CREATE INDEX complaint_geohash_idx ON complaint (geohash, location_lat, location_lng)"
+INSERT = (
+    "INSERT INTO complaint (location_lat, location_lng, geohash, category, status, duplicate_of_id) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+INSERT_SIGNATURE = "INSERT INTO complaint_signature (complaint_id, minhash) VALUES (?, ?)"
+
+
+def random_text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 8))), ' '.join(
+        rng.choice(WORDS) for _ in range(rng.randint(10, 30))
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark duplicate detection per insert against a scratch SQLite "
+        "database of open complaints (the project database is not touched)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500_000)
+        parser.add_argument('--inserts', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(path)
+            connection.executescript(SCHEMA)
+            self.populate(connection, rng, options['rows'])
+            self.run(connection, rng, options['inserts'])
+            connection.close()
+        finally:
+            os.remove(path)
+
+    def point(self, rng):
+        lat = round(CENTRE_LAT + rng.uniform(-SPREAD, SPREAD), 6)
+        lng = round(CENTRE_LNG + rng.uniform(-SPREAD, SPREAD), 6)
+        return lat, lng
+
+    def populate(self, connection, rng, rows):
+        started = time.perf_counter()
+        batch, signatures = [], []
+        self.samples = []
+        for index in range(rows):
+            lat, lng = self.point(rng)
+            category = rng.choice(CATEGORIES)
+            title, description = random_text(rng)
+            if index % 1000 == 0:
+                # Reported again during the run
+                self.samples.append((lat, lng, category, title, description))
+            batch.append((lat, lng, encode(lat, lng), category, 'pending', None))
+            signatures.append((index + 1, text_signature(title, description)))
+            if len(batch) == 50_000:
+                connection.executemany(INSERT, batch)
+                connection.executemany(INSERT_SIGNATURE, signatures)
+                batch, signatures = [], []
+        if batch:
+            connection.executemany(INSERT, batch)
+            connection.executemany(INSERT_SIGNATURE, signatures)
+        connection.execute(GEOHASH_INDEX)
+        connection.commit()
+        self.stdout.write(f"Inserted {rows} open complaints in {time.perf_counter() - started:.1f}s")
+
+    def run(self, connection, rng, inserts):
+        timings, linked = [], 0
+        for index in range(inserts):
+            if index % 5 == 0:
+                # A repeat report: an existing complaint's text, a few metres away
+                lat, lng, category, title, description = rng.choice(self.samples)
+                lat, lng = lat + rng.uniform(-0.0002, 0.0002), lng + rng.uniform(-0.0002, 0.0002)
+            else:
+                lat, lng = self.point(rng)
+                category = rng.choice(CATEGORIES)
+                title, description = random_text(rng)
+
+            started = time.perf_counter()
+            # Same work as saving a complaint and calling link_duplicate()
+            signature = text_signature(title, description)
+            bbox = radius_bbox(lat, lng, DUPLICATE_RADIUS_M)
+            clauses, params = [], []
+            for low, high in cover_ranges(*bbox):
+                clauses.append("(geohash >= ? AND geohash < ?)" if high else "geohash >= ?")
+                params.extend([low, high] if high else [low])
+            candidates = connection.execute(
+                "SELECT id, location_lat, location_lng, category, status, duplicate_of_id, minhash "
+                "FROM complaint LEFT JOIN complaint_signature ON complaint_id = id "
+                f"WHERE ({' OR '.join(clauses)}) "
+                "AND location_lat >= ? AND location_lat <= ? AND location_lng >= ? AND location_lng <= ?",
+                params + [bbox[0], bbox[2], bbox[1], bbox[3]],
+            ).fetchall()
+            canonical = pick_canonical(lat, lng, category, signature, candidates)
+            cursor = connection.execute(INSERT, (lat, lng, encode(lat, lng), category, 'pending', canonical))
+            connection.execute(INSERT_SIGNATURE, (cursor.lastrowid, signature))
+            timings.append((time.perf_counter() - started) * 1000)
+            linked += canonical is not None
+        connection.rollback()
+
+        timings.sort()
+        self.stdout.write(
+            f"{inserts} inserts: median {timings[len(timings) // 2]:.2f}ms, "
+            f"p99 {timings[int(len(timings) * 0.99)]:.2f}ms, max {timings[-1]:.2f}ms; "
+            f"{linked} linked as duplicates"
+        )
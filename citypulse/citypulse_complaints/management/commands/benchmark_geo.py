@@ -0,0 +1,147 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from citypulse_complaints.geo import DENSE_BBOX_ROWS, cover_ranges, encode, haversine_m, nearest, radius_bbox
+
+# Hyderabad-sized spread around the city centre
+CENTRE_LAT, CENTRE_LNG = 17.385, 78.4867
+SPREAD = 0.35
+
+SCHEMA = """
+CREATE TABLE complaint (
+    id INTEGER PRIMARY KEY,
+    location_lat decimal NOT NULL,
+    location_lng decimal NOT NULL,
+    geohash varchar(12) NOT NULL,
+    created_at datetime NOT NULL
+);
+CREATE INDEX complaint_created_idx ON complaint (created_at DESC, id DESC);
+"""
+GEOHASH_INDEX = "CREATE INDEX complaint_geohash_idx ON complaint (geohash, location_lat, location_lng)"
+
+
+def ranges_sql(bbox):
+    clauses, params = [], []
+    for low, high in cover_ranges(*bbox):
+        if high is None:
+            clauses.append("geohash >= ?")
+            params.append(low)
+        else:
+            clauses.append("(geohash >= ? AND geohash < ?)")
+            params.extend([low, high])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ?bbox= and /complaints/nearby/ lookups against a scratch "
+        "SQLite database of synthetic complaints (the project database is not touched)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(path)
+            connection.executescript(SCHEMA)
+            self.populate(connection, rng, options['rows'])
+            self.run(connection, rng, options['repeat'])
+            connection.close()
+        finally:
+            os.remove(path)
+
+    def populate(self, connection, rng, rows):
+        started = time.perf_counter()
+        batch = []
+        for index in range(rows):
+            lat = round(CENTRE_LAT + rng.uniform(-SPREAD, SPREAD), 6)
+            lng = round(CENTRE_LNG + rng.uniform(-SPREAD, SPREAD), 6)
+            batch.append((lat, lng, encode(lat, lng), f"2026-01-01 00:00:{index:09d}"))
+            if len(batch) == 50_000:
+                connection.executemany(
+                    "INSERT INTO complaint (location_lat, location_lng, geohash, created_at) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+                batch = []
+        if batch:
+            connection.executemany(
+                "INSERT INTO complaint (location_lat, location_lng, geohash, created_at) VALUES (?, ?, ?, ?)",
+                batch,
+            )
+        connection.execute(GEOHASH_INDEX)
+        connection.commit()
+        self.stdout.write(f"Inserted {rows} rows in {time.perf_counter() - started:.1f}s")
+
+    def timed(self, repeat, func):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - started) / repeat * 1000, result
+
+    def run(self, connection, rng, repeat):
+        # Same SQL shapes the ORM emits for filter_bbox() and nearest()
+        exact = "location_lat BETWEEN ? AND ? AND location_lng BETWEEN ? AND ?"
+        page = " ORDER BY created_at DESC, id DESC LIMIT 51"
+
+        def query(sql, params):
+            return connection.execute(sql, params).fetchall()
+
+        for label, half_size in [('street (~1km)', 0.005), ('district (~10km)', 0.05), ('city (~40km)', 0.2)]:
+            lat = CENTRE_LAT + rng.uniform(-0.1, 0.1)
+            lng = CENTRE_LNG + rng.uniform(-0.1, 0.1)
+            bbox = (lat - half_size, lng - half_size, lat + half_size, lng + half_size)
+            exact_params = [bbox[0], bbox[2], bbox[1], bbox[3]]
+            ranges, range_params = ranges_sql(bbox)
+
+            def full_scan():
+                return query(f"SELECT id FROM complaint NOT INDEXED WHERE {exact}{page}", exact_params)
+
+            def filtered():
+                probe = query(
+                    f"SELECT COUNT(*) FROM (SELECT id FROM complaint WHERE {ranges} LIMIT {DENSE_BBOX_ROWS})",
+                    range_params,
+                )[0][0]
+                if probe < DENSE_BBOX_ROWS:
+                    return query(f"SELECT id FROM complaint WHERE {ranges} AND {exact}{page}", range_params + exact_params)
+                return query(f"SELECT id FROM complaint WHERE {exact}{page}", exact_params)
+
+            scan_ms, scanned = self.timed(repeat, full_scan)
+            index_ms, indexed = self.timed(repeat, filtered)
+            assert scanned == indexed
+            self.stdout.write(f"bbox {label:18} full scan {scan_ms:8.2f}ms  indexed {index_ms:8.2f}ms")
+
+        for radius in (250, 1000, 5000, 50000):
+            lat = CENTRE_LAT + rng.uniform(-0.1, 0.1)
+            lng = CENTRE_LNG + rng.uniform(-0.1, 0.1)
+
+            def full_scan():
+                rows = query("SELECT id, location_lat, location_lng FROM complaint", [])
+                return sorted(
+                    (distance, complaint_id)
+                    for complaint_id, complaint_lat, complaint_lng in rows
+                    for distance in [haversine_m(lat, lng, complaint_lat, complaint_lng)]
+                    if distance <= radius
+                )[:200]
+
+            def fetch(bbox):
+                ranges, range_params = ranges_sql(bbox)
+                return query(
+                    f"SELECT id, location_lat, location_lng FROM complaint WHERE {ranges} AND {exact}",
+                    range_params + [bbox[0], bbox[2], bbox[1], bbox[3]],
+                )
+
+            scan_ms, scanned = self.timed(max(1, repeat // 5), full_scan)
+            index_ms, indexed = self.timed(repeat, lambda: nearest(lat, lng, radius, 200, fetch))
+            assert scanned == indexed
+            self.stdout.write(f"nearby {radius:>6}m          full scan {scan_ms:8.2f}ms  indexed {index_ms:8.2f}ms")
@@ -0,0 +1,145 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from citypulse_complaints.search import facet_sql, parse_query, search_sql, sqlite_index_sql
+
+CATEGORIES = ['garbage', 'road', 'water', 'lights']
+SEVERITIES = ['low', 'medium', 'high']
+STATUSES = ['pending', 'assigned', 'in_progress', 'resolved', 'rejected']
+WORDS = (
+    "pothole road broken street light water leak pipe garbage bin overflowing drain sewage "
+    "footpath signal junction market school bus stop near opposite behind since week days "
+    "night dark deep dangerous smell blocked traffic accident children people colony lane"
+).split()
+# Rare words show up in about one complaint in RARE_EVERY
+RARE_WORDS = ['manhole', 'transformer', 'borewell', 'flyover']
+RARE_EVERY = 2000
+
+SCHEMA = """
+CREATE TABLE complaint (
+    id INTEGER PRIMARY KEY,
+    title varchar(100) NOT NULL,
+    description text NOT NULL,
+    category varchar(20) NOT NULL,
+    severity varchar(10) NOT NULL,
+    status varchar(20) NOT NULL
+);
+"""
+INSERT = "INSERT INTO complaint (title, description, category, severity, status) VALUES (?, ?, ?, ?, ?)"
+QUERIES = [
+    ('common word', 'road', {}),
+    ('two words', 'water leak', {}),
+    ('rare word', 'manhole', {}),
+    ('short prefix', 'tr', {}),
+    ('long prefix', 'overfl', {}),
+    ('filtered', 'dark night', {'category': ['lights'], 'status': ['pending']}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark complaint search against a scratch SQLite database of "
+        "synthetic complaints, FTS5 against LIKE scans (the project database "
+        "is not touched)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(path)
+            connection.executescript(SCHEMA)
+            self.populate(connection, rng, options['rows'])
+            self.run(connection, options['repeat'])
+            connection.close()
+        finally:
+            os.remove(path)
+
+    def text(self, rng, index, low, high):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+        if index % RARE_EVERY == 0:
+            words[rng.randrange(len(words))] = rng.choice(RARE_WORDS)
+        return ' '.join(words)
+
+    def populate(self, connection, rng, rows):
+        started = time.perf_counter()
+        for statement in sqlite_index_sql('complaint', 'complaint_search'):
+            connection.execute(statement)
+        batch = []
+        for index in range(rows):
+            batch.append((
+                self.text(rng, index, 3, 8), self.text(rng, index + 1, 10, 30),
+                rng.choice(CATEGORIES), rng.choice(SEVERITIES), rng.choice(STATUSES),
+            ))
+            if len(batch) == 50_000:
+                connection.executemany(INSERT, batch)
+                batch = []
+        if batch:
+            connection.executemany(INSERT, batch)
+        connection.commit()
+        size = connection.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'complaint_search%'"
+        ).fetchone()[0] if self.has_dbstat(connection) else None
+        self.stdout.write(
+            f"Inserted and indexed {rows} complaints in {time.perf_counter() - started:.1f}s"
+            + (f"; index {size / 2 ** 20:.0f} MiB" if size else "")
+        )
+
+    def has_dbstat(self, connection):
+        try:
+            connection.execute("SELECT 1 FROM dbstat LIMIT 1")
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def timed(self, repeat, func):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - started) / repeat * 1000, result
+
+    def run(self, connection, repeat):
+        def execute(sql, params):
+            return connection.execute(sql.replace('%s', '?'), params).fetchall()
+
+        for label, text, filters in QUERIES:
+            terms = parse_query(text)
+
+            def like_scan():
+                # What a naive icontains search costs: every row, every time
+                clauses, params = [], []
+                for term, prefix in terms:
+                    pattern = f'%{term}%'
+                    clauses.append("(title LIKE ? OR description LIKE ?)")
+                    params += [pattern, pattern]
+                for field, values in filters.items():
+                    clauses.append(f"{field} IN ({', '.join('?' * len(values))})")
+                    params += values
+                return connection.execute(
+                    f"SELECT COUNT(*) FROM complaint WHERE {' AND '.join(clauses)}", params
+                ).fetchone()[0]
+
+            def page():
+                return execute(*search_sql('sqlite', terms, filters, 20, 0, 'complaint', 'complaint_search'))
+
+            def facets():
+                return execute(*facet_sql('sqlite', terms, 'complaint', 'complaint_search'))
+
+            scan_ms, matches = self.timed(max(1, repeat // 5), like_scan)
+            page_ms, _ = self.timed(repeat, page)
+            facet_ms, _ = self.timed(repeat, facets)
+            self.stdout.write(
+                f"{label:13} ({matches:>7} LIKE matches)  LIKE scan {scan_ms:8.1f}ms  "
+                f"FTS page {page_ms:7.1f}ms  facets {facet_ms:7.1f}ms"
+            )
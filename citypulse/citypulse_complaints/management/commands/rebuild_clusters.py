@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from citypulse_complaints.clusters import rebuild_cells
+from citypulse_complaints.models import Complaint, ComplaintCell
+
+
+class Command(BaseCommand):
+    help = "Recount the precomputed map cluster cells from the complaints table."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_cells(Complaint, ComplaintCell)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {ComplaintCell.objects.count()} cluster cell(s)."))
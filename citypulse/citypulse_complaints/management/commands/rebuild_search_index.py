@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from citypulse_complaints.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the complaint full-text search index and re-read every complaint into it."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            install_search_index(connection)
+            rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the complaint search index."))
@@ -0,0 +1,67 @@
+from django.db import migrations, models
+
+
+def move_images_to_blob_storage(apps, schema_editor):
+    from citypulse_complaints.storage import get_blob_storage, sniff_content_type
+
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    storage = get_blob_storage()
+    complaints = (
+        Complaint.objects.exclude(image__isnull=True)
+        .only('id', 'image')
+        .iterator(chunk_size=100)
+    )
+    for complaint in complaints:
+        data = bytes(complaint.image)
+        if not data:
+            continue
+        Complaint.objects.filter(id=complaint.id).update(
+            image_digest=storage.put(data),
+            image_content_type=sniff_content_type(data),
+            image_size=len(data),
+        )
+
+
+def move_images_back_to_table(apps, schema_editor):
+    from citypulse_complaints.storage import get_blob_storage
+
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    storage = get_blob_storage()
+    complaints = (
+        Complaint.objects.exclude(image_digest__isnull=True)
+        .only('id', 'image_digest')
+        .iterator(chunk_size=100)
+    )
+    for complaint in complaints:
+        if storage.exists(complaint.image_digest):
+            Complaint.objects.filter(id=complaint.id).update(image=storage.read(complaint.image_digest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0007_complaint_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='image_digest',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='image_content_type',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='image_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(move_images_to_blob_storage, move_images_back_to_table),
+        migrations.RemoveField(
+            model_name='complaint',
+            name='image',
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+def generate_thumbnails(apps, schema_editor):
+    from citypulse_complaints.images import make_thumbnail
+    from citypulse_complaints.storage import get_blob_storage
+
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    storage = get_blob_storage()
+    complaints = (
+        Complaint.objects.exclude(image_digest__isnull=True)
+        .only('id', 'image_digest')
+        .iterator(chunk_size=100)
+    )
+    for complaint in complaints:
+        if not storage.exists(complaint.image_digest):
+            continue
+        width, height, thumbnail = make_thumbnail(storage.read(complaint.image_digest))
+        if thumbnail is None:
+            continue
+        Complaint.objects.filter(id=complaint.id).update(
+            image_width=width,
+            image_height=height,
+            thumbnail_digest=storage.put(thumbnail),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0008_move_complaint_images_to_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='thumbnail_digest',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(generate_thumbnails, migrations.RunPython.noop),
+    ]
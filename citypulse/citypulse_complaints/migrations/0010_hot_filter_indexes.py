@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0009_complaint_image_dimensions_and_thumbnail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-created_at', '-id'], name='complaint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='complaint_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='complaint_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from citypulse_complaints.geo import encode
+
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    complaints = Complaint.objects.only('id', 'location_lat', 'location_lng').iterator(chunk_size=1000)
+    batch = []
+    for complaint in complaints:
+        complaint.geohash = encode(complaint.location_lat, complaint.location_lng)
+        batch.append(complaint)
+        if len(batch) == 1000:
+            Complaint.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0010_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['geohash', 'location_lat', 'location_lng'], name='complaint_geohash_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+def build_cells(apps, schema_editor):
+    from citypulse_complaints.clusters import rebuild_cells
+
+    rebuild_cells(
+        apps.get_model('citypulse_complaints', 'Complaint'),
+        apps.get_model('citypulse_complaints', 'ComplaintCell'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0011_complaint_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('geohash', models.CharField(max_length=12)),
+                ('category', models.CharField(choices=[('garbage', 'Garbage'), ('road', 'Road'), ('water', 'Water'), ('lights', 'Street Lights')], max_length=20)),
+                ('severity', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['precision', 'geohash'], name='complaint_cell_precision_idx')],
+                'constraints': [models.UniqueConstraint(fields=('geohash', 'category', 'severity', 'status'), name='complaint_cell_unique')],
+            },
+        ),
+        migrations.RunPython(build_cells, migrations.RunPython.noop),
+    ]
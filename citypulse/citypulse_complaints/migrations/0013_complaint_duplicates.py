@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_text_signatures(apps, schema_editor):
+    from citypulse_complaints.minhash import text_signature
+
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    complaints = Complaint.objects.only('id', 'title', 'description').iterator(chunk_size=1000)
+    batch = []
+    for complaint in complaints:
+        complaint.text_signature = text_signature(complaint.title, complaint.description)
+        batch.append(complaint)
+        if len(batch) == 1000:
+            Complaint.objects.bulk_update(batch, ['text_signature'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['text_signature'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0012_complaint_cells'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='citypulse_complaints.complaint'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='text_signature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_text_signatures, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('duplicate_of__isnull', False)), fields=['duplicate_of'], name='complaint_duplicate_of_idx'),
+        ),
+    ]
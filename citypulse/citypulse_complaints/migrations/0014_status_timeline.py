@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_status_history(apps, schema_editor):
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    ComplaintStatus = apps.get_model('citypulse_complaints', 'ComplaintStatus')
+
+    latest = {}
+    for complaint_id, status in (
+        ComplaintStatus.objects.order_by('complaint_id', 'updated_at', 'id')
+        .values_list('complaint_id', 'status').iterator(chunk_size=1000)
+    ):
+        latest[complaint_id] = status
+
+    missing, stale = [], []
+    for complaint_id, status in Complaint.objects.values_list('id', 'status').iterator(chunk_size=1000):
+        if complaint_id not in latest:
+            missing.append(ComplaintStatus(complaint_id=complaint_id, status=status))
+        elif latest[complaint_id] != status:
+            stale.append(ComplaintStatus(complaint_id=complaint_id, status=status))
+
+    ComplaintStatus.objects.bulk_create(stale, batch_size=1000)
+    # A complaint without history starts its timeline when it was filed
+    created = ComplaintStatus.objects.bulk_create(missing, batch_size=1000)
+    ComplaintStatus.objects.filter(id__in=[entry.id for entry in created]).update(
+        updated_at=Subquery(Complaint.objects.filter(id=OuterRef('complaint_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0013_complaint_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaintstatus',
+            index=models.Index(fields=['complaint', 'updated_at', 'id'], name='complaint_status_timeline_idx'),
+        ),
+        migrations.RunPython(backfill_status_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from citypulse_complaints.search import install_search_index, rebuild_search_index
+
+    install_search_index(schema_editor.connection)
+    rebuild_search_index(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    from citypulse_complaints.search import drop_search_index
+
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0014_status_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
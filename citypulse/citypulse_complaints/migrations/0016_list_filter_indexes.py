@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0015_complaint_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='complaint_category_created_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_signatures(apps, schema_editor):
+    # Recomputed rather than copied: the hash functions changed too
+    from citypulse_complaints.minhash import text_signature
+
+    Complaint = apps.get_model('citypulse_complaints', 'Complaint')
+    ComplaintSignature = apps.get_model('citypulse_complaints', 'ComplaintSignature')
+    complaints = Complaint.objects.only('id', 'title', 'description').iterator(chunk_size=1000)
+    batch = []
+    for complaint in complaints:
+        signature = text_signature(complaint.title, complaint.description)
+        if signature is not None:
+            batch.append(ComplaintSignature(complaint_id=complaint.id, minhash=signature))
+        if len(batch) == 1000:
+            ComplaintSignature.objects.bulk_create(batch)
+            batch = []
+    ComplaintSignature.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0017_complaint_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSignature',
+            fields=[
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='citypulse_complaints.complaint')),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='complaint',
+            name='text_signature',
+        ),
+        migrations.RunPython(backfill_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# citypulse_complaints/minhash.py
+"""
+MinHash signatures of short texts. Every character shingle of the text is
+hashed by NUM_HASHES independent hash functions, 32-bit words of BLAKE2b
+digests keyed with a different salt per group of HASHES_PER_DIGEST; a
+signature is the minimum of each function over the shingles. The share of
+equal positions in two signatures estimates the Jaccard similarity of
+their shingle sets.
+"""
+import hashlib
+import re
+import struct
+
+SHINGLE_SIZE = 4
+# Long descriptions add little signal, and bound the hashing cost
+MAX_SIGNATURE_TEXT = 1000
+NUM_HASHES = 32
+# A 64-byte digest holds sixteen 32-bit hash values
+HASHES_PER_DIGEST = 16
+# Fixed, since stored signatures must stay comparable
+_SALTS = [f'minhash{index}'.encode() for index in range(NUM_HASHES // HASHES_PER_DIGEST)]
+_DIGEST = struct.Struct(f'<{HASHES_PER_DIGEST}I')
+_SIGNATURE = struct.Struct(f'<{NUM_HASHES}I')
+WORD_RE = re.compile(r'\w+')
+
+
+def shingles(text):
+    normalized = ' '.join(WORD_RE.findall(text.lower()))[:MAX_SIGNATURE_TEXT]
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[index:index + SHINGLE_SIZE] for index in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def shingle_hashes(shingle):
+    data = shingle.encode()
+    values = ()
+    for salt in _SALTS:
+        values += _DIGEST.unpack(hashlib.blake2b(data, salt=salt).digest())
+    return values
+
+
+def text_signature(title, description):
+    """
+    MinHash signature of a complaint's text as bytes, or None if it has no
+    words at all.
+    """
+    hashes = [shingle_hashes(shingle) for shingle in shingles(f'{title} {description}')]
+    if not hashes:
+        return None
+    return _SIGNATURE.pack(*map(min, zip(*hashes)))
+
+
+def similarity(signature, other):
+    """
+    Estimated Jaccard similarity of the shingle sets behind two signatures.
+    """
+    matches = sum(a == b for a, b in zip(_SIGNATURE.unpack(bytes(signature)), _SIGNATURE.unpack(bytes(other))))
+    return matches / NUM_HASHES
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from .geo import encode as geohash_encode
+from .minhash import text_signature
 
 class Complaint(models.Model):
     CATEGORY_CHOICES = [
@@ -17,19 +19,116 @@ class Complaint(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=100)
     description = models.TextField()
-    image = models.BinaryField(null=True, blank=True)
+    # Image bytes live in the blob store (see storage.py), keyed by SHA-256
+    image_digest = models.CharField(max_length=64, null=True, blank=True)
+    image_content_type = models.CharField(max_length=50, null=True, blank=True)
+    image_size = models.PositiveIntegerField(null=True, blank=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail_digest = models.CharField(max_length=64, null=True, blank=True)
     location_lat = models.DecimalField(max_digits=9, decimal_places=6)
     location_lng = models.DecimalField(max_digits=9, decimal_places=6)
+    # Derived from the coordinates on save; see geo.py
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every write, queryset updates included; drives ?since= sync
+    updated_at = models.DateTimeField(auto_now=True)
     status= models.CharField(max_length=20, default='pending')
+    # Set when the complaint is recognised as a repeat report; see duplicates.py
+    duplicate_of = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='duplicates',
+        # Indexed below for non-null values only; almost every row is NULL
+        db_index=False,
+    )
+    # MinHash of title + description, derived on save and stored in
+    # ComplaintSignature to keep the blob out of the row; not loaded with it
+    text_signature = None
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order for /complaints/
+            models.Index(fields=['-created_at', '-id'], name='complaint_created_idx'),
+            # /complaints/user/
+            models.Index(fields=['user', '-created_at', '-id'], name='complaint_user_created_idx'),
+            # Status filtered lists, newest first
+            models.Index(fields=['status', '-created_at', '-id'], name='complaint_status_created_idx'),
+            # ?category= filtered lists
+            models.Index(fields=['category', '-created_at', '-id'], name='complaint_category_created_idx'),
+            # ?since= sync, all complaints and one user's
+            models.Index(fields=['updated_at', 'id'], name='complaint_updated_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='complaint_user_updated_idx'),
+            # ?bbox= and /complaints/nearby/ range scans; covering, so
+            # candidates are checked against the coordinates without row lookups
+            models.Index(fields=['geohash', 'location_lat', 'location_lng'], name='complaint_geohash_idx'),
+            models.Index(
+                fields=['duplicate_of'],
+                condition=models.Q(duplicate_of__isnull=False),
+                name='complaint_duplicate_of_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    def set_geohash(self):
+        self.geohash = geohash_encode(self.location_lat, self.location_lng)
+
+    def set_text_signature(self):
+        self.text_signature = text_signature(self.title, self.description)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        derived = set()
+        if update_fields is None or {'location_lat', 'location_lng'} & set(update_fields):
+            self.set_geohash()
+            derived.add('geohash')
+        text_changed = update_fields is None or bool({'title', 'description'} & set(update_fields))
+        if text_changed:
+            self.set_text_signature()
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *derived, 'updated_at'}
+        super().save(*args, **kwargs)
+        if text_changed:
+            if self.text_signature is not None:
+                save_text_signatures([self], replace=not adding)
+            elif not adding:
+                ComplaintSignature.objects.filter(complaint_id=self.id).delete()
     
     
     
+class ComplaintSignature(models.Model):
+    """
+    A complaint's MinHash signature (see minhash.py), read by duplicate
+    detection for the handful of complaints around a new one. Complaints
+    without words have none.
+    """
+    complaint = models.OneToOneField(Complaint, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+
+    def __str__(self):
+        return f"Signature of complaint #{self.complaint_id}"
+
+
+def save_text_signatures(complaints, replace=False):
+    """
+    Store the signatures set by set_text_signature() with one INSERT, or
+    one upsert when `replace` is set for complaints that may have one.
+    """
+    rows = [
+        ComplaintSignature(complaint_id=complaint.id, minhash=complaint.text_signature)
+        for complaint in complaints if complaint.text_signature is not None
+    ]
+    if replace:
+        ComplaintSignature.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['complaint'], update_fields=['minhash'],
+        )
+    else:
+        ComplaintSignature.objects.bulk_create(rows)
+
+
 class ComplaintStatus(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -43,5 +142,38 @@ class ComplaintStatus(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     updated_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A complaint's timeline in order, straight from the index
+            models.Index(fields=['complaint', 'updated_at', 'id'], name='complaint_status_timeline_idx'),
+        ]
+
     def __str__(self):
         return f"{self.complaint.title} - {self.status}"
+
+
+class ComplaintCell(models.Model):
+    """
+    Precomputed complaint counts per geohash cell, one row per
+    (cell, category, severity, status) at every clustering precision.
+    Kept current by the signals in signals.py; see clusters.py.
+    """
+    precision = models.PositiveSmallIntegerField()
+    geohash = models.CharField(max_length=12)
+    category = models.CharField(max_length=20, choices=Complaint.CATEGORY_CHOICES)
+    severity = models.CharField(max_length=10, choices=Complaint.SEVERITY_CHOICES)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['geohash', 'category', 'severity', 'status'], name='complaint_cell_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['precision', 'geohash'], name='complaint_cell_precision_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.geohash} {self.category}/{self.severity}/{self.status}: {self.count}"
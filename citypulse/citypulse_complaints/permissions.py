@@ -0,0 +1,26 @@
+from rest_framework.permissions import BasePermission
+from citypulse_users.roles import get_user_role
+from .images import has_valid_blob_signature
+
+class HasBlobSignature(BasePermission):
+    """
+    Allows access to blob endpoints through a signed URL issued by the API.
+    """
+    def has_permission(self, request, view):
+        return has_valid_blob_signature(request)
+
+
+class IsAdminOrAssignedWorker(BasePermission):
+    """
+    Allows admins, and workers with a task on the complaint named by the
+    view's complaint_id, e.g. to move it through its status transitions.
+    """
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        if get_user_role(request.user, request.auth) == 'admin':
+            return True
+        from citypulse_workers.models import AssignedTask
+        return AssignedTask.objects.filter(
+            complaint_id=view.kwargs.get('complaint_id'), worker__user=request.user
+        ).exists()
@@ -0,0 +1,216 @@
+# citypulse_complaints/search.py
+"""
+Full-text search over complaint titles and descriptions. On SQLite an
+external-content FTS5 table indexes the complaints table and triggers keep
+it in step with every write, bulk ones included; on PostgreSQL a stored,
+generated tsvector column with a GIN index does the same job. Titles weigh
+more than descriptions in the ranking. Facet counts come from one GROUP BY
+over the matches, so each facet can ignore its own filter (picking one
+category still shows how many matches the other categories have).
+"""
+import re
+
+from .models import Complaint, ComplaintStatus
+
+SEARCH_TABLE = 'citypulse_complaints_search'
+SEARCH_COLUMN = 'search_vector'
+# Relative weight of a title hit against a description hit (SQLite bm25)
+TITLE_WEIGHT = 10.0
+MAX_SEARCH_TERMS = 10
+# Databases with a search index; see install_search_index()
+SEARCH_VENDORS = ('sqlite', 'postgresql')
+TERM_RE = re.compile(r'([^\W_]+)(\*?)')
+FACETS = {
+    'category': {value for value, _ in Complaint.CATEGORY_CHOICES},
+    'severity': {value for value, _ in Complaint.SEVERITY_CHOICES},
+    'status': {value for value, _ in ComplaintStatus.STATUS_CHOICES},
+}
+
+
+def sqlite_index_sql(content_table, search_table=SEARCH_TABLE):
+    """
+    Statements creating the FTS5 table and its sync triggers; all are
+    idempotent. Prefix indexes on 2 and 3 characters keep short prefix
+    queries from walking every term.
+    """
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {search_table} USING fts5("
+        f"title, description, content='{content_table}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_insert AFTER INSERT ON {content_table} BEGIN "
+        f"INSERT INTO {search_table} (rowid, title, description) VALUES (new.id, new.title, new.description); "
+        "END",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_delete AFTER DELETE ON {content_table} BEGIN "
+        f"INSERT INTO {search_table} ({search_table}, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "END",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_update AFTER UPDATE OF title, description "
+        f"ON {content_table} BEGIN "
+        f"INSERT INTO {search_table} ({search_table}, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        f"INSERT INTO {search_table} (rowid, title, description) VALUES (new.id, new.title, new.description); "
+        "END",
+        # ORDER BY rank then uses these weights without a custom function call
+        f"INSERT INTO {search_table} ({search_table}, rank) VALUES ('rank', 'bm25({TITLE_WEIGHT}, 1.0)')",
+    ]
+
+
+def postgresql_index_sql(content_table):
+    return [
+        f"ALTER TABLE {content_table} ADD COLUMN IF NOT EXISTS {SEARCH_COLUMN} tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+        f"CREATE INDEX IF NOT EXISTS complaint_search_idx ON {content_table} USING GIN ({SEARCH_COLUMN})",
+    ]
+
+
+def install_search_index(connection):
+    """
+    Create the search index for this database, if it supports one.
+    """
+    table = Complaint._meta.db_table
+    if connection.vendor == 'sqlite':
+        statements = sqlite_index_sql(table)
+    elif connection.vendor == 'postgresql':
+        statements = postgresql_index_sql(table)
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(connection):
+    """
+    Re-read every complaint into the index. Only SQLite needs this; the
+    PostgreSQL column is computed by the database.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    table = Complaint._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for suffix in ('insert', 'delete', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS complaint_search_idx")
+            cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {SEARCH_COLUMN}")
+
+
+def ensure_search_triggers(connection):
+    """
+    Put back SQLite triggers lost when a migration rebuilds the complaints
+    table (SQLite alters tables by copying them). The rows keep their ids,
+    so the index itself stays valid.
+    """
+    if connection.vendor != 'sqlite' or SEARCH_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in sqlite_index_sql(Complaint._meta.db_table)[1:4]:
+            cursor.execute(statement)
+
+
+def parse_query(text):
+    """
+    Split a search box string into (term, prefix) pairs. Terms are letters
+    and digits only, so nothing reaches the match syntax unescaped. The
+    last term matches as a prefix so results show up while typing; a
+    trailing * makes any other term a prefix too.
+    """
+    terms = [(term.lower(), bool(star)) for term, star in TERM_RE.findall(text)][:MAX_SEARCH_TERMS]
+    if terms and not text[-1:].isspace():
+        terms[-1] = (terms[-1][0], True)
+    return terms
+
+
+def sqlite_match(terms):
+    return ' '.join(f'"{term}"' + ('*' if prefix else '') for term, prefix in terms)
+
+
+def postgresql_match(terms):
+    return ' & '.join(term + (':*' if prefix else '') for term, prefix in terms)
+
+
+def _filter_sql(filters, alias='c'):
+    clauses, params = [], []
+    for field in FACETS:
+        values = filters.get(field)
+        if values:
+            clauses.append(f"{alias}.{field} IN ({', '.join(['%s'] * len(values))})")
+            params += list(values)
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def search_sql(vendor, terms, filters, limit, offset, content_table=None, search_table=SEARCH_TABLE):
+    """
+    (sql, params) for the ids and scores of one page of matches, best
+    first. Scores are higher-is-better on both backends.
+    """
+    content_table = content_table or Complaint._meta.db_table
+    where, params = _filter_sql(filters)
+    if vendor == 'sqlite':
+        return (
+            f"SELECT s.rowid, -s.rank FROM {search_table} s JOIN {content_table} c ON c.id = s.rowid "
+            f"WHERE s.{search_table} MATCH %s{where} ORDER BY s.rank, s.rowid LIMIT %s OFFSET %s",
+            [sqlite_match(terms)] + params + [limit, offset],
+        )
+    return (
+        f"SELECT c.id, ts_rank_cd(c.{SEARCH_COLUMN}, q) AS score "
+        f"FROM {content_table} c, to_tsquery('english', %s) q "
+        f"WHERE c.{SEARCH_COLUMN} @@ q{where} ORDER BY score DESC, c.id LIMIT %s OFFSET %s",
+        [postgresql_match(terms)] + params + [limit, offset],
+    )
+
+
+def facet_sql(vendor, terms, content_table=None, search_table=SEARCH_TABLE):
+    """
+    (sql, params) counting every match per (category, severity, status).
+    """
+    content_table = content_table or Complaint._meta.db_table
+    group = "GROUP BY c.category, c.severity, c.status"
+    if vendor == 'sqlite':
+        return (
+            f"SELECT c.category, c.severity, c.status, COUNT(*) FROM {search_table} s "
+            f"JOIN {content_table} c ON c.id = s.rowid WHERE s.{search_table} MATCH %s {group}",
+            [sqlite_match(terms)],
+        )
+    return (
+        f"SELECT c.category, c.severity, c.status, COUNT(*) FROM {content_table} c "
+        f"WHERE c.{SEARCH_COLUMN} @@ to_tsquery('english', %s) {group}",
+        [postgresql_match(terms)],
+    )
+
+
+def count_facets(rows, filters):
+    """
+    Total matches under every filter, and per-facet counts where each facet
+    applies every filter but its own.
+    """
+    facets = {field: {} for field in FACETS}
+    total = 0
+    for category, severity, status, count in rows:
+        values = {'category': category, 'severity': severity, 'status': status}
+        failed = [field for field, value in values.items() if filters.get(field) and value not in filters[field]]
+        if not failed:
+            total += count
+        for field, value in values.items():
+            if not failed or failed == [field]:
+                facets[field][value] = facets[field].get(value, 0) + count
+    return total, facets
+
+
+def search_complaints(connection, terms, filters, limit, offset=0):
+    """
+    Returns ([(complaint id, score), ...], total, facets) in two queries.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(*search_sql(connection.vendor, terms, filters, limit, offset))
+        ranked = cursor.fetchall()
+        cursor.execute(*facet_sql(connection.vendor, terms))
+        total, facets = count_facets(cursor.fetchall(), filters)
+    return ranked, total, facets
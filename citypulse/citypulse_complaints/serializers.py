@@ -1,50 +1,76 @@
-from rest_framework import serializers
-from .models import Complaint
-
-from rest_framework import serializers
-from .models import Complaint, User
-from rest_framework import serializers
-import base64
-from rest_framework import serializers
-from .models import Complaint
-
 from rest_framework import serializers
 import base64
+from citypulse.serializers import SparseFieldsetMixin
 from .models import Complaint
+from django.urls import reverse
+from .images import InvalidImage, blob_url, store_image
+from .storage import get_blob_storage
 
-class ComplaintSerializer(serializers.ModelSerializer):
+class ComplaintSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # Use CharField to accept base64 string input
-    image = serializers.CharField(required=False, allow_null=True)
+    image = serializers.CharField(required=False, allow_null=True, write_only=True)
+    image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Complaint
         fields = '__all__'
-        read_only_fields = ('user', 'created_at')
+        # Complaints are filed as pending; status only changes through
+        # ComplaintStatusView and the transition rules in status.py
+        read_only_fields = (
+            'user', 'created_at', 'status', 'image_digest', 'image_content_type', 'image_size',
+            'image_width', 'image_height', 'thumbnail_digest', 'duplicate_of',
+        )
+
+    def _store_image(self, validated_data):
+        try:
+            return store_image(validated_data)
+        except InvalidImage as exc:
+            raise serializers.ValidationError({'image': str(exc)})
+
+    def _schedule_thumbnail(self, complaint, validated_data):
+        from .jobs import schedule_thumbnails
+        if 'image_digest' in validated_data:
+            schedule_thumbnails([complaint])
+        return complaint
+
+    def _include_image(self):
+        # The full-size base64 image is opt-in: context flag or ?include=image
+        if self.context.get('include_image'):
+            return True
+        request = self.context.get('request')
+        if request is None:
+            return False
+        return 'image' in request.query_params.get('include', '').split(',')
+
+    def get_image_url(self, instance):
+        if not instance.image_digest:
+            return None
+        path = reverse('complaint-image', kwargs={'complaint_id': instance.id})
+        return blob_url(self.context.get('request'), path, instance.image_digest)
+
+    def get_thumbnail_url(self, instance):
+        if not instance.thumbnail_digest:
+            return None
+        path = reverse('complaint-thumbnail', kwargs={'complaint_id': instance.id})
+        return blob_url(self.context.get('request'), path, instance.thumbnail_digest)
 
     def create(self, validated_data):
-        image_base64 = validated_data.pop('image', None)
-        if image_base64 and isinstance(image_base64, str):
-            try:
-                header, base64_data = image_base64.split(',', 1) if ',' in image_base64 else ('', image_base64)
-                validated_data['image'] = base64.b64decode(base64_data)
-            except Exception:
-                raise serializers.ValidationError({'image': 'Invalid base64 image data.'})
-        return Complaint.objects.create(**validated_data)
+        validated_data = self._store_image(validated_data)
+        return self._schedule_thumbnail(Complaint.objects.create(**validated_data), validated_data)
 
     def update(self, instance, validated_data):
-        image_base64 = validated_data.pop('image', None)
-        if image_base64 and isinstance(image_base64, str):
-            try:
-                header, base64_data = image_base64.split(',', 1) if ',' in image_base64 else ('', image_base64)
-                validated_data['image'] = base64.b64decode(base64_data)
-            except Exception:
-                raise serializers.ValidationError({'image': 'Invalid base64 image data.'})
-        return super().update(instance, validated_data)
+        validated_data = self._store_image(validated_data)
+        return self._schedule_thumbnail(super().update(instance, validated_data), validated_data)
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        if instance.image:
-            rep['image'] = 'data:image/jpeg;base64,' + base64.b64encode(instance.image).decode()
+        if 'image' not in self.fields:
+            return rep
+        rep['image'] = None
+        if instance.image_digest and self._include_image():
+            data = get_blob_storage().read(instance.image_digest)
+            rep['image'] = f'data:{instance.image_content_type};base64,' + base64.b64encode(data).decode()
         return rep
 
 from .models import ComplaintStatus
@@ -53,3 +79,8 @@ class ComplaintStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = ComplaintStatus
         fields = '__all__'
+
+
+class ComplaintTimelineSerializer(ComplaintSerializer):
+    # Expects `statuses` prefetched in timeline order
+    timeline = ComplaintStatusSerializer(source='statuses', many=True, read_only=True)
@@ -0,0 +1,66 @@
+# citypulse_complaints/signals.py
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from citypulse.cache import invalidate_scopes
+from .clusters import add_to_cells, adjust_cells, cluster_key
+from .models import Complaint
+from .status import record_initial_statuses
+
+CLUSTER_FIELDS = {'location_lat', 'location_lng', 'geohash', 'category', 'severity', 'status'}
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_cluster_key(sender, instance, update_fields=None, **kwargs):
+    instance._previous_cluster_key = None
+    if instance._state.adding or (update_fields is not None and not CLUSTER_FIELDS & set(update_fields)):
+        return
+    instance._previous_cluster_key = (
+        Complaint.objects.filter(pk=instance.pk)
+        .values_list('geohash', 'category', 'severity', 'status')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Complaint)
+def update_cluster_cells(sender, instance, created, update_fields=None, **kwargs):
+    # Keeps the map clusters current as complaints are created, moved or
+    # change status
+    if created:
+        add_to_cells([instance])
+        return
+    if update_fields is not None and not CLUSTER_FIELDS & set(update_fields):
+        return
+    previous = getattr(instance, '_previous_cluster_key', None)
+    current = cluster_key(instance)
+    if previous == current:
+        return
+    deltas = {current: 1}
+    if previous is not None:
+        deltas[previous] = -1
+    adjust_cells(deltas)
+
+
+@receiver(post_save, sender=Complaint)
+def record_initial_status(sender, instance, created, **kwargs):
+    # The timeline starts with the status the complaint was filed in
+    if created:
+        record_initial_statuses([instance])
+
+
+@receiver(pre_delete, sender=Complaint)
+def touch_duplicates(sender, instance, **kwargs):
+    # duplicate_of's SET_NULL is an update() that skips auto_now; bump
+    # updated_at so delta sync sends the unlinked duplicates
+    Complaint.objects.filter(duplicate_of=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Complaint)
+def release_cluster_cells(sender, instance, **kwargs):
+    adjust_cells({cluster_key(instance): -1})
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def expire_complaint_responses(sender, **kwargs):
+    invalidate_scopes('complaints')
@@ -0,0 +1,90 @@
+# citypulse_complaints/status.py
+"""
+Complaint status transitions. Every change goes through here so the
+ComplaintStatus history and the denormalized Complaint.status are written
+in the same transaction and only along allowed edges. Leaving the assigned
+statuses closes the complaint's open task in that transaction too.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Complaint, ComplaintStatus
+
+TRANSITIONS = {
+    'pending': {'assigned', 'rejected'},
+    'assigned': {'in_progress', 'resolved', 'pending', 'rejected'},
+    'in_progress': {'resolved', 'assigned'},
+    # Reopened complaints start over
+    'resolved': {'pending'},
+    'rejected': {'pending'},
+}
+# Statuses no worker is working towards
+TASK_CLOSING_STATUSES = {'pending', 'resolved', 'rejected'}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def check_transition(current, new):
+    if new not in TRANSITIONS:
+        raise InvalidTransition(f"Unknown status '{new}'")
+    if new not in TRANSITIONS.get(current, ()):
+        raise InvalidTransition(f"Cannot change status from '{current}' to '{new}'")
+
+
+def close_open_tasks(complaint):
+    """
+    Complete the complaint's open tasks. Saved one by one so the worker
+    load index and resolution rollups follow through their signals.
+    """
+    from citypulse_workers.models import AssignedTask
+
+    now = timezone.now()
+    for task in AssignedTask.objects.filter(complaint=complaint, completed_at__isnull=True):
+        task.completed_at = now
+        task.save()
+
+
+def transition(complaint, new_status):
+    """
+    Move one complaint to new_status and append the history row, closing
+    its open task when it becomes pending, resolved or rejected. The row
+    is re-read under a lock so concurrent transitions can't both pass the
+    check. Returns the new ComplaintStatus.
+    """
+    with transaction.atomic():
+        current = (
+            Complaint.objects.select_for_update()
+            .values_list('status', flat=True)
+            .get(pk=complaint.pk)
+        )
+        check_transition(current, new_status)
+        entry = ComplaintStatus.objects.create(complaint=complaint, status=new_status)
+        complaint.status = new_status
+        complaint.save(update_fields=['status'])
+        if new_status in TASK_CLOSING_STATUSES:
+            close_open_tasks(complaint)
+    return entry
+
+
+def record_bulk_transition(complaint_ids, new_status):
+    """
+    History rows for complaints a batch job already moved with
+    QuerySet.update(), in one INSERT. The caller has checked the
+    transitions and owns the transaction.
+    """
+    ComplaintStatus.objects.bulk_create(
+        [ComplaintStatus(complaint_id=complaint_id, status=new_status) for complaint_id in complaint_ids],
+        batch_size=1000,
+    )
+
+
+def record_initial_statuses(complaints):
+    """
+    First history rows for newly created complaints, in one INSERT.
+    """
+    ComplaintStatus.objects.bulk_create(
+        [ComplaintStatus(complaint_id=complaint.id, status=complaint.status) for complaint in complaints],
+        batch_size=1000,
+    )
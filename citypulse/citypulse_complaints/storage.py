@@ -0,0 +1,110 @@
+# citypulse_complaints/storage.py
+import abc
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BlobStorage(abc.ABC):
+    """
+    Content-addressed blob store. Blobs are immutable and keyed by the
+    SHA-256 hex digest of their bytes, so identical uploads are stored once.
+    """
+
+    @abc.abstractmethod
+    def put(self, data):
+        pass
+
+    @abc.abstractmethod
+    def open(self, digest):
+        pass
+
+    @abc.abstractmethod
+    def size(self, digest):
+        pass
+
+    @abc.abstractmethod
+    def exists(self, digest):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, digest):
+        pass
+
+    def read(self, digest):
+        with self.open(digest) as fh:
+            return fh.read()
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+
+class LocalBlobStorage(BlobStorage):
+    """
+    Stores blobs on the local filesystem under MEDIA_ROOT/blobs/ab/cd/<digest>.
+    """
+
+    def __init__(self, location=None):
+        self.location = location or os.path.join(settings.MEDIA_ROOT, 'blobs')
+
+    def path(self, digest):
+        return os.path.join(self.location, digest[:2], digest[2:4], digest)
+
+    def put(self, data):
+        digest = self.digest(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        return digest
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    def size(self, digest):
+        return os.path.getsize(self.path(digest))
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def delete(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+
+def get_blob_storage():
+    """
+    Build the backend configured in settings.BLOB_STORAGE.
+    """
+    config = getattr(settings, 'BLOB_STORAGE', {})
+    backend = import_string(config.get('BACKEND', 'citypulse_complaints.storage.LocalBlobStorage'))
+    return backend(**config.get('OPTIONS', {}))
+
+
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+def sniff_content_type(data, default='image/jpeg'):
+    for signature, content_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return default
@@ -1,3 +1,910 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+import unittest
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from unittest import mock
+
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from citypulse import export
+from citypulse.cache import get_response_cache
+from citypulse.filters import Filter
+from citypulse_jobs.worker import JobWorker
+from citypulse_notifications.models import Notification
+from citypulse_users.models import Profile
+from citypulse_workers.models import AssignedTask, Worker
+from . import geo
+from .minhash import similarity, text_signature
+from .clusters import rebuild_cells
+from .images import blob_version, make_thumbnail
+from citypulse_analytics.models import ComplaintRollup
+from .models import Complaint, ComplaintCell, ComplaintSignature, ComplaintStatus
+from .status import InvalidTransition, transition
+from .storage import BlobStorage, get_blob_storage
+
+JPEG_BYTES = b'\xff\xd8\xff\xe0' + bytes(range(256)) * 4
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class BlobStorageTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.blob_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.blob_dir, ignore_errors=True)
+        settings_override = override_settings(BLOB_STORAGE={
+            'BACKEND': 'citypulse_complaints.storage.LocalBlobStorage',
+            'OPTIONS': {'location': self.blob_dir},
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class LocalBlobStorageTests(BlobStorageTestMixin, TestCase):
+    def test_put_is_content_addressed_and_deduplicated(self):
+        storage = get_blob_storage()
+        digest = storage.put(JPEG_BYTES)
+        self.assertEqual(storage.put(JPEG_BYTES), digest)
+        self.assertEqual(storage.read(digest), JPEG_BYTES)
+        self.assertEqual(storage.size(digest), len(JPEG_BYTES))
+
+    def test_incomplete_backend_fails_on_instantiation(self):
+        class WriteOnlyStorage(BlobStorage):
+            def put(self, data):
+                return self.digest(data)
+
+        with self.assertRaises(TypeError):
+            WriteOnlyStorage()
+
+
+class ComplaintImageViewTests(BlobStorageTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/complaints-create/', {
+            'title': 'Pothole',
+            'description': 'Big pothole',
+            'image': 'data:image/jpeg;base64,' + base64.b64encode(JPEG_BYTES).decode(),
+            'location_lat': '17.385000',
+            'location_lng': '78.486700',
+            'category': 'road',
+            'severity': 'high',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.complaint = Complaint.objects.get()
+
+    def test_image_bytes_are_not_stored_in_the_row(self):
+        self.assertEqual(self.complaint.image_size, len(JPEG_BYTES))
+        self.assertEqual(get_blob_storage().read(self.complaint.image_digest), JPEG_BYTES)
+
+    def test_streams_full_image_with_etag(self):
+        response = self.client.get(f'/complaints/{self.complaint.id}/image/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), JPEG_BYTES)
+        self.assertEqual(response['ETag'], f'"{self.complaint.image_digest}"')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(
+            f'/complaints/{self.complaint.id}/image/',
+            HTTP_IF_NONE_MATCH=f'"{self.complaint.image_digest}"',
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_only_current_versioned_urls_are_immutable(self):
+        url = f'/complaints/{self.complaint.id}/image/'
+        response = self.client.get(url, {'v': blob_version(self.complaint.image_digest)})
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['ETag'], f'"{self.complaint.image_digest}"')
+
+        response = self.client.get(url, {'v': 'stale'})
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(response['ETag'], f'"{self.complaint.image_digest}"')
+
+    def test_range_requests(self):
+        response = self.client.get(f'/complaints/{self.complaint.id}/image/', HTTP_RANGE='bytes=4-13')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), JPEG_BYTES[4:14])
+        self.assertEqual(response['Content-Range'], f'bytes 4-13/{len(JPEG_BYTES)}')
+
+        response = self.client.get(f'/complaints/{self.complaint.id}/image/', HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), JPEG_BYTES[-4:])
+
+        response = self.client.get(f'/complaints/{self.complaint.id}/image/', HTTP_RANGE='bytes=99999-')
+        self.assertEqual(response.status_code, 416)
+
+
+class ComplaintImageRepresentationTests(BlobStorageTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_complaint(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/complaints-create/', {
+                'title': 'Broken light',
+                'description': 'Street light is out',
+                'image': base64.b64encode(data).decode(),
+                'location_lat': '17.385000',
+                'location_lng': '78.486700',
+                'category': 'lights',
+                'severity': 'low',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        JobWorker().run_once()
+        return Complaint.objects.get(id=response.data['id'])
+
+    def test_list_emits_urls_instead_of_base64(self):
+        complaint = self.create_complaint(JPEG_BYTES)
+        item = self.client.get('/complaints/').data['results'][0]
+        self.assertIsNone(item['image'])
+        self.assertIn(f'/complaints/{complaint.id}/image/?v=', item['image_url'])
+
+        item = self.client.get('/complaints/?include=image').data['results'][0]
+        self.assertEqual(item['image'], 'data:image/jpeg;base64,' + base64.b64encode(JPEG_BYTES).decode())
+
+    def test_signed_url_works_without_credentials(self):
+        self.create_complaint(JPEG_BYTES)
+        image_url = self.client.get('/complaints/').data['results'][0]['image_url']
+
+        anonymous = APIClient()
+        response = anonymous.get(image_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), JPEG_BYTES)
+
+        response = anonymous.get(image_url.replace('sig=', 'sig=x'))
+        self.assertEqual(response.status_code, 401)
+
+        # Signed URLs expire, and the expiry can't be pushed back
+        with mock.patch('citypulse_complaints.images.time.time', return_value=time.time() + 3 * 3600):
+            self.assertEqual(anonymous.get(image_url).status_code, 401)
+        expires = image_url.split('exp=')[1].split('&')[0]
+        self.assertEqual(anonymous.get(image_url.replace(expires, str(int(expires) + 3600))).status_code, 401)
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_thumbnail_generated_at_upload(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1024, 512), 'red').save(buffer, format='PNG')
+        complaint = self.create_complaint(buffer.getvalue())
+        self.assertEqual((complaint.image_width, complaint.image_height), (1024, 512))
+        self.assertEqual(complaint.image_content_type, 'image/png')
+
+        item = self.client.get('/complaints/').data['results'][0]
+        response = self.client.get(item['thumbnail_url'])
+        self.assertEqual(response.status_code, 200)
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as thumbnail:
+            self.assertEqual(thumbnail.size, (256, 128))
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_decompression_bombs_are_treated_as_undecodable(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'red').save(buffer, format='PNG')
+        # Past the limit Pillow warns; past twice the limit it raises
+        for limit in (64 * 64 - 1, 64 * 64 // 2 - 1):
+            with self.subTest(limit=limit), mock.patch.object(Image, 'MAX_IMAGE_PIXELS', limit):
+                self.assertEqual(make_thumbnail(buffer.getvalue()), (None, None, None))
+
+
+class ComplaintListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for index in range(5):
+            Complaint.objects.create(
+                user=self.user, title=f'Complaint {index}', description='...',
+                location_lat='17.385000', location_lng='78.486700',
+                category='garbage', severity='low',
+            )
+        # Identical timestamps force the id tie-breaker to do its job
+        Complaint.objects.filter(id__lte=Complaint.objects.order_by('id')[2].id).update(
+            created_at=Complaint.objects.order_by('id').first().created_at,
+        )
+
+    def test_cursor_walks_every_row_once_in_stable_order(self):
+        seen = []
+        url = '/complaints/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        expected = list(Complaint.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        tampered = [
+            'not-a-cursor',
+            base64.urlsafe_b64encode(json.dumps(['2026-01-01T00:00:00']).encode()).decode(),
+            base64.urlsafe_b64encode(json.dumps(['yesterday', 1]).encode()).decode(),
+            base64.urlsafe_b64encode(json.dumps({'id': 1}).encode()).decode(),
+        ]
+        for cursor in tampered:
+            response = self.client.get('/complaints/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.data, {'cursor': ['Invalid cursor']})
+
+    def test_sparse_fieldset(self):
+        response = self.client.get('/complaints/?fields=id,title')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+
+class ComplaintListFilterTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = User.objects.create_user(username='citizen')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.road = self.make('road', 'high')
+        self.water = self.make('water', 'low')
+        self.garbage = self.make('garbage', 'low')
+        Complaint.objects.filter(id=self.garbage.id).update(created_at='2026-01-01T10:00:00Z')
+
+    def make(self, category, severity):
+        return Complaint.objects.create(
+            user=self.user, title=category, description='...',
+            location_lat='17.385000', location_lng='78.486700', category=category, severity=severity,
+        )
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        # Cache hits are plain HttpResponses, without .data
+        return [row['id'] for row in response.json()['results']]
+
+    def page_query(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query['sql'] for query in queries if 'FROM "citypulse_complaints_complaint"' in query['sql']][-1]
+
+    def test_filters_are_sql_where_clauses(self):
+        sql = self.page_query(
+            '/complaints/?category=road,water&severity=low&status=pending&from=2026-01-02&to=2100-01-01'
+        )
+        self.assertIn('"citypulse_complaints_complaint"."category" IN (\'road\', \'water\')', sql)
+        self.assertIn('"citypulse_complaints_complaint"."severity" = \'low\'', sql)
+        self.assertIn('"citypulse_complaints_complaint"."status" = \'pending\'', sql)
+        self.assertIn('"citypulse_complaints_complaint"."created_at" >= \'2026-01-02 00:00:00\'', sql)
+        self.assertIn('"citypulse_complaints_complaint"."created_at" < \'2100-01-02 00:00:00\'', sql)
+        self.assertIn('LIMIT 51', sql)
+
+        sql = self.page_query('/complaints/?worker=7')
+        self.assertIn('WHERE EXISTS(SELECT 1 AS "a" FROM "citypulse_workers_assignedtask"', sql)
+
+    def test_filtered_results(self):
+        self.assertEqual(self.ids('/complaints/?category=road,water'), [self.water.id, self.road.id])
+        self.assertEqual(self.ids('/complaints/?severity=low&to=2026-01-01'), [self.garbage.id])
+        self.assertEqual(self.ids('/complaints/?ordering=created_at'), [self.garbage.id, self.road.id, self.water.id])
+        self.assertEqual(self.ids('/complaints/user/?category=garbage'), [self.garbage.id])
+        # Undeclared parameters are ignored
+        self.assertEqual(len(self.ids('/complaints/?title=road')), 3)
+
+    def test_worker_filter_sees_new_assignments(self):
+        worker = Worker.objects.create(
+            user=User.objects.create_user(username='worker'), name='worker', phone='555-0100', specialization='road',
+        )
+        self.assertEqual(self.ids(f'/complaints/?worker={worker.id}'), [])
+        self.assertEqual(self.ids(f'/complaints/user/?worker={worker.id}'), [])
+        AssignedTask.objects.create(worker=worker, complaint=self.road)
+        self.assertEqual(self.ids(f'/complaints/?worker={worker.id}'), [self.road.id])
+        self.assertEqual(self.ids(f'/complaints/user/?worker={worker.id}'), [self.road.id])
+
+    def test_invalid_values(self):
+        for query in ('category=boats', 'severity=', 'from=yesterday', 'worker=x', 'ordering=title'):
+            with self.subTest(query=query):
+                expected = 200 if query == 'severity=' else 400
+                self.assertEqual(self.client.get(f'/complaints/?{query}').status_code, expected)
+
+    def test_filter_without_to_q_fails_on_instantiation(self):
+        class UnfinishedFilter(Filter):
+            pass
+
+        with self.assertRaises(TypeError):
+            UnfinishedFilter('category')
+
+
+class ComplaintExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen')
+        admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=admin, role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        for index, created_at in enumerate(['2026-03-01T10:00:00Z', '2026-03-02T23:59:00Z', '2026-03-03T00:00:00Z']):
+            complaint = Complaint.objects.create(
+                user=self.user, title=f'Complaint {index}', description='Line one\nline "two"',
+                location_lat='17.385000', location_lng=f'78.48{index}000',
+                category='garbage', severity='low',
+            )
+            Complaint.objects.filter(id=complaint.id).update(created_at=created_at)
+
+    def body(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_with_date_range(self):
+        with mock.patch.object(export, 'EXPORT_CHUNK_SIZE', 1):
+            response = self.client.get('/complaints/export/?from=2026-03-01&to=2026-03-02')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(self.body(response))))
+        self.assertEqual(rows[0][:3], ['id', 'user_id', 'title'])
+        self.assertNotIn('text_signature', rows[0])
+        self.assertEqual([row[2] for row in rows[1:]], ['Complaint 0', 'Complaint 1'])
+        self.assertEqual(rows[1][3], 'Line one\nline "two"')
+
+    def test_ndjson(self):
+        response = self.client.get('/complaints/export/?output=ndjson&from=2026-03-02')
+        lines = [json.loads(line) for line in self.body(response).splitlines()]
+        self.assertEqual([line['title'] for line in lines], ['Complaint 1', 'Complaint 2'])
+        self.assertEqual(lines[0]['location_lng'], '78.481000')
+
+    def test_rejects_bad_parameters_and_non_admins(self):
+        self.assertEqual(self.client.get('/complaints/export/?output=xml').status_code, 400)
+        self.assertEqual(self.client.get('/complaints/export/?from=March').status_code, 400)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/complaints/export/').status_code, 403)
+
+
+class ExportMemoryTests(SimpleTestCase):
+    def test_memory_stays_flat_over_a_million_rows(self):
+        rows = ((index, 'Overflowing bin', 'garbage', '2026-01-01T00:00:00Z') for index in range(1_000_000))
+        baseline = sys.getallocatedblocks()
+        growth = largest_piece = lines = 0
+        for piece in export.iter_csv(('id', 'title', 'category', 'created_at'), rows):
+            # Small objects (rows, cells) show up in the block count; the
+            # buffer itself in the piece size
+            growth = max(growth, sys.getallocatedblocks() - baseline)
+            largest_piece = max(largest_piece, len(piece))
+            lines += piece.count('\n')
+        self.assertEqual(lines, 1_000_001)
+        self.assertLess(growth, 1000)
+        self.assertLess(largest_piece, export.EXPORT_BUFFER_SIZE + 1024)
+
+    def test_memory_stays_flat_when_served_over_asgi(self):
+        stats = {'growth': 0, 'messages': 0, 'lines': 0, 'read': 0, 'read_before_first_send': None}
+
+        def rows():
+            for index in range(1_000_000):
+                stats['read'] = index + 1
+                yield index, 'Overflowing bin', 'garbage', '2026-01-01T00:00:00Z'
+
+        columns = ('id', 'title', 'category', 'created_at')
+        response = export.ChunkedStreamingHttpResponse(export.iter_csv(columns, rows()), content_type='text/csv')
+        baseline = sys.getallocatedblocks()
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                if stats['read_before_first_send'] is None:
+                    stats['read_before_first_send'] = stats['read']
+                stats['messages'] += 1
+                stats['lines'] += message.get('body', b'').count(b'\n')
+                stats['growth'] = max(stats['growth'], sys.getallocatedblocks() - baseline)
+
+        # The path Daphne takes: Django's ASGI handler consuming the response
+        async_to_sync(ASGIHandler().send_response)(response, send)
+        self.assertEqual(stats['lines'], 1_000_001)
+        # The first piece goes out long before the last row is read
+        self.assertLess(stats['read_before_first_send'], 10_000)
+        self.assertGreater(stats['messages'], 100)
+        self.assertLess(stats['growth'], 1000)
+
+
+class GeohashTests(TestCase):
+    def test_encode_matches_reference_geohash(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, precision=11), 'u4pruydqqvj')
+        min_lat, min_lng, max_lat, max_lng = geo.decode_bounds('u4pruydqqvj')
+        self.assertTrue(min_lat <= 57.64911 <= max_lat and min_lng <= 10.40744 <= max_lng)
+
+    def test_cover_splits_boxes_across_the_antimeridian(self):
+        ranges = geo.cover_ranges(-10, 170, 10, -170)
+        for lat, lng in [(0, 175), (0, -175), (-9, 179.9), (9, -179.9)]:
+            geohash = geo.encode(lat, lng)
+            self.assertTrue(any(low <= geohash and (high is None or geohash < high) for low, high in ranges))
+
+
+class ComplaintGeoQueryTests(TestCase):
+    # (title, lat, lng)
+    POINTS = [
+        ('centre', '17.385000', '78.486700'),
+        ('300m north', '17.387700', '78.486700'),
+        ('2km east', '17.385000', '78.505500'),
+        ('other city', '12.971600', '77.594600'),
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for title, lat, lng in self.POINTS:
+            Complaint.objects.create(
+                user=self.user, title=title, description='...',
+                location_lat=lat, location_lng=lng, category='road', severity='low',
+            )
+
+    def titles(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_geohash_is_kept_in_step_with_coordinates(self):
+        complaint = Complaint.objects.get(title='centre')
+        self.assertEqual(complaint.geohash, geo.encode(17.385, 78.4867))
+        complaint.location_lat, complaint.location_lng = '12.971600', '77.594600'
+        complaint.save(update_fields=['location_lat', 'location_lng'])
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.geohash, geo.encode(12.9716, 77.5946))
+
+    def test_bbox_returns_only_complaints_in_view(self):
+        url = '/complaints/?bbox=78.48,17.38,78.49,17.39'
+        self.assertCountEqual(self.titles(self.client.get(url)), ['centre', '300m north'])
+        # Dense boxes page through the ordering index instead; same rows
+        get_response_cache().clear()
+        with mock.patch.object(geo, 'DENSE_BBOX_ROWS', 1):
+            self.assertCountEqual(self.titles(self.client.get(url)), ['centre', '300m north'])
+
+    def test_invalid_bbox(self):
+        for bbox in ['1,2,3', 'a,b,c,d', '78.48,17.39,78.49,17.38']:
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.client.get(f'/complaints/?bbox={bbox}').status_code, 400)
+
+    def test_nearby_is_ordered_by_distance_within_radius(self):
+        response = self.client.get('/complaints/nearby/?lat=17.385&lng=78.4867&radius=5000')
+        self.assertEqual(self.titles(response), ['centre', '300m north', '2km east'])
+        distances = [item['distance'] for item in response.data['results']]
+        self.assertEqual(distances[0], 0)
+        self.assertAlmostEqual(distances[1], 300, delta=5)
+
+        response = self.client.get('/complaints/nearby/?lat=17.385&lng=78.4867&radius=1000&limit=1')
+        self.assertEqual(self.titles(response), ['centre'])
+
+    def test_nearby_validates_parameters(self):
+        self.assertEqual(self.client.get('/complaints/nearby/?lat=17.385').status_code, 400)
+        self.assertEqual(self.client.get('/complaints/nearby/?lat=17.385&lng=78.4867&radius=900000').status_code, 400)
+
+
+class ComplaintClusterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, lat, lng, category='road', severity='low'):
+        return Complaint.objects.create(
+            user=self.user, title='Complaint', description='...',
+            location_lat=lat, location_lng=lng, category=category, severity=severity,
+        )
+
+    def clusters(self, query):
+        response = self.client.get(f'/complaints/clusters/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {cell['cell']: cell for cell in response.data['cells']}
+
+    def cell_counts(self):
+        return sorted(
+            ComplaintCell.objects.filter(count__gt=0)
+            .values_list('geohash', 'category', 'severity', 'status', 'count')
+        )
+
+    def test_counts_per_cell_by_category_and_severity(self):
+        self.create('17.385000', '78.486700', 'road', 'high')
+        self.create('17.386000', '78.487000', 'water', 'high')
+        self.create('12.971600', '77.594600')
+
+        cells = self.clusters('zoom=4')
+        self.assertEqual(len(cells), 2)
+        hyderabad = cells[geo.encode(17.385, 78.4867, precision=2)]
+        self.assertEqual(hyderabad['count'], 2)
+        self.assertEqual(hyderabad['by_category'], {'road': 1, 'water': 1})
+        self.assertEqual(hyderabad['by_severity'], {'high': 2})
+
+        # At street zoom the two Hyderabad complaints fall in separate cells
+        cells = self.clusters('zoom=16&bbox=78.48,17.38,78.49,17.39')
+        self.assertEqual(sum(cell['count'] for cell in cells.values()), 2)
+
+        # A viewport smaller than one cell at a coarse zoom still finds it
+        for zoom in (4, 8, 12):
+            with self.subTest(zoom=zoom):
+                cells = self.clusters(f'zoom={zoom}&bbox=78.48,17.38,78.49,17.39')
+                self.assertEqual(sum(cell['count'] for cell in cells.values()), 2)
+
+    def test_cells_follow_status_changes_and_deletes(self):
+        complaint = self.create('17.385000', '78.486700')
+        self.assertEqual(self.clusters('zoom=4')[geo.encode(17.385, 78.4867, precision=2)]['count'], 1)
+
+        complaint.status = 'resolved'
+        complaint.save()
+        self.assertEqual(self.clusters('zoom=4'), {})
+        self.assertEqual(len(self.clusters('zoom=4&status=resolved')), 1)
+
+        complaint.delete()
+        self.assertEqual(self.clusters('zoom=4&status=resolved'), {})
+
+    def test_incremental_counts_match_a_rebuild(self):
+        for index in range(6):
+            complaint = self.create(f'17.38{index}000', '78.486700', severity=['low', 'high'][index % 2])
+            if index % 3 == 0:
+                complaint.status = 'assigned'
+                complaint.save(update_fields=['status'])
+        Complaint.objects.first().delete()
+        incremental = self.cell_counts()
+        rebuild_cells(Complaint, ComplaintCell)
+        self.assertEqual(self.cell_counts(), incremental)
+
+
+class ComplaintDuplicateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=self.admin, role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, **overrides):
+        data = {
+            'title': 'Huge pothole on Main Road',
+            'description': 'Deep pothole in front of the bus stop, two bikes fell today',
+            'location_lat': '17.385000',
+            'location_lng': '78.486700',
+            'category': 'road',
+            'severity': 'high',
+            **overrides,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/complaints-create/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            JobWorker().run_once()
+        return response.data
+
+    def test_status_in_payload_is_ignored(self):
+        created = self.create(status='resolved')
+        self.assertEqual(created['status'], 'pending')
+        self.assertEqual(
+            list(ComplaintStatus.objects.filter(complaint_id=created['id']).values_list('status', flat=True)),
+            ['pending'],
+        )
+
+    def test_signature_similarity(self):
+        a = text_signature('Huge pothole on Main Road', 'Deep pothole near the bus stop')
+        b = text_signature('huge pot-hole on main road!', 'deep pothole near bus stop')
+        c = text_signature('Street light broken', 'The lamp outside house 12 has been off for a week')
+        self.assertGreaterEqual(similarity(a, b), 0.5)
+        self.assertLess(similarity(a, c), 0.2)
+        self.assertIsNone(text_signature('', '...'))
+
+    def test_signature_follows_text_edits(self):
+        complaint = Complaint.objects.get(id=self.create()['id'])
+        stored = ComplaintSignature.objects.get(complaint=complaint).minhash
+        complaint.title = 'Street light broken'
+        complaint.save(update_fields=['title'])
+        self.assertNotEqual(bytes(ComplaintSignature.objects.get(complaint=complaint).minhash), bytes(stored))
+        complaint.title, complaint.description = '!', '...'
+        complaint.save()
+        self.assertFalse(ComplaintSignature.objects.filter(complaint=complaint).exists())
+
+    def test_nearby_repeat_is_linked_and_admins_not_notified_again(self):
+        original = self.create()
+        repeat = self.create(
+            title='Huge pothole on main road',
+            description='Deep pothole in front of bus stop, bikes falling',
+            location_lat='17.385300',
+        )
+        self.assertEqual(repeat['duplicate_of'], original['id'])
+        self.assertEqual(Notification.objects.filter(user=self.admin).count(), 1)
+        message = Notification.objects.get(user=self.user, complaint_id=repeat['id']).message
+        self.assertIn(f"#{original['id']}", message)
+
+    def test_distinct_reports_are_not_linked(self):
+        original = self.create()
+        cases = {
+            'far away': {'location_lat': '17.395000'},
+            'other category': {'category': 'water'},
+            'other text': {'title': 'Overflowing drain', 'description': 'Sewage on the footpath since Monday'},
+        }
+        for label, overrides in cases.items():
+            with self.subTest(label):
+                self.assertIsNone(self.create(**overrides)['duplicate_of'])
+
+        # Closed complaints are no longer canonical
+        Complaint.objects.filter(id=original['id']).update(status='resolved')
+        self.assertNotEqual(self.create()['duplicate_of'], original['id'])
+
+
+class ComplaintStatusTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen', password='pass')
+        self.admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=self.admin, role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.complaint = Complaint.objects.create(
+            user=self.user, title='Pothole', description='...',
+            location_lat='17.385000', location_lng='78.486700',
+            category='road', severity='high',
+        )
+
+    def history(self):
+        return list(
+            ComplaintStatus.objects.filter(complaint=self.complaint)
+            .order_by('updated_at', 'id').values_list('status', flat=True)
+        )
+
+    def test_history_follows_status(self):
+        self.assertEqual(self.history(), ['pending'])
+        for status in ('assigned', 'in_progress', 'resolved'):
+            response = self.client.post(
+                f'/complaints/{self.complaint.id}/status/', {'status': status}, format='json'
+            )
+            self.assertEqual(response.status_code, 201)
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.status, 'resolved')
+        self.assertEqual(self.history(), ['pending', 'assigned', 'in_progress', 'resolved'])
+        # The map cell moved with the status
+        self.assertEqual(ComplaintCell.objects.get(precision=7, status='resolved').count, 1)
+
+    def test_invalid_transition_changes_nothing(self):
+        with self.assertRaises(InvalidTransition):
+            transition(self.complaint, 'resolved')
+        for status in ('in_progress', 'closed', ''):
+            with self.subTest(status):
+                response = self.client.post(
+                    f'/complaints/{self.complaint.id}/status/', {'status': status}, format='json'
+                )
+                self.assertEqual(response.status_code, 400)
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.status, 'pending')
+        self.assertEqual(self.history(), ['pending'])
+
+    def test_only_admins_and_assigned_workers_change_status(self):
+        url = f'/complaints/{self.complaint.id}/status/'
+        citizen = APIClient()
+        citizen.force_authenticate(self.user)
+        self.assertEqual(citizen.post(url, {'status': 'rejected'}, format='json').status_code, 403)
+        self.assertEqual(citizen.get(url).status_code, 200)
+
+        worker_user = User.objects.create_user(username='worker')
+        worker = Worker.objects.create(user=worker_user, name='worker', phone='555-0100', specialization='road')
+        client = APIClient()
+        client.force_authenticate(worker_user)
+        self.assertEqual(client.post(url, {'status': 'assigned'}, format='json').status_code, 403)
+        AssignedTask.objects.create(complaint=self.complaint, worker=worker)
+        self.assertEqual(client.post(url, {'status': 'assigned'}, format='json').status_code, 201)
+        self.assertEqual(self.history(), ['pending', 'assigned'])
+
+    def test_timeline_query_count_does_not_grow_with_history(self):
+        def fetch():
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/complaints/{self.complaint.id}/status/')
+            self.assertEqual(response.status_code, 200)
+            return response.data[0]['timeline']
+
+        self.assertEqual([entry['status'] for entry in fetch()], ['pending'])
+        for _ in range(10):
+            transition(self.complaint, 'assigned')
+            transition(self.complaint, 'pending')
+        timeline = fetch()
+        self.assertEqual(len(timeline), 21)
+        self.assertEqual(timeline[-1]['status'], 'pending')
+
+
+class ComplaintBulkCreateTests(BlobStorageTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='importer')
+        self.admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=self.admin, role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def items(self, count, **overrides):
+        return [
+            {
+                'title': f'Legacy complaint {index}', 'description': 'Imported from the old system',
+                'location_lat': f'{17.3 + index * 0.001:.6f}', 'location_lng': '78.486700',
+                'category': 'garbage', 'severity': 'low', **overrides,
+            }
+            for index in range(count)
+        ]
+
+    def post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/complaints/bulk/', items, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            JobWorker().run_once()
+        return response
+
+    def test_import_keeps_derived_data_and_coalesces_notifications(self):
+        # A status in the payload is ignored; imports start as pending
+        response = self.post(self.items(3) + self.items(1, status='resolved'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 4)
+        complaints = Complaint.objects.filter(id__in=response.data['ids'])
+        self.assertEqual(complaints.count(), 4)
+        self.assertTrue(all(complaint.geohash for complaint in complaints))
+        self.assertEqual(ComplaintSignature.objects.filter(complaint__in=complaints).count(), 4)
+        self.assertEqual(sorted(ComplaintStatus.objects.values_list('status', flat=True)), ['pending'] * 4)
+        self.assertEqual(ComplaintCell.objects.get(precision=1, status='pending').count, 4)
+        self.assertFalse(ComplaintRollup.objects.filter(status='resolved').exists())
+
+        # One notification each, not one per complaint
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.user).values_list('message', flat=True)),
+            ["Your 4 complaints have been submitted."],
+        )
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.admin).values_list('message', flat=True)),
+            ["4 new complaints created by importer."],
+        )
+
+    def test_imports_are_linked_to_duplicates(self):
+        pothole = {
+            'title': 'Huge pothole on Main Road', 'description': 'Deep pothole in front of the bus stop',
+            'location_lat': '17.385000', 'location_lng': '78.486700', 'category': 'road', 'severity': 'high',
+        }
+        existing = Complaint.objects.create(user=self.admin, **pothole)
+        drain = {**pothole, 'title': 'Overflowing drain', 'description': 'Sewage on the footpath since Monday',
+                 'location_lat': '17.395000', 'category': 'water'}
+        items = [
+            {**pothole, 'title': 'Huge pothole on main road!', 'location_lat': '17.385300'},
+            drain,
+            {**drain, 'location_lng': '78.486900'},
+            {**pothole, 'category': 'water'},
+        ]
+        response = self.post(items)
+        self.assertEqual(response.status_code, 201)
+        ids = response.data['ids']
+        self.assertEqual(
+            [Complaint.objects.get(id=complaint_id).duplicate_of_id for complaint_id in ids],
+            [existing.id, None, ids[1], None],
+        )
+
+    def test_derived_rows_match_single_creates(self):
+        def derived_rows():
+            return (
+                sorted(ComplaintCell.objects.values_list('precision', 'geohash', 'category', 'severity', 'status', 'count')),
+                sorted(ComplaintRollup.objects.values_list('day', 'category', 'severity', 'status', 'count')),
+                sorted(ComplaintStatus.objects.values_list('status', flat=True)),
+            )
+
+        image = 'data:image/jpeg;base64,' + base64.b64encode(JPEG_BYTES).decode()
+        items = self.items(2) + self.items(1, image=image, category='road', severity='high')
+        with self.captureOnCommitCallbacks(execute=True):
+            for item in items:
+                self.assertEqual(self.client.post('/complaints-create/', item, format='json').status_code, 201)
+        single = derived_rows()
+        Complaint.objects.all().delete()
+        ComplaintCell.objects.all().delete()
+        ComplaintRollup.objects.all().delete()
+
+        with mock.patch('citypulse_complaints.jobs.generate_complaint_thumbnail.enqueue_on_commit') as enqueue:
+            response = self.post(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(derived_rows(), single)
+        imported = Complaint.objects.get(id=response.data['ids'][2])
+        self.assertEqual(imported.image_content_type, 'image/jpeg')
+        self.assertEqual(get_blob_storage().read(imported.image_digest), JPEG_BYTES)
+        enqueue.assert_called_once_with(imported.id)
+
+    def test_invalid_image_saves_nothing(self):
+        response = self.post(self.items(1) + self.items(1, image='data:image/jpeg;base64,abc'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertIn('image', response.data['errors'][0]['errors'])
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_ndjson_body(self):
+        body = '\n'.join(json.dumps(item) for item in self.items(2)) + '\n'
+        response = self.client.post('/complaints/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+
+        response = self.client.post('/complaints/bulk/', '{"title": \n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_items_save_nothing(self):
+        items = self.items(3)
+        items[1]['category'] = 'noise'
+        del items[2]['title']
+        response = self.post(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('category', response.data['errors'][0]['errors'])
+        self.assertFalse(Complaint.objects.exists())
+        self.assertEqual(self.client.post('/complaints/bulk/', {'title': 'x'}, format='json').status_code, 400)
+
+    def test_query_count_barely_grows_with_batch_size(self):
+        def count_queries(items):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.post('/complaints/bulk/', items, format='json').status_code, 201)
+            return len(queries)
+
+        # Same spot, so each batch moves one set of cells by one amount. The
+        # only growth is SQLite's parameter limit splitting the INSERT.
+        small = count_queries(self.items(5, location_lat='17.385000'))
+        large = count_queries(self.items(100, location_lat='17.385000', category='water'))
+        self.assertLessEqual(large, small + 2)
+
+
+class ComplaintSearchTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = User.objects.create_user(username='citizen')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.pothole = self.make('Pothole on main road', 'Deep pothole near the school', 'road', 'high')
+        self.light = self.make('Street light out', 'The main road is dark at night', 'lights', 'medium')
+        self.garbage = self.make('Garbage bin overflowing', 'Smell near the market', 'garbage', 'low')
+
+    def make(self, title, description, category, severity):
+        return Complaint.objects.create(
+            user=self.user, title=title, description=description,
+            location_lat='17.385000', location_lng='78.486700', category=category, severity=severity,
+        )
+
+    def search(self, query):
+        response = self.client.get(f'/complaints/search/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_title_hits_rank_first(self):
+        data = self.search('q=main road')
+        self.assertEqual([row['id'] for row in data['results']], [self.pothole.id, self.light.id])
+        self.assertEqual(data['count'], 2)
+        self.assertGreater(data['results'][0]['rank'], data['results'][1]['rank'])
+
+    def test_prefix_matching(self):
+        self.assertEqual([row['id'] for row in self.search('q=overfl')['results']], [self.garbage.id])
+        # Only the last word, or one marked with *, is a prefix
+        self.assertEqual(self.search('q=overfl bin')['count'], 0)
+        self.assertEqual(self.search('q=overfl* bin')['count'], 1)
+        self.assertEqual(self.search('q=mark ')['count'], 0)
+
+    def test_facets_ignore_their_own_filter(self):
+        data = self.search('q=road&category=lights')
+        self.assertEqual([row['id'] for row in data['results']], [self.light.id])
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['facets']['category'], {'road': 1, 'lights': 1})
+        self.assertEqual(data['facets']['severity'], {'medium': 1})
+        self.assertEqual(data['facets']['status'], {'pending': 1})
+
+    def test_index_follows_writes(self):
+        self.pothole.title = 'Crater on the highway'
+        self.pothole.save()
+        self.garbage.delete()
+        self.assertEqual(self.search('q=crater')['count'], 1)
+        self.assertEqual(self.search('q=overflowing')['count'], 0)
+        # Queryset updates go through the triggers too
+        Complaint.objects.filter(id=self.light.id).update(description='Lamp flickering')
+        self.assertEqual(self.search('q=flicker')['count'], 1)
+        self.assertEqual(self.search('q=dark')['count'], 0)
+
+    def test_paging_and_validation(self):
+        first = self.search('q=road&page_size=1')
+        self.assertEqual(len(first['results']), 1)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['results'][0]['id'], self.light.id)
+        self.assertIsNone(second['next'])
+        # Match syntax in the input is treated as plain words
+        self.assertEqual(self.search('q=road" OR "x*')['count'], 0)
+        self.assertEqual(self.client.get('/complaints/search/?q=--').status_code, 400)
+        self.assertEqual(self.client.get('/complaints/search/?q=road&status=lost').status_code, 400)
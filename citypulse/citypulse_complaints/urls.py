@@ -2,13 +2,27 @@ from django.urls import path
 from .views import (
     AllComplaintsView,
     UserComplaintsView,
+    ComplaintExportView,
+    NearbyComplaintsView,
+    ComplaintSearchView,
+    ComplaintClustersView,
     ComplaintStatusView,
-    ComplaintCreateView
+    ComplaintCreateView,
+    ComplaintBulkCreateView,
+    ComplaintImageView,
+    ComplaintThumbnailView
 )
 
 urlpatterns = [
     path('complaints/', AllComplaintsView.as_view(), name='all-complaints'),
+    path('complaints/export/', ComplaintExportView.as_view(), name='complaint-export'),
     path('complaints/user/', UserComplaintsView.as_view(), name='user-complaints'),
+    path('complaints/nearby/', NearbyComplaintsView.as_view(), name='nearby-complaints'),
+    path('complaints/search/', ComplaintSearchView.as_view(), name='complaint-search'),
+    path('complaints/clusters/', ComplaintClustersView.as_view(), name='complaint-clusters'),
     path('complaints/<int:complaint_id>/status/', ComplaintStatusView.as_view(), name='complaint-status'),
+    path('complaints/<int:complaint_id>/image/', ComplaintImageView.as_view(), name='complaint-image'),
+    path('complaints/<int:complaint_id>/image/thumbnail/', ComplaintThumbnailView.as_view(), name='complaint-thumbnail'),
     path('complaints-create/', ComplaintCreateView.as_view(), name='create-complaint'),
+    path('complaints/bulk/', ComplaintBulkCreateView.as_view(), name='bulk-create-complaints'),
 ]
@@ -1,77 +1,410 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Complaint,ComplaintStatus
+from rest_framework.parsers import JSONParser
+from .models import Complaint,ComplaintStatus,ComplaintCell
 from .serializers import ComplaintStatusSerializer
-from .serializers import ComplaintSerializer
+from .serializers import ComplaintSerializer, ComplaintTimelineSerializer
+from citypulse.cache import cache_response
+from citypulse.export import EXPORT_FORMATS, ChunkedStreamingHttpResponse, date_range_filter, export_response
+from citypulse.pagination import KeysetPagination
+from citypulse.parsers import NDJSONParser
+from citypulse_users.permissions import IsAdminUserRole
+from citypulse_sync.sync import SINCE_PARAM, sync_response
+from .storage import get_blob_storage
+from .images import blob_version
+from .permissions import HasBlobSignature, IsAdminOrAssignedWorker
+from .geo import bbox_q, decode_bounds, filter_bbox, geohash_q, nearest, parse_bbox
+from .clusters import OPEN_STATUSES, precision_for_zoom
+from .status import InvalidTransition, transition
+from .bulk import BULK_MAX_ITEMS, import_complaints, validate_complaints
+from .filters import ComplaintFilter
+from .search import FACETS, SEARCH_VENDORS, parse_query, search_complaints
+import re
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from rest_framework.utils.urls import replace_query_param
+
+BLOB_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+NEARBY_DEFAULT_RADIUS_M = 1000
+NEARBY_MAX_RADIUS_M = 50000
+NEARBY_MAX_LIMIT = 200
+SEARCH_DEFAULT_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Plain columns only; image references stay out
+COMPLAINT_EXPORT_COLUMNS = (
+    'id', 'user_id', 'title', 'description', 'category', 'severity', 'status',
+    'location_lat', 'location_lng', 'created_at', 'duplicate_of_id',
+)
+
+
+def _iter_blob(fh, start, length):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(BLOB_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def blob_response(request, digest, content_type):
+    """
+    Stream a blob with ETag/If-None-Match and single-range Range support.
+    Blobs are content-addressed, so the digest is a strong validator. Only
+    URLs versioned with the current digest are cached for good; any other
+    URL for the same complaint may point at a different image later, so
+    caches revalidate it.
+    """
+    storage = get_blob_storage()
+    etag = f'"{digest}"'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': (
+            'public, max-age=31536000, immutable' if request.GET.get('v') == blob_version(digest)
+            else 'private, no-cache'
+        ),
+    }
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return HttpResponse(status=304, headers=headers)
+
+    if not storage.exists(digest):
+        return HttpResponse(status=404)
+    size = storage.size(digest)
+    start, length, status = 0, size, 200
+
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range == etag):
+        match = RANGE_RE.match(range_header.strip())
+        if match and any(match.groups()):
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                # Suffix range: the last N bytes
+                start = max(size - int(last), 0)
+                end = size - 1
+            if start >= size or start > end:
+                headers['Content-Range'] = f'bytes */{size}'
+                return HttpResponse(status=416, headers=headers)
+            length = end - start + 1
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response = ChunkedStreamingHttpResponse(
+        _iter_blob(storage.open(digest), start, length),
+        status=status,
+        content_type=content_type or 'application/octet-stream',
+        headers=headers,
+    )
+    response['Content-Length'] = str(length)
+    return response
+
 
 class AllComplaintsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # ?worker= reads tasks, so task writes must retire these pages too
+    @cache_response(scopes=('complaints', 'tasks'), skip_params=(SINCE_PARAM,))
     def get(self, request):
-        complaints = Complaint.objects.all()
-        serializer = ComplaintSerializer(complaints, many=True)
-        return Response(serializer.data)
+        if SINCE_PARAM in request.query_params:
+            return sync_response(request, Complaint.objects.all(), ComplaintSerializer)
+        filterset = ComplaintFilter(request.query_params)
+        try:
+            complaints = filterset.filter_queryset(Complaint.objects.all())
+            ordering = filterset.get_ordering()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                complaints = filter_bbox(complaints, *parse_bbox(bbox))
+            except ValueError as e:
+                return Response({"error": f"Invalid bbox: {e}"}, status=400)
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(complaints, request)
+        serializer = ComplaintSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
     
     
+class ComplaintExportView(APIView):
+    """
+    Stream complaints as CSV or NDJSON (`?output=`, default csv), oldest
+    first, optionally limited to `?from=` / `?to=` filing dates.
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({"error": f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+        try:
+            filters = date_range_filter(request.query_params, 'created_at')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        complaints = Complaint.objects.filter(filters).order_by('created_at', 'id')
+        return export_response(complaints, COMPLAINT_EXPORT_COLUMNS, output, 'complaints')
+
+
 class UserComplaintsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response(scopes=('complaints', 'tasks'), per_user=True, skip_params=(SINCE_PARAM,))
     def get(self, request):
-        user_complaints = Complaint.objects.filter(user=request.user)
-        serializer = ComplaintSerializer(user_complaints, many=True)
-        return Response(serializer.data)
+        if SINCE_PARAM in request.query_params:
+            return sync_response(
+                request, Complaint.objects.filter(user=request.user), ComplaintSerializer, owner_id=request.user.id
+            )
+        filterset = ComplaintFilter(request.query_params)
+        try:
+            user_complaints = filterset.filter_queryset(Complaint.objects.filter(user=request.user))
+            ordering = filterset.get_ordering()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(user_complaints, request)
+        serializer = ComplaintSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
     
     
+class NearbyComplaintsView(APIView):
+    """
+    Complaints within `radius` metres of (lat, lng), nearest first, each
+    with its `distance` in metres.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            lat = float(request.query_params['lat'])
+            lng = float(request.query_params['lng'])
+            radius = float(request.query_params.get('radius', NEARBY_DEFAULT_RADIUS_M))
+            limit = int(request.query_params.get('limit', NEARBY_MAX_LIMIT))
+        except (KeyError, ValueError):
+            return Response({"error": "lat and lng are required; radius and limit must be numbers"}, status=400)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return Response({"error": "lat/lng out of range"}, status=400)
+        if not (0 < radius <= NEARBY_MAX_RADIUS_M):
+            return Response({"error": f"radius must be between 0 and {NEARBY_MAX_RADIUS_M} metres"}, status=400)
+        limit = max(1, min(limit, NEARBY_MAX_LIMIT))
+
+        def fetch(bbox):
+            # Coordinates only; full rows are loaded for the winners below
+            return Complaint.objects.filter(bbox_q(*bbox)).values_list('id', 'location_lat', 'location_lng')
+
+        ranked = nearest(lat, lng, radius, limit, fetch)
+        ids = [complaint_id for _, complaint_id in ranked]
+        complaints = Complaint.objects.in_bulk(ids)
+        serializer = ComplaintSerializer(
+            [complaints[complaint_id] for complaint_id in ids], many=True, context={'request': request}
+        )
+        results = serializer.data
+        for row, (distance, _) in zip(results, ranked):
+            row['distance'] = round(distance, 1)
+        return Response({'results': results})
+
+
+class ComplaintSearchView(APIView):
+    """
+    Full-text search over titles and descriptions (`?q=`), best match
+    first, with optional comma-separated `?category=`, `?severity=` and
+    `?status=` filters. Pages with `?offset=` / `?page_size=`; `facets`
+    counts the matches per category, severity and status.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @cache_response(scopes=('complaints',))
+    def get(self, request):
+        if connection.vendor not in SEARCH_VENDORS:
+            return Response({"error": "Search is not available on this database"}, status=501)
+        terms = parse_query(request.query_params.get('q', ''))
+        if not terms:
+            return Response({"error": "q must contain at least one word"}, status=400)
+        filters = {}
+        for field, choices in FACETS.items():
+            values = request.query_params.get(field)
+            if values:
+                filters[field] = values.split(',')
+                if not set(filters[field]) <= choices:
+                    return Response({"error": f"{field} must be among {', '.join(sorted(choices))}"}, status=400)
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            page_size = int(request.query_params.get('page_size', SEARCH_DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "offset and page_size must be integers"}, status=400)
+        page_size = max(1, min(page_size, SEARCH_MAX_PAGE_SIZE))
+
+        ranked, total, facets = search_complaints(connection, terms, filters, page_size, offset)
+        complaints = Complaint.objects.in_bulk([complaint_id for complaint_id, _ in ranked])
+        # Rows deleted since the index was read drop out
+        ranked = [(complaint_id, score) for complaint_id, score in ranked if complaint_id in complaints]
+        serializer = ComplaintSerializer(
+            [complaints[complaint_id] for complaint_id, _ in ranked], many=True, context={'request': request}
+        )
+        results = serializer.data
+        for row, (_, score) in zip(results, ranked):
+            row['rank'] = round(score, 6)
+        next_link = None
+        if offset + page_size < total:
+            next_link = replace_query_param(request.build_absolute_uri(), 'offset', offset + page_size)
+        return Response({'count': total, 'next': next_link, 'facets': facets, 'results': results})
+
+
+class ComplaintClustersView(APIView):
+    """
+    Complaint counts per map cell for a zoom level, broken down by category
+    and severity. Reads the precomputed ComplaintCell rows, optionally
+    limited to ?bbox= and ?status= (default: open complaints).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            zoom = int(request.query_params.get('zoom', 0))
+        except ValueError:
+            return Response({"error": "zoom must be an integer"}, status=400)
+        precision = precision_for_zoom(max(zoom, 0))
+        statuses = request.query_params.get('status')
+        statuses = statuses.split(',') if statuses else OPEN_STATUSES
+
+        cells = ComplaintCell.objects.filter(precision=precision, status__in=statuses, count__gt=0)
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                # Cell keys are `precision` characters long; finer bounds would skip them
+                cells = cells.filter(geohash_q(*parse_bbox(bbox), max_precision=precision))
+            except ValueError as e:
+                return Response({"error": f"Invalid bbox: {e}"}, status=400)
+
+        clusters = {}
+        for geohash, category, severity, count in cells.values_list('geohash', 'category', 'severity', 'count'):
+            cluster = clusters.get(geohash)
+            if cluster is None:
+                min_lat, min_lng, max_lat, max_lng = decode_bounds(geohash)
+                cluster = clusters[geohash] = {
+                    'cell': geohash,
+                    'lat': (min_lat + max_lat) / 2,
+                    'lng': (min_lng + max_lng) / 2,
+                    'bounds': [min_lng, min_lat, max_lng, max_lat],
+                    'count': 0,
+                    'by_category': {},
+                    'by_severity': {},
+                }
+            cluster['count'] += count
+            cluster['by_category'][category] = cluster['by_category'].get(category, 0) + count
+            cluster['by_severity'][severity] = cluster['by_severity'].get(severity, 0) + count
+        return Response({
+            'zoom': zoom,
+            'precision': precision,
+            'cells': sorted(clusters.values(), key=lambda cluster: cluster['cell']),
+        })
+
+
 class ComplaintStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def get_permissions(self):
+        # Anyone signed in can read a timeline; changing it is restricted
+        if self.request.method == 'POST':
+            return [IsAdminOrAssignedWorker()]
+        return super().get_permissions()
+
     def get(self, request, complaint_id):
-        statuses = Complaint.objects.filter(id=complaint_id)
-        serializer = ComplaintSerializer(statuses, many=True)
+        # One query for the complaint and one for its whole timeline
+        complaints = Complaint.objects.filter(id=complaint_id).prefetch_related(
+            Prefetch('statuses', queryset=ComplaintStatus.objects.order_by('updated_at', 'id'))
+        )
+        serializer = ComplaintTimelineSerializer(complaints, many=True, context={'request': request})
         return Response(serializer.data)
 
-from citypulse_notifications.models import Notification
-from django.contrib.auth.models import User
-from citypulse_notifications.utils import send_notification
+    def post(self, request, complaint_id):
+        new_status = request.data.get('status')
+        if not new_status:
+            return Response({"error": "status is required"}, status=400)
+        complaint = Complaint.objects.filter(id=complaint_id).first()
+        if complaint is None:
+            return Response({"error": "Complaint not found"}, status=404)
+        try:
+            entry = transition(complaint, new_status)
+        except InvalidTransition as exc:
+            return Response({"error": str(exc)}, status=400)
+        return Response(ComplaintStatusSerializer(entry).data, status=201)
+
+
+class ComplaintImageView(APIView):
+    permission_classes = [IsAuthenticated | HasBlobSignature]
+
+    def get(self, request, complaint_id):
+        complaint = (
+            Complaint.objects.filter(id=complaint_id)
+            .only('id', 'image_digest', 'image_content_type')
+            .first()
+        )
+        if complaint is None or not complaint.image_digest:
+            return Response({"error": "Image not found"}, status=404)
+        return blob_response(request, complaint.image_digest, complaint.image_content_type)
+
+
+class ComplaintThumbnailView(APIView):
+    permission_classes = [IsAuthenticated | HasBlobSignature]
+
+    def get(self, request, complaint_id):
+        complaint = (
+            Complaint.objects.filter(id=complaint_id)
+            .only('id', 'thumbnail_digest')
+            .first()
+        )
+        if complaint is None or not complaint.thumbnail_digest:
+            return Response({"error": "Thumbnail not found"}, status=404)
+        return blob_response(request, complaint.thumbnail_digest, 'image/jpeg')
+
+from .duplicates import link_duplicate
+from .jobs import notify_complaint_created
 
 
 class ComplaintCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        # print(request.data)
-        title=request.data.get('title')
-    
-        serializer = ComplaintSerializer(data=request.data)
+        serializer = ComplaintSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
-            serializer.save(user=request.user)
-            # Notification.objects.create(
-            #     user=request.user,  # assuming complaint.user is the creator
-            #     message=f"Your complaint '{title}' has been submitted.",
-            #     complaint=serializer.instance
-            # )
-            # admins = User.objects.filter(profile__role='admin')
-            # for admin in admins:
-            #     Notification.objects.create(
-            #         user=admin,
-            #         message=f"New complaint '{title}' created by {request.user.username}.",
-            #         complaint=serializer.instance
-            #     )
-            send_notification(
-                    user=request.user,
-                    message=f"Your complaint '{title}' has been submitted.",
-                    complaint=serializer.instance
-                )
-
-            admins = User.objects.filter(profile__role='admin')
-            for admin in admins:
-                    send_notification(
-                        user=admin,
-                        message=f"New complaint '{title}' created by {request.user.username}.",
-                        complaint=serializer.instance
-                    )
-            # serializer.save(user=request.user)
+            with transaction.atomic():
+                complaint = serializer.save(user=request.user)
+                link_duplicate(complaint)
+                # Notification fan-out runs in the job worker once committed
+                notify_complaint_created.enqueue_on_commit(complaint.id)
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
+
+
+class ComplaintBulkCreateView(APIView):
+    """
+    Create many complaints in one request from a JSON array or an NDJSON
+    body. Nothing is saved unless every item is valid.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "Expected a list of complaints"}, status=400)
+        if len(items) > BULK_MAX_ITEMS:
+            return Response({"error": f"At most {BULK_MAX_ITEMS} complaints per request"}, status=400)
+        validated, errors = validate_complaints(items)
+        if errors:
+            return Response({"errors": errors}, status=400)
+        complaints = import_complaints(request.user, validated)
+        return Response({"created": len(complaints), "ids": [complaint.id for complaint in complaints]}, status=201)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class CitypulseJobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'citypulse_jobs'
+
+    def ready(self):
+        # Register the @job handlers defined in every app's jobs.py
+        autodiscover_modules('jobs')
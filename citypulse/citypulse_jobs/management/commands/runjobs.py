@@ -0,0 +1,48 @@
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.core.management.base import BaseCommand, CommandError
+
+from citypulse_jobs.worker import JobWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the database job queue in their own process. Set JOB_WORKER=external "
+        "on the web processes so they don't run jobs too, and REDIS_URL on both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help="Number of worker threads (default: JOB_QUEUE['CONCURRENCY']).",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help="Seconds to sleep when the queue is empty (default: JOB_QUEUE['POLL_INTERVAL']).",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Process every job that is currently due, then exit.",
+        )
+        parser.add_argument(
+            '--allow-in-memory-layer', action='store_true',
+            help="Run with the in-memory channel layer, whose notifications never leave this process.",
+        )
+
+    def handle(self, *args, **options):
+        # Jobs push notifications through the channel layer; an in-memory
+        # layer in this process can't reach sockets held by Daphne
+        if isinstance(get_channel_layer(), InMemoryChannelLayer) and not options['allow_in_memory_layer']:
+            raise CommandError(
+                "The in-memory channel layer can't deliver notifications to other processes. "
+                "Set REDIS_URL to use channels_redis, or pass --allow-in-memory-layer."
+            )
+
+        worker = JobWorker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+        if options['once']:
+            worker.requeue_stale()
+            processed = worker.run_once()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
+            return
+
+        self.stdout.write(f"Job worker {worker.worker_id} running with {worker.concurrency} thread(s).")
+        worker.run()
@@ -0,0 +1,98 @@
+# citypulse_jobs/queue.py
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+# Set once a JobWorker is created in this process
+worker_started = threading.Event()
+_warned_no_worker = False
+
+
+def get_job_settings():
+    defaults = {
+        'CONCURRENCY': 4,
+        'POLL_INTERVAL': 1.0,
+        'MAX_ATTEMPTS': 5,
+        'BACKOFF_BASE': 2,
+        'BACKOFF_MAX': 3600,
+        'LOCK_TIMEOUT': 300,
+        'REQUEUE_INTERVAL': 60,
+        'IN_PROCESS': True,
+        'IN_PROCESS_CONCURRENCY': 1,
+    }
+    defaults.update(getattr(settings, 'JOB_QUEUE', {}))
+    return defaults
+
+
+def job(func):
+    """
+    Register a function as a background job handler. Arguments must be
+    JSON serializable; pass ids rather than model instances.
+    """
+    name = f"{func.__module__}.{func.__name__}"
+    registry[name] = func
+    func.job_name = name
+    func.enqueue = lambda *args, **kwargs: enqueue(name, *args, **kwargs)
+    func.enqueue_on_commit = lambda *args, **kwargs: enqueue_on_commit(name, *args, **kwargs)
+    return func
+
+
+def _job_name(func_or_name):
+    name = getattr(func_or_name, 'job_name', func_or_name)
+    if name not in registry:
+        raise KeyError(f"Unknown job: {name}")
+    return name
+
+
+def enqueue(func_or_name, *args, run_at=None, max_attempts=None, **kwargs):
+    """
+    Insert a job row now. Prefer enqueue_on_commit from request handlers so
+    workers never pick up a job whose data was rolled back.
+    """
+    config = get_job_settings()
+    job = Job.objects.create(
+        name=_job_name(func_or_name),
+        payload={'args': list(args), 'kwargs': kwargs},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or config['MAX_ATTEMPTS'],
+    )
+    if config['IN_PROCESS']:
+        _warn_if_no_worker(job)
+    return job
+
+
+def _warn_if_no_worker(job):
+    # With IN_PROCESS on, jobs run in the web processes started through
+    # citypulse.asgi or citypulse.wsgi; from any other entry point they
+    # would pile up silently
+    global _warned_no_worker
+    if worker_started.is_set() or _warned_no_worker:
+        return
+    _warned_no_worker = True
+    logger.warning(
+        "Job %s was enqueued in a process without a job worker; it waits until a web process "
+        "started through citypulse.asgi or citypulse.wsgi, or `manage.py runjobs`, picks it up",
+        job,
+    )
+
+
+def enqueue_on_commit(func_or_name, *args, **kwargs):
+    """
+    Enqueue once the current transaction commits (immediately in autocommit).
+    """
+    _job_name(func_or_name)
+    transaction.on_commit(lambda: enqueue(func_or_name, *args, **kwargs))
+
+
+def backoff_delay(attempts):
+    config = get_job_settings()
+    return timedelta(seconds=min(config['BACKOFF_BASE'] ** attempts, config['BACKOFF_MAX']))
@@ -0,0 +1,147 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import enqueue, job
+from . import queue as queue_module
+from . import worker as worker_module
+from .worker import JobWorker, start_in_process_worker
+
+calls = []
+
+
+@job
+def record_call(value):
+    calls.append(value)
+
+
+@job
+def always_fails():
+    raise RuntimeError("boom")
+
+
+@job
+def create_user(username):
+    User.objects.create_user(username=username)
+
+
+@override_settings(JOB_QUEUE={'MAX_ATTEMPTS': 3, 'BACKOFF_BASE': 2, 'REQUEUE_INTERVAL': 3600})
+class JobWorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_due_jobs(self):
+        enqueue(record_call, 'a')
+        record_call.enqueue('b')
+        enqueue(record_call, 'later', run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(JobWorker().run_once(), 2)
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertEqual(Job.objects.filter(status='done').count(), 2)
+        self.assertEqual(Job.objects.filter(status='queued').count(), 1)
+
+    def test_enqueue_on_commit_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record_call.enqueue_on_commit('x')
+            self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Job.objects.get().payload, {'args': ['x'], 'kwargs': {}})
+
+    def test_failures_back_off_then_fail(self):
+        failing = enqueue(always_fails)
+        worker = JobWorker()
+        for attempt in range(1, 4):
+            self.assertEqual(worker.run_once(), 1)
+            failing.refresh_from_db()
+            self.assertEqual(failing.attempts, attempt)
+            self.assertIn('RuntimeError: boom', failing.last_error)
+            if failing.status == 'queued':
+                self.assertGreater(failing.run_at, timezone.now())
+                Job.objects.filter(id=failing.id).update(run_at=timezone.now())
+        self.assertEqual(failing.status, 'failed')
+
+    def test_only_one_worker_wins_a_claim(self):
+        enqueue(record_call, 'once')
+        first, second = JobWorker(worker_id='a'), JobWorker(worker_id='b')
+        self.assertIsNotNone(first.claim())
+        self.assertIsNone(second.claim())
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = enqueue(record_call, 'stale')
+        Job.objects.filter(id=stale.id).update(
+            status='running', locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(JobWorker().requeue_stale(), 1)
+
+    def test_writes_of_a_job_requeued_while_running_are_rolled_back(self):
+        enqueue(create_user, 'ghost')
+        worker = JobWorker(worker_id='slow')
+        claimed = worker.claim()
+        # Requeued as stale and claimed again by another worker meanwhile
+        Job.objects.filter(id=claimed.id).update(locked_by='other:1')
+        self.assertFalse(worker.execute(claimed))
+        self.assertFalse(User.objects.filter(username='ghost').exists())
+        self.assertEqual(Job.objects.get(id=claimed.id).locked_by, 'other:1')
+
+        enqueue(create_user, 'once')
+        self.assertEqual(worker.run_once(), 1)
+        self.assertTrue(User.objects.filter(username='once').exists())
+
+    def test_stale_jobs_are_requeued_periodically_while_running(self):
+        worker = JobWorker()
+        self.assertEqual(worker.requeue_stale_if_due(), 0)
+        stale = enqueue(record_call, 'stale')
+        Job.objects.filter(id=stale.id).update(
+            status='running', locked_at=timezone.now() - timedelta(hours=1)
+        )
+        # Not due again until REQUEUE_INTERVAL has passed
+        self.assertEqual(worker.requeue_stale_if_due(), 0)
+        worker._next_requeue = 0.0
+        self.assertEqual(worker.requeue_stale_if_due(), 1)
+        self.assertEqual(worker.run_once(), 1)
+        self.assertEqual(calls, ['stale'])
+
+    def test_runjobs_refuses_the_in_memory_channel_layer(self):
+        enqueue(record_call, 'a')
+        with self.assertRaisesMessage(CommandError, 'REDIS_URL'):
+            call_command('runjobs', '--once')
+        self.assertEqual(calls, [])
+        out = StringIO()
+        call_command('runjobs', '--once', '--allow-in-memory-layer', stdout=out)
+        self.assertIn('Processed 1 job(s).', out.getvalue())
+
+    def test_enqueuing_without_a_worker_warns_once(self):
+        started = threading.Event()
+        with mock.patch.object(queue_module, 'worker_started', started), \
+                mock.patch.object(worker_module, 'worker_started', started), \
+                mock.patch.object(queue_module, '_warned_no_worker', False):
+            with self.settings(JOB_QUEUE={'IN_PROCESS': False}), self.assertNoLogs('citypulse_jobs.queue'):
+                enqueue(record_call, 'external')
+            with self.assertLogs('citypulse_jobs.queue', 'WARNING') as logs:
+                enqueue(record_call, 'a')
+            self.assertIn('without a job worker', logs.output[0])
+            with self.assertNoLogs('citypulse_jobs.queue'):
+                enqueue(record_call, 'b')
+
+            queue_module._warned_no_worker = False
+            JobWorker()
+            with self.assertNoLogs('citypulse_jobs.queue'):
+                enqueue(record_call, 'c')
+
+    def test_web_processes_run_a_worker_unless_runjobs_is_external(self):
+        self.addCleanup(setattr, worker_module, '_in_process_worker', None)
+        with mock.patch.object(JobWorker, 'start') as start:
+            with self.settings(JOB_QUEUE={'IN_PROCESS': False}):
+                self.assertIsNone(start_in_process_worker())
+            worker = start_in_process_worker()
+            self.assertEqual(worker.concurrency, 1)
+            self.assertIs(start_in_process_worker(), worker)
+        start.assert_called_once_with()
@@ -0,0 +1,195 @@
+# citypulse_jobs/worker.py
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .queue import backoff_delay, get_job_settings, registry, worker_started
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimLost(Exception):
+    pass
+
+
+class JobWorker:
+    """
+    Polls the Job table and runs due jobs. Jobs are claimed with a
+    conditional UPDATE (status='queued' -> 'running'), which works on both
+    SQLite and Postgres without row locks; only one worker can win a claim.
+    """
+
+    def __init__(self, concurrency=None, poll_interval=None, worker_id=None):
+        config = get_job_settings()
+        self.concurrency = concurrency or config['CONCURRENCY']
+        self.poll_interval = poll_interval if poll_interval is not None else config['POLL_INTERVAL']
+        self.lock_timeout = config['LOCK_TIMEOUT']
+        self.requeue_interval = config['REQUEUE_INTERVAL']
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self._requeue_lock = threading.Lock()
+        self._next_requeue = 0.0
+        worker_started.set()
+
+    def requeue_stale(self):
+        """
+        Return jobs whose worker died mid-run to the queue.
+        """
+        cutoff = timezone.now() - timedelta(seconds=self.lock_timeout)
+        return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+            status='queued', locked_by=None, locked_at=None
+        )
+
+    def requeue_stale_if_due(self):
+        """
+        requeue_stale() at most once every REQUEUE_INTERVAL seconds across
+        this worker's threads, so jobs orphaned by other workers dying while
+        this one runs are picked up too.
+        """
+        with self._requeue_lock:
+            now = time.monotonic()
+            if now < self._next_requeue:
+                return 0
+            self._next_requeue = now + self.requeue_interval
+        return self.requeue_stale()
+
+    def claim(self):
+        now = timezone.now()
+        candidates = (
+            Job.objects.filter(status='queued', run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:self.concurrency * 2]
+        )
+        for job_id in candidates:
+            claimed = Job.objects.filter(id=job_id, status='queued').update(
+                status='running',
+                locked_by=f"{self.worker_id}:{threading.get_ident()}",
+                locked_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Job.objects.get(id=job_id)
+        return None
+
+    def execute(self, job):
+        try:
+            handler = registry[job.name]
+            # A failed attempt leaves no partial writes behind, so retries are
+            # safe. The handler's writes commit with the 'done' mark, so a crash
+            # in between can't run it twice; if the job was requeued as stale
+            # meanwhile, they are rolled back and whoever claims it next runs it
+            with transaction.atomic():
+                handler(*job.payload.get('args', []), **job.payload.get('kwargs', {}))
+                finished = Job.objects.filter(id=job.id, status='running', locked_by=job.locked_by).update(
+                    status='done', locked_by=None, locked_at=None, updated_at=timezone.now()
+                )
+                if not finished:
+                    raise ClaimLost()
+        except ClaimLost:
+            logger.warning("Job %s was requeued while running; its writes were rolled back", job)
+            return False
+        except Exception:
+            error = traceback.format_exc()
+            if job.attempts >= job.max_attempts:
+                logger.error("Job %s failed permanently after %d attempts", job, job.attempts)
+                Job.objects.filter(id=job.id).update(
+                    status='failed', last_error=error, locked_by=None, locked_at=None,
+                    updated_at=timezone.now(),
+                )
+            else:
+                logger.warning("Job %s failed, retrying (attempt %d)", job, job.attempts)
+                Job.objects.filter(id=job.id).update(
+                    status='queued', last_error=error, locked_by=None, locked_at=None,
+                    run_at=timezone.now() + backoff_delay(job.attempts),
+                    updated_at=timezone.now(),
+                )
+            return False
+        return True
+
+    def run_once(self):
+        """
+        Run every job that is currently due, in this thread. Returns the
+        number of jobs processed.
+        """
+        processed = 0
+        while True:
+            job = self.claim()
+            if job is None:
+                return processed
+            self.execute(job)
+            processed += 1
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            close_old_connections()
+            try:
+                self.requeue_stale_if_due()
+                job = self.claim()
+                if job is not None:
+                    self.execute(job)
+                    continue
+            except Exception:
+                logger.exception("Job worker loop error")
+            self.stop_event.wait(self.poll_interval)
+        close_old_connections()
+
+    def run(self):
+        """
+        Run `concurrency` polling threads until stop() is called. Stale
+        jobs are requeued on the first poll and every REQUEUE_INTERVAL
+        seconds after that.
+        """
+        threads = self.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+    def start(self):
+        """
+        Start `concurrency` daemon polling threads and return them.
+        """
+        threads = [
+            threading.Thread(target=self._loop, name=f"job-worker-{index}", daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def stop(self):
+        self.stop_event.set()
+
+
+_in_process_worker = None
+_in_process_lock = threading.Lock()
+
+
+def start_in_process_worker():
+    """
+    Run a JobWorker on daemon threads inside this web process, unless
+    JOB_QUEUE['IN_PROCESS'] is off because `manage.py runjobs` runs as its
+    own process. Returns the worker, or None.
+    """
+    global _in_process_worker
+    config = get_job_settings()
+    if not config['IN_PROCESS']:
+        return None
+    with _in_process_lock:
+        if _in_process_worker is None:
+            _in_process_worker = JobWorker(concurrency=config['IN_PROCESS_CONCURRENCY'])
+            _in_process_worker.start()
+        return _in_process_worker
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CitypulseNotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'citypulse_notifications'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,48 +1,235 @@
 # citypulse_notifications/consumers.py
+"""
+Per-user notification socket. Frames the server sends:
+
+    {"type": "notifications", "notifications": [...], "unread_count": n}
+    {"type": "unread_count", "unread_count": n}
+    {"type": "acked", "ids": [...], "updated": n}
+    {"type": "error", "error": "..."}
+
+Notifications arriving within COALESCE_SECONDS of each other go out as one
+"notifications" frame, and so does everything that queues up while a frame
+is being written to a slow client. Each connection queues at most
+MAX_PENDING notifications; past that OVERFLOW_POLICY applies:
+
+    drop_oldest  keep the newest, report how many were lost in "dropped"
+    drop_newest  keep the oldest, so a replay from the last id received
+                 picks up exactly where the client stopped
+    close        close with code 4008; the client reconnects and replays
+
+Unread counts are state, not events, so only the latest is ever queued. A
+client reconnecting with ?last_seen_id=N first
+gets what it missed in a "notifications" frame with "replay": true ("more"
+means fetch the rest over HTTP). Clients mark notifications read by
+sending batches of ids: {"type": "ack", "ids": [...]} or
+{"type": "ack", "all": true}.
+"""
+import asyncio
 import json
+import logging
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import User
+from django.conf import settings
+
+from .dispatcher import dispatcher
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LAST_SEEN_PARAM = 'last_seen_id'
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'close')
+# Close code for a client too slow to keep up (4000-4999 are application codes)
+SLOW_CONSUMER_CLOSE_CODE = 4008
+
+
+def get_socket_settings():
+    defaults = {
+        'COALESCE_SECONDS': 0.05,
+        'REPLAY_LIMIT': 100,
+        'MAX_ACK_IDS': 500,
+        'MAX_PENDING': 100,
+        'OVERFLOW_POLICY': 'drop_oldest',
+    }
+    defaults.update(getattr(settings, 'NOTIFICATION_SOCKET', {}))
+    if defaults['OVERFLOW_POLICY'] not in OVERFLOW_POLICIES:
+        raise ValueError(f"NOTIFICATION_SOCKET['OVERFLOW_POLICY'] must be one of {', '.join(OVERFLOW_POLICIES)}")
+    return defaults
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
-        
+
         # Anonymous users can't connect
         if self.user.is_anonymous:
             await self.close()
             return
-        
+
+        self.config = get_socket_settings()
+        dispatcher.bind_loop(asyncio.get_running_loop())
+        # Notifications waiting for the next coalesced frame, bounded by MAX_PENDING
+        self.pending = []
+        self.pending_count = None
+        self.dropped = 0
+        self.closing = False
+        self.flush_task = None
+        # Ids sent by the replay, so live copies of them are skipped
+        self.replayed_ids = set()
+
         # Each user gets their own notification group
         self.notification_group_name = f"user_{self.user.id}_notifications"
-        
+
         # Join room group
         await self.channel_layer.group_add(
             self.notification_group_name,
             self.channel_name
         )
-        print("Connected to notification group:", self.notification_group_name)
+        logger.debug("Connected to notification group %s", self.notification_group_name)
         await self.accept()
-    
+
+        last_seen_id = parse_qs(self.scope.get("query_string", b"").decode()).get(LAST_SEEN_PARAM, [None])[0]
+        if last_seen_id is not None and last_seen_id.isdigit():
+            await self.replay(int(last_seen_id))
+        else:
+            await self.send_unread_count(await self.get_notification_count())
+
     async def disconnect(self, close_code):
+        if getattr(self, 'flush_task', None) is not None:
+            self.flush_task.cancel()
         # Leave room group
         if hasattr(self, 'notification_group_name'):
             await self.channel_layer.group_discard(
                 self.notification_group_name,
                 self.channel_name
             )
-    
+
     # Receive message from WebSocket
-    async def receive(self, text_data):
-        # We could handle client-to-server messages here if needed
-        pass
-    
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data or '')
+        except ValueError:
+            return await self.send_error("Messages must be JSON")
+        if not isinstance(message, dict) or message.get("type") != "ack":
+            return await self.send_error("Unknown message type")
+        if message.get("all") is True:
+            ids = None
+        else:
+            ids = message.get("ids")
+            if (not isinstance(ids, list) or not ids
+                    or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+                return await self.send_error("ids must be a non-empty list of notification ids")
+            if len(ids) > self.config['MAX_ACK_IDS']:
+                return await self.send_error(f"At most {self.config['MAX_ACK_IDS']} ids per ack")
+        updated = await self.mark_read(ids)
+        # The new unread count follows through the group, to every open tab
+        await self.send(text_data=json.dumps({"type": "acked", "ids": ids or [], "updated": updated}))
+
     # Receive message from notification group
     async def notification_message(self, event):
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps(event["content"]))
+        if self.closing or event["content"]["id"] in self.replayed_ids:
+            return
+        if len(self.pending) >= self.config['MAX_PENDING']:
+            policy = self.config['OVERFLOW_POLICY']
+            if policy == 'close':
+                return await self.close_slow_consumer()
+            metrics.incr('dropped')
+            self.dropped += 1
+            if policy == 'drop_newest':
+                self.set_pending_count(event.get("unread_count"))
+                return
+            self.pending.pop(0)
+        self.pending.append(event["content"])
+        self.set_pending_count(event.get("unread_count"))
+        self.schedule_flush()
+
+    # Unread count changed (e.g. notifications marked as read)
+    async def unread_count(self, event):
+        if not self.closing:
+            self.set_pending_count(event["unread_count"])
+            self.schedule_flush()
+
+    def set_pending_count(self, count):
+        if count is not None:
+            if self.pending_count is not None:
+                metrics.incr('counts_coalesced')
+            self.pending_count = count
+
+    def schedule_flush(self):
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.config['COALESCE_SECONDS'])
+        # Whatever arrives while a frame is being written goes in the next one
+        while self.pending or self.pending_count is not None:
+            await self.flush()
+        self.flush_task = None
+
+    async def flush(self):
+        notifications, count, dropped = self.pending, self.pending_count, self.dropped
+        self.pending, self.pending_count, self.dropped = [], None, 0
+        if notifications or dropped:
+            metrics.incr('coalesced', max(len(notifications) - 1, 0))
+            await self.send_notifications(notifications, count, **({"dropped": dropped} if dropped else {}))
+        elif count is not None:
+            await self.send_unread_count(count)
+
+    async def close_slow_consumer(self):
+        self.closing = True
+        self.pending, self.pending_count = [], None
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        metrics.incr('closed_slow')
+        await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+
+    async def replay(self, last_seen_id):
+        notifications, more, count = await self.get_missed_notifications(last_seen_id)
+        self.replayed_ids = {notification["id"] for notification in notifications}
+        await self.send_notifications(notifications, count, replay=True, more=more)
+
+    async def send_notifications(self, notifications, count, **extra):
+        metrics.incr('frames_sent')
+        await self.send(text_data=json.dumps({
+            "type": "notifications",
+            "notifications": notifications,
+            "unread_count": count,
+            **extra,
+        }))
+
+    async def send_unread_count(self, count):
+        await self.send(text_data=json.dumps({"type": "unread_count", "unread_count": count}))
+
+    async def send_error(self, error):
+        await self.send(text_data=json.dumps({"type": "error", "error": error}))
 
     @database_sync_to_async
     def get_notification_count(self):
+        from citypulse_notifications.utils import get_unread_count
+        return get_unread_count(self.user.id)
+
+    @database_sync_to_async
+    def get_missed_notifications(self, last_seen_id):
+        """
+        Up to REPLAY_LIMIT notifications after last_seen_id, oldest first,
+        whether more remain, and the unread count.
+        """
         from citypulse_notifications.models import Notification
-        return Notification.objects.filter(user=self.user, is_read=False).count()
\ No newline at end of file
+        from citypulse_notifications.serializers import NotificationSerializer
+        from citypulse_notifications.utils import get_unread_count
+        limit = self.config['REPLAY_LIMIT']
+        missed = list(
+            Notification.objects.filter(user_id=self.user.id, id__gt=last_seen_id).order_by('id')[:limit + 1]
+        )
+        return (
+            NotificationSerializer(missed[:limit], many=True).data,
+            len(missed) > limit,
+            get_unread_count(self.user.id),
+        )
+
+    @database_sync_to_async
+    def mark_read(self, ids):
+        from citypulse_notifications.utils import mark_notifications_read
+        return mark_notifications_read(self.user.id, ids)
@@ -0,0 +1,163 @@
+# citypulse_notifications/dispatcher.py
+import asyncio
+import logging
+import queue
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+# Queued batches merged into one delivery round at most
+MERGE_BATCHES = 100
+
+
+def get_dispatch_settings():
+    defaults = {
+        'MAX_QUEUED_BATCHES': 1000,
+    }
+    defaults.update(getattr(settings, 'NOTIFICATION_DISPATCH', {}))
+    return defaults
+
+
+def coalesce_counts(messages):
+    """
+    Drop unread_count events that a later event for the same group
+    supersedes (a newer count, or a notification carrying one).
+    """
+    kept, counted = [], set()
+    for group, event in reversed(messages):
+        if event.get("unread_count") is not None:
+            if event["type"] == "unread_count" and group in counted:
+                continue
+            counted.add(group)
+        kept.append((group, event))
+    metrics.incr('counts_coalesced', len(messages) - len(kept))
+    return kept[::-1]
+
+
+class NotificationDispatcher:
+    """
+    Delivers channel-layer messages from a single background thread so
+    request handlers never block on group_send. The queue is bounded: when
+    delivery falls behind, new batches are dropped (clients catch up from
+    the database via replay) rather than buffered without limit. Batches
+    queued while one was being sent are delivered together, concurrently,
+    on the dispatcher's own event loop.
+
+    The in-memory channel layer is not thread-safe: a message put on it from
+    another loop doesn't wake the consumer waiting for it. With that layer
+    batches are sent on the server's loop instead (see bind_loop()), which
+    costs nothing since its group_send never waits on I/O.
+    """
+
+    def __init__(self, max_batches=None):
+        if max_batches is None:
+            max_batches = get_dispatch_settings()['MAX_QUEUED_BATCHES']
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server_loop = None
+        self._scheduled = set()
+
+    def bind_loop(self, loop):
+        """
+        Remember the event loop the consumers run on, for the in-memory
+        layer. Called by every consumer as it connects.
+        """
+        self._server_loop = loop
+
+    def submit(self, messages):
+        """
+        Queue a batch of (group_name, event) pairs for delivery. Returns
+        False if the queue was full and the batch was dropped.
+        """
+        messages = list(messages)
+        if not messages:
+            return True
+        if isinstance(get_channel_layer(), InMemoryChannelLayer):
+            self._deliver_in_memory(messages)
+            return True
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(messages)
+        except queue.Full:
+            metrics.incr('dispatch_dropped', len(messages))
+            logger.warning("Notification dispatcher is full; dropped %d message(s)", len(messages))
+            return False
+        return True
+
+    def flush(self):
+        """
+        Block until every queued batch has been delivered.
+        """
+        with self._lock:
+            scheduled = list(self._scheduled)
+        for future in scheduled:
+            future.result()
+        self._queue.join()
+
+    def _deliver_in_memory(self, messages):
+        messages = coalesce_counts(messages)
+        loop = self._server_loop
+        if loop is None or not loop.is_running():
+            # No consumer loop in this process: async_to_sync still finds
+            # the server loop when called from a sync_to_async thread
+            try:
+                async_to_sync(self._deliver)(messages)
+            except Exception:
+                logger.exception("Failed to deliver %d notification(s)", len(messages))
+            return
+        future = asyncio.run_coroutine_threadsafe(self._deliver(messages), loop)
+        with self._lock:
+            self._scheduled.add(future)
+        future.add_done_callback(self._forget_scheduled)
+
+    def _forget_scheduled(self, future):
+        with self._lock:
+            self._scheduled.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Failed to deliver notifications: %r", future.exception())
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='notification-dispatcher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            batches = [self._queue.get()]
+            while len(batches) < MERGE_BATCHES:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            messages = coalesce_counts([message for batch in batches for message in batch])
+            try:
+                loop.run_until_complete(self._deliver(messages))
+            except Exception:
+                logger.exception("Failed to deliver %d notification(s)", len(messages))
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    async def _deliver(self, messages):
+        channel_layer = get_channel_layer()
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group, event) for group, event in messages),
+            return_exceptions=True,
+        )
+        for (group, _), result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error("Notification delivery to %s failed: %r", group, result)
+
+
+dispatcher = NotificationDispatcher()
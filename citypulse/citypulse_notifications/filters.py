@@ -0,0 +1,15 @@
+# citypulse_notifications/filters.py
+from citypulse.filters import BooleanFilter, DateFilter, FilterSet, ListFilter
+
+
+class NotificationFilter(FilterSet):
+    filters = {
+        'is_read': BooleanFilter('is_read'),
+        'complaint': ListFilter('complaint_id', parse=int),
+        'from': DateFilter('created_at'),
+        'to': DateFilter('created_at', after=False),
+    }
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+    }
@@ -0,0 +1,41 @@
+# citypulse_notifications/metrics.py
+"""
+Process-local counters for the notification delivery path, served to
+admins at /notifications/metrics/. Each Daphne or worker process counts
+its own events:
+
+    frames_sent       notification frames written to sockets
+    coalesced         notifications that shared a frame with an earlier one
+    counts_coalesced  unread counts replaced by a newer count before sending
+    dropped           notifications dropped from a full connection queue
+    closed_slow       connections closed because their queue overflowed
+    dispatch_dropped  channel-layer messages dropped from a full dispatcher
+"""
+import threading
+from collections import Counter
+
+METRIC_NAMES = (
+    'frames_sent', 'coalesced', 'counts_coalesced', 'dropped', 'closed_slow', 'dispatch_dropped',
+)
+
+
+class DeliveryMetrics:
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        if amount:
+            with self._lock:
+                self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {name: self._counts[name] for name in METRIC_NAMES}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = DeliveryMetrics()
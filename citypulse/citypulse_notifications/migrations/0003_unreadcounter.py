@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counters(apps, schema_editor):
+    Notification = apps.get_model('citypulse_notifications', 'Notification')
+    UnreadCounter = apps.get_model('citypulse_notifications', 'UnreadCounter')
+    counts = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id')
+        .annotate(unread=Count('id'))
+    )
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=row['user_id'], unread_count=row['unread']) for row in counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('citypulse_notifications', '0002_notification_complaint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0017_complaint_updated_at'),
+        ('citypulse_notifications', '0005_notification_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'id'], name='notif_user_id_idx'),
+        ),
+    ]
@@ -7,6 +7,36 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every write, queryset updates included; drives ?since= sync
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # ?since= sync of a user's feed
+            models.Index(fields=['user', 'updated_at', 'id'], name='notif_user_updated_idx'),
+            # WebSocket replay of everything after a client's last_seen_id
+            models.Index(fields=['user', 'id'], name='notif_user_id_idx'),
+            # Per-user feed and "since N days" filters, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='notif_user_created_idx'),
+            # Unread list; partial so read notifications don't bloat it
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                condition=models.Q(is_read=False),
+                name='notif_user_unread_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"To: {self.user.username} - {self.message[:30]}"
+
+
+class UnreadCounter(models.Model):
+    """
+    Denormalized count of a user's unread notifications, kept in step by
+    citypulse_notifications.utils so badges never count rows.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count} unread"
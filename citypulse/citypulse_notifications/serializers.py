@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from citypulse.serializers import SparseFieldsetMixin
 from .models import Notification
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id','complaint', 'user', 'message', 'is_read', 'created_at']
\ No newline at end of file
+        fields = ['id','complaint', 'user', 'message', 'is_read', 'created_at', 'updated_at']
\ No newline at end of file
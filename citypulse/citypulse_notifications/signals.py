@@ -0,0 +1,38 @@
+# citypulse_notifications/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Notification
+from .utils import decrement_unread, increment_unread, push_unread_count
+
+
+def unread_owner(user_id, is_read):
+    return None if is_read else user_id
+
+
+@receiver(pre_save, sender=Notification)
+def remember_unread_owner(sender, instance, **kwargs):
+    # Single saves (admin, objects.create) bypass send_notifications and
+    # mark_notifications_read, so the counter follows them from here
+    previous = None
+    if instance.pk is not None:
+        previous = Notification.objects.filter(pk=instance.pk).values_list('user_id', 'is_read').first()
+    instance._unread_owner_before = unread_owner(*previous) if previous else None
+
+
+@receiver(post_save, sender=Notification)
+def adjust_unread_on_save(sender, instance, created, **kwargs):
+    before = None if created else getattr(instance, '_unread_owner_before', None)
+    after = unread_owner(instance.user_id, instance.is_read)
+    if before == after:
+        return
+    if before is not None:
+        push_unread_count(before, decrement_unread(before))
+    if after is not None:
+        push_unread_count(after, increment_unread({after: 1})[after])
+
+
+@receiver(post_delete, sender=Notification)
+def release_unread_on_delete(sender, instance, **kwargs):
+    # Keeps the counter right when complaints (and their notifications) are deleted
+    if not instance.is_read:
+        push_unread_count(instance.user_id, decrement_unread(instance.user_id))
@@ -1,3 +1,534 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.db import connection
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from citypulse.testing import QueryPlanMixin, fake_redis_server, redis_channel_layers
+from citypulse_complaints.models import Complaint
+from citypulse_jobs.models import Job
+from citypulse_jobs.worker import JobWorker
+from citypulse_users.models import Profile
+from .dispatcher import NotificationDispatcher, coalesce_counts, dispatcher
+from .metrics import metrics
+from .models import Notification, UnreadCounter
+from .consumers import SLOW_CONSUMER_CLOSE_CODE, NotificationConsumer
+from .utils import notification_group_name, send_bulk_notification, send_notification
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+COMPLAINT = {
+    'title': 'Overflowing bin',
+    'description': 'Not collected for a week',
+    'location_lat': '17.385000',
+    'location_lng': '78.486700',
+    'category': 'garbage',
+    'severity': 'medium',
+}
+
+
+class ComplaintNotificationFanOutTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='citizen')
+        Profile.objects.create(user=self.citizen, role='citizen')
+        self.client = APIClient()
+        self.client.force_authenticate(self.citizen)
+
+    def add_admins(self, count):
+        for _ in range(count):
+            admin = User.objects.create_user(username=f'admin{User.objects.count()}')
+            Profile.objects.create(user=admin, role='admin')
+
+    def create_complaint(self):
+        """
+        Returns the query counts of the request and of the fan-out job.
+        """
+        # A different street each time, so it isn't linked as a duplicate
+        data = {**COMPLAINT, 'location_lat': f'{17.385 + 0.01 * Complaint.objects.count():.6f}'}
+        with CaptureQueriesContext(connection) as request_queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/complaints-create/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Notification.objects.filter(complaint_id=response.data['id']).count(), 0)
+
+        with CaptureQueriesContext(connection) as job_queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                JobWorker().run_once()
+        return len(request_queries.captured_queries), len(job_queries.captured_queries)
+
+    def test_query_count_is_independent_of_admin_count(self):
+        self.add_admins(2)
+        few = self.create_complaint()
+        self.add_admins(20)
+        many = self.create_complaint()
+        self.assertEqual(few, many)
+        self.assertEqual(Notification.objects.filter(user__profile__role='admin').count(), 2 + 22)
+        self.assertFalse(Job.objects.exclude(status='done').exists())
+
+    def test_notifications_are_delivered_by_the_dispatcher(self):
+        self.add_admins(1)
+        admin = User.objects.get(profile__role='admin')
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(notification_group_name(admin.id), channel)
+
+        self.create_complaint()
+        dispatcher.flush()
+
+        event = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(event['type'], 'notification_message')
+        self.assertEqual(event['content']['user'], admin.id)
+        self.assertIn("created by citizen", event['content']['message'])
+
+
+
+class NotificationListFilterTests(TestCase):
+    def test_filters(self):
+        user = User.objects.create_user(username='citizen')
+        client = APIClient()
+        client.force_authenticate(user)
+        read = Notification.objects.create(user=user, message='Old', is_read=True)
+        unread = Notification.objects.create(user=user, message='New')
+
+        def ids(query):
+            response = client.get(f'/notifications/user/?{query}')
+            self.assertEqual(response.status_code, 200, response.data)
+            return [row['id'] for row in response.data['results']]
+
+        self.assertEqual(ids('is_read=false'), [unread.id])
+        self.assertEqual(ids('is_read=true'), [read.id])
+        self.assertEqual(ids('ordering=created_at'), [read.id, unread.id])
+        self.assertEqual(client.get('/notifications/user/?is_read=perhaps').status_code, 400)
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen')
+        self.other = User.objects.create_user(username='other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/notifications/unread/count/')
+        return response.data['unread_count']
+
+    def test_counter_follows_create_and_mark_read(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            send_bulk_notification([self.user.id, self.other.id], "First")
+            first = send_notification(self.user, "Second")
+        self.assertEqual(self.unread_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/notifications/mark-read/{first.id}/')
+            self.client.post(f'/notifications/mark-read/{first.id}/')
+        self.assertEqual(self.unread_count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/notifications/mark-read/')
+        self.assertEqual(self.unread_count(), 0)
+        self.assertEqual(
+            self.client.get('/notifications/unread/count/').data['unread_count'],
+            Notification.objects.filter(user=self.user, is_read=False).count(),
+        )
+
+    def test_single_saves_keep_the_counter(self):
+        # As the admin site or a shell would, bypassing send_notifications
+        notification = Notification.objects.create(user=self.user, message="Hand-made")
+        Notification.objects.create(user=self.user, message="Already read", is_read=True)
+        self.assertEqual(self.unread_count(), 1)
+
+        notification.is_read = True
+        notification.save()
+        self.assertEqual(self.unread_count(), 0)
+        notification.message = "Edited"
+        notification.save()
+        self.assertEqual(self.unread_count(), 0)
+
+        notification.is_read = False
+        notification.save()
+        self.assertEqual(self.unread_count(), 1)
+        notification.user = self.other
+        notification.save()
+        self.assertEqual(self.unread_count(), 0)
+        self.assertEqual(UnreadCounter.objects.get(user=self.other).unread_count, 1)
+
+    def test_deleting_unread_notifications_releases_the_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = send_notification(self.user, "Soon gone")
+        with mock.patch.object(dispatcher, 'submit') as submit, self.captureOnCommitCallbacks(execute=True):
+            notification.delete()
+        submit.assert_called_once_with([
+            (notification_group_name(self.user.id), {'type': 'unread_count', 'unread_count': 0}),
+        ])
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_count_is_pushed_on_connect_and_on_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            send_notification(self.user, "Waiting")
+
+        def mark_all_read():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/notifications/mark-read/')
+            dispatcher.flush()
+
+        async def session():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = self.user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': 'unread_count', 'unread_count': 1},
+            )
+
+            await database_sync_to_async(mark_all_read)()
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': 'unread_count', 'unread_count': 0},
+            )
+            await communicator.disconnect()
+
+        async_to_sync(session)()
+    def test_in_memory_layer_delivers_from_other_threads_at_once(self):
+        message = (notification_group_name(self.user.id), {"type": "unread_count", "unread_count": 7})
+
+        async def session():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = self.user
+            await communicator.connect()
+            await communicator.receive_json_from()
+
+            # A plain thread, like the job worker's, not one of sync_to_async's
+            started = time.monotonic()
+            thread = threading.Thread(target=dispatcher.submit, args=([message],))
+            thread.start()
+            self.assertEqual(
+                await communicator.receive_json_from(timeout=1),
+                {'type': 'unread_count', 'unread_count': 7},
+            )
+            self.assertLess(time.monotonic() - started, 0.5)
+            await database_sync_to_async(thread.join)()
+            await communicator.disconnect()
+
+        async_to_sync(session)()
+
+
+class NotificationSocketProtocolTests(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen')
+
+    def connect(self, query=''):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f'/ws/notifications/{query}')
+        communicator.scope['user'] = self.user
+        return communicator
+
+    def notify(self, *messages):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications = [send_notification(self.user, message) for message in messages]
+        dispatcher.flush()
+        return notifications
+
+    def test_burst_is_coalesced_into_one_frame(self):
+        async def session():
+            communicator = self.connect()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await database_sync_to_async(self.notify)('One', 'Two', 'Three')
+            frame = await communicator.receive_json_from()
+            self.assertEqual(frame['type'], 'notifications')
+            self.assertEqual([n['message'] for n in frame['notifications']], ['One', 'Two', 'Three'])
+            self.assertEqual(frame['unread_count'], 3)
+            self.assertTrue(await communicator.receive_nothing(0.2))
+            await communicator.disconnect()
+
+        async_to_sync(session)()
+
+    def test_reconnect_replays_missed_notifications(self):
+        seen, first, second = self.notify('Seen', 'Missed 1', 'Missed 2')
+
+        async def session():
+            communicator = self.connect(f'?last_seen_id={seen.id}')
+            await communicator.connect()
+            frame = await communicator.receive_json_from()
+            self.assertEqual([n['id'] for n in frame['notifications']], [first.id, second.id])
+            self.assertEqual(frame['unread_count'], 3)
+            self.assertTrue(frame['replay'])
+            self.assertFalse(frame['more'])
+            await communicator.disconnect()
+
+        with self.assertIndexedQueries('Replay'):
+            async_to_sync(session)()
+
+    @override_settings(NOTIFICATION_SOCKET={'REPLAY_LIMIT': 1})
+    def test_replay_is_capped(self):
+        first, _ = self.notify('Missed 1', 'Missed 2')
+
+        async def session():
+            communicator = self.connect('?last_seen_id=0')
+            await communicator.connect()
+            frame = await communicator.receive_json_from()
+            self.assertEqual([n['id'] for n in frame['notifications']], [first.id])
+            self.assertTrue(frame['more'])
+            await communicator.disconnect()
+
+        async_to_sync(session)()
+
+    def test_batched_ack_marks_read(self):
+        first, second, third = self.notify('One', 'Two', 'Three')
+        other = send_notification(User.objects.create_user(username='other'), 'Not yours')
+
+        async def session():
+            communicator = self.connect()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'ack', 'ids': [first.id, second.id, other.id]})
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {'type': 'acked', 'ids': [first.id, second.id, other.id], 'updated': 2},
+            )
+            await communicator.send_json_to({'type': 'ack', 'all': True})
+            self.assertEqual((await communicator.receive_json_from())['updated'], 1)
+            await communicator.disconnect()
+
+        async_to_sync(session)()
+        self.assertEqual(Notification.objects.filter(user=self.user, is_read=False).count(), 0)
+        self.assertFalse(Notification.objects.get(id=other.id).is_read)
+
+    def test_invalid_messages_get_errors(self):
+        async def session():
+            communicator = self.connect()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            for text in ('not json', '{"type": "subscribe"}', '{"type": "ack", "ids": ["1"]}', '{"type": "ack"}'):
+                await communicator.send_to(text_data=text)
+                self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+            await communicator.disconnect()
+
+        async_to_sync(session)()
+
+
+class SlowNotificationConsumer(NotificationConsumer):
+    """
+    A consumer whose socket takes SEND_DELAY seconds per frame, like a
+    client on a poor connection.
+    """
+    SEND_DELAY = 0.1
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self.SEND_DELAY)
+        await super().send(*args, **kwargs)
+
+
+class SlowConsumerBackpressureTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='citizen')
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    async def open(self):
+        communicator = WebsocketCommunicator(SlowNotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        return communicator
+
+    async def burst(self, count, waves=3):
+        """
+        Push `count` notifications straight into the user's group, in waves
+        spaced closer together than the client can read them.
+        """
+        channel_layer = get_channel_layer()
+        for notification_id in range(1, count + 1):
+            await channel_layer.group_send(notification_group_name(self.user.id), {
+                "type": "notification_message",
+                "content": {"id": notification_id, "message": f"Burst {notification_id}"},
+                "unread_count": notification_id,
+            })
+            if notification_id % (count // waves) == 0:
+                await asyncio.sleep(SlowNotificationConsumer.SEND_DELAY / 2)
+
+    async def drain(self, communicator):
+        frames = []
+        while not await communicator.receive_nothing(SlowNotificationConsumer.SEND_DELAY * 3):
+            frames.append(await communicator.receive_json_from())
+        return frames
+
+    def run_burst(self, count):
+        async def session():
+            communicator = await self.open()
+            await self.burst(count)
+            frames = await self.drain(communicator)
+            await communicator.disconnect()
+            return frames
+
+        return async_to_sync(session)()
+
+    @override_settings(NOTIFICATION_SOCKET={'MAX_PENDING': 5, 'COALESCE_SECONDS': 0.01})
+    def test_drop_oldest_keeps_newest_and_reports_losses(self):
+        frames = self.run_burst(30)
+        delivered = [n['id'] for frame in frames for n in frame['notifications']]
+        dropped = sum(frame.get('dropped', 0) for frame in frames)
+        self.assertTrue(all(len(frame['notifications']) <= 5 for frame in frames))
+        self.assertLess(len(frames), 30)
+        self.assertEqual(len(delivered) + dropped, 30)
+        self.assertGreater(dropped, 0)
+        self.assertEqual(delivered, sorted(delivered))
+        self.assertEqual(delivered[-1], 30)
+        self.assertEqual(frames[-1]['unread_count'], 30)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['dropped'], dropped)
+        self.assertEqual(snapshot['coalesced'], len(delivered) - len(frames))
+        self.assertGreater(snapshot['counts_coalesced'], 0)
+
+    @override_settings(NOTIFICATION_SOCKET={
+        'MAX_PENDING': 5, 'COALESCE_SECONDS': 0.01, 'OVERFLOW_POLICY': 'drop_newest',
+    })
+    def test_drop_newest_keeps_a_gapless_prefix_per_frame(self):
+        frames = self.run_burst(30)
+        first = frames[0]['notifications']
+        self.assertEqual([n['id'] for n in first], list(range(1, len(first) + 1)))
+        self.assertGreater(frames[0].get('dropped', 0), 0)
+        # Counts are never dropped, only replaced by newer ones
+        self.assertEqual(frames[-1]['unread_count'], 30)
+
+    @override_settings(NOTIFICATION_SOCKET={'MAX_PENDING': 2, 'OVERFLOW_POLICY': 'close'})
+    def test_close_policy_disconnects_the_slow_client(self):
+        async def session():
+            communicator = await self.open()
+            await self.burst(6, waves=1)
+            while True:
+                output = await communicator.receive_output()
+                if output['type'] == 'websocket.close':
+                    return output['code']
+
+        self.assertEqual(async_to_sync(session)(), SLOW_CONSUMER_CLOSE_CODE)
+        self.assertEqual(metrics.snapshot()['closed_slow'], 1)
+
+
+class DispatcherBackpressureTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    # Only a cross-process layer goes through the delivery thread's queue
+    @override_settings(CHANNEL_LAYERS=redis_channel_layers('redis://localhost:1'))
+    def test_full_queue_drops_new_batches(self):
+        stalled = NotificationDispatcher(max_batches=1)
+        # No delivery thread, so nothing drains the queue
+        stalled._ensure_started = lambda: None
+        self.assertTrue(stalled.submit([('user_1_notifications', {"type": "unread_count", "unread_count": 1})]))
+        self.assertFalse(stalled.submit([('user_1_notifications', {"type": "unread_count", "unread_count": 2})] * 2))
+        self.assertEqual(metrics.snapshot()['dispatch_dropped'], 2)
+
+    def test_superseded_counts_are_coalesced(self):
+        notification = {"type": "notification_message", "content": {"id": 1}, "unread_count": 3}
+        messages = [
+            ('a', {"type": "unread_count", "unread_count": 1}),
+            ('b', {"type": "unread_count", "unread_count": 5}),
+            ('a', {"type": "unread_count", "unread_count": 2}),
+            ('a', notification),
+        ]
+        self.assertEqual(coalesce_counts(messages), [('b', messages[1][1]), ('a', notification)])
+        self.assertEqual(metrics.snapshot()['counts_coalesced'], 2)
+
+    def test_metrics_are_admin_only(self):
+        admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=admin, role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        metrics.incr('dropped', 3)
+        response = client.get('/notifications/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['dropped'], 3)
+        client.force_authenticate(User.objects.create_user(username='citizen'))
+        self.assertEqual(client.get('/notifications/metrics/').status_code, 403)
+
+
+# Runs a NotificationConsumer in a separate interpreter and prints the first
+# notification frame it pushes to its WebSocket client. The child has no test
+# database, so the unread count it reads on connect is stubbed.
+CONSUMER_PROCESS = """
+import asyncio, json, os, sys
+from types import SimpleNamespace
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'citypulse.settings')
+django.setup()
+from channels.testing import WebsocketCommunicator
+from citypulse_notifications.consumers import NotificationConsumer
+
+async def no_unread(self):
+    return 0
+
+NotificationConsumer.get_notification_count = no_unread
+
+async def main():
+    communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+    communicator.scope['user'] = SimpleNamespace(id=int(sys.argv[1]), is_anonymous=False)
+    connected, _ = await communicator.connect()
+    print('READY' if connected else 'REJECTED', flush=True)
+    while True:
+        frame = await communicator.receive_from(timeout=20)
+        if json.loads(frame)['type'] == 'notifications':
+            break
+    print('FRAME ' + frame, flush=True)
+    await communicator.disconnect()
+
+asyncio.run(main())
+"""
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class RedisChannelLayerTests(TestCase):
+    def setUp(self):
+        self.redis_url = self.enterContext(fake_redis_server())
+        self.enterContext(override_settings(CHANNEL_LAYERS=redis_channel_layers(self.redis_url)))
+        self.user = User.objects.create_user(username='citizen')
+
+    def read_line(self, process, prefix):
+        for line in process.stdout:
+            if line.startswith(prefix):
+                return line[len(prefix):].strip()
+        self.fail(f"Consumer process exited without {prefix!r}: {process.stderr.read()}")
+
+    def test_notification_reaches_consumer_in_another_process(self):
+        process = subprocess.Popen(
+            [sys.executable, '-c', CONSUMER_PROCESS, str(self.user.id)],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'REDIS_URL': self.redis_url},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        self.addCleanup(process.communicate)
+        self.addCleanup(process.kill)
+        self.read_line(process, 'READY')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = send_notification(self.user, "Hello from another process")
+        dispatcher.flush()
+
+        [payload] = json.loads(self.read_line(process, 'FRAME '))['notifications']
+        self.assertEqual(payload['id'], notification.id)
+        self.assertEqual(payload['message'], "Hello from another process")
+        process.wait(timeout=10)
@@ -3,15 +3,19 @@ from django.urls import path
 from .views import (
     NotificationsByUserAPIView, 
     UnreadNotificationsAPIView, 
+    UnreadNotificationCountAPIView,
     NotificationsByTimeAPIView,
-    MarkNotificationAsReadAPIView  # New view we'll create
+    MarkNotificationAsReadAPIView,  # New view we'll create
+    NotificationMetricsAPIView,
 )
 
 urlpatterns = [
     path('notifications/user/', NotificationsByUserAPIView.as_view(), name='notifications-by-user'),
     path('notifications/unread/', UnreadNotificationsAPIView.as_view(), name='unread-notifications'),
+    path('notifications/unread/count/', UnreadNotificationCountAPIView.as_view(), name='unread-notification-count'),
     path('notifications/time/<int:days>/', NotificationsByTimeAPIView.as_view(), name='notifications-by-time'),
     # New endpoints
     path('notifications/mark-read/', MarkNotificationAsReadAPIView.as_view(), name='mark-all-read'),
     path('notifications/mark-read/<int:notification_id>/', MarkNotificationAsReadAPIView.as_view(), name='mark-notification-read'),
+    path('notifications/metrics/', NotificationMetricsAPIView.as_view(), name='notification-metrics'),
 ]
\ No newline at end of file
@@ -1,32 +1,123 @@
 # Add to a new file: citypulse_notifications/utils.py
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Notification
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .dispatcher import dispatcher
+from .models import Notification, UnreadCounter
 from .serializers import NotificationSerializer
-import json
 
-def send_notification(user, message, complaint=None):
+
+def notification_group_name(user_id):
+    return f"user_{user_id}_notifications"
+
+
+def get_unread_count(user_id):
+    counter = UnreadCounter.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+    if counter is not None:
+        return counter
+    # No counter yet: count once and remember it
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    UnreadCounter.objects.get_or_create(user_id=user_id, defaults={'unread_count': count})
+    return count
+
+
+def increment_unread(increments):
     """
-    Create a notification in the database and send it via WebSocket
+    Apply {user_id: n} increments with one UPDATE per distinct n (usually
+    one, since fan-out gives each recipient a single notification).
+    Returns the new counts.
     """
-    # Create notification in database
-    notification = Notification.objects.create(
-        user=user,
-        message=message,
-        complaint=complaint
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in increments],
+        ignore_conflicts=True,
     )
-    
-    # Serialize for WebSocket
-    serializer = NotificationSerializer(notification)
-    
-    # Send to WebSocket
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"user_{user.id}_notifications",
-        {
-            "type": "notification_message",
-            "content": serializer.data
-        }
+    by_amount = defaultdict(list)
+    for user_id, amount in increments.items():
+        by_amount[amount].append(user_id)
+    for amount, user_ids in by_amount.items():
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(unread_count=F('unread_count') + amount)
+    return dict(
+        UnreadCounter.objects.filter(user_id__in=list(increments)).values_list('user_id', 'unread_count')
     )
-    print("Notification sent:", user.username, message)
-    return notification
\ No newline at end of file
+
+
+def decrement_unread(user_id, amount=1):
+    """
+    Lower a user's counter after notifications were read or deleted, and
+    return the new count.
+    """
+    if amount:
+        UnreadCounter.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F('unread_count') - amount, Value(0))
+        )
+    return get_unread_count(user_id)
+
+
+def push_unread_count(user_id, count):
+    """
+    Send the current unread count to the user's open sockets after commit.
+    """
+    message = (notification_group_name(user_id), {
+        "type": "unread_count",
+        "unread_count": count
+    })
+    transaction.on_commit(lambda: dispatcher.submit([message]))
+
+
+def send_notifications(notifications):
+    """
+    Insert a batch of unsaved Notification objects with a single INSERT,
+    serialize them in one pass and hand WebSocket delivery to the background
+    dispatcher once the surrounding transaction commits. Each frame carries
+    the recipient's new unread count.
+    """
+    notifications = Notification.objects.bulk_create(notifications)
+    counts = increment_unread(Counter(notification.user_id for notification in notifications))
+    payloads = NotificationSerializer(notifications, many=True).data
+    messages = [
+        (notification_group_name(payload['user']), {
+            "type": "notification_message",
+            "content": payload,
+            "unread_count": counts.get(payload['user'])
+        })
+        for payload in payloads
+    ]
+    transaction.on_commit(lambda: dispatcher.submit(messages))
+    return notifications
+
+
+def send_bulk_notification(user_ids, message, complaint=None):
+    """
+    Send the same message to many users, e.g. every admin.
+    """
+    return send_notifications([
+        Notification(user_id=user_id, message=message, complaint=complaint)
+        for user_id in user_ids
+    ])
+
+
+def send_notification(user, message, complaint=None):
+    """
+    Create a notification in the database and send it via WebSocket
+    """
+    return send_notifications([
+        Notification(user=user, message=message, complaint=complaint)
+    ])[0]
+
+
+def mark_notifications_read(user_id, notification_ids=None):
+    """
+    Mark some (or all) of a user's notifications as read in one UPDATE, keep
+    the counter in step and push the new count. Returns the number of rows
+    changed.
+    """
+    notifications = Notification.objects.filter(user_id=user_id, is_read=False)
+    if notification_ids is not None:
+        notifications = notifications.filter(id__in=notification_ids)
+    with transaction.atomic():
+        updated = notifications.update(is_read=True, updated_at=timezone.now())
+        if updated:
+            push_unread_count(user_id, decrement_unread(user_id, updated))
+    return updated
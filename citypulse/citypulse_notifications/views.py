@@ -1,33 +1,56 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from .filters import NotificationFilter
+from .metrics import metrics
 from .models import Notification
 from .serializers import NotificationSerializer
+from .utils import get_unread_count, mark_notifications_read
+from citypulse.pagination import KeysetPagination
+from citypulse_sync.sync import SINCE_PARAM, sync_response
+from citypulse_users.permissions import IsAdminUserRole
 from django.utils.timezone import now, timedelta
 
 class NotificationsByUserAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        notifications = Notification.objects.filter(user=request.user)
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+        if SINCE_PARAM in request.query_params:
+            return sync_response(
+                request, Notification.objects.filter(user=request.user), NotificationSerializer, owner_id=request.user.id
+            )
+        filterset = NotificationFilter(request.query_params)
+        try:
+            notifications = filterset.filter_queryset(Notification.objects.filter(user=request.user))
+            ordering = filterset.get_ordering()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(notifications, request)
+        serializer = NotificationSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
 class UnreadNotificationsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        notifications = Notification.objects.filter(user=request.user, is_read=False)
-        
+        notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at', '-id')
+
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data)
 
+class UnreadNotificationCountAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": get_unread_count(request.user.id)})
+
 class NotificationsByTimeAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, days):
         time_threshold = now() - timedelta(days=days)
-        notifications = Notification.objects.filter(user=request.user, created_at__gte=time_threshold)
+        notifications = Notification.objects.filter(user=request.user, created_at__gte=time_threshold).order_by('-created_at', '-id')
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data)
 
@@ -41,14 +64,21 @@ class MarkNotificationAsReadAPIView(APIView):
     def post(self, request, notification_id=None):
         if notification_id:
             # Mark specific notification as read
-            try:
-                notification = Notification.objects.get(id=notification_id, user=request.user)
-                notification.is_read = True
-                notification.save()
-                return Response({"status": "success", "message": "Notification marked as read"})
-            except Notification.DoesNotExist:
+            if not Notification.objects.filter(id=notification_id, user=request.user).exists():
                 return Response({"status": "error", "message": "Notification not found"}, status=404)
+            mark_notifications_read(request.user.id, [notification_id])
+            return Response({"status": "success", "message": "Notification marked as read"})
         else:
             # Mark all as read
-            Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
-            return Response({"status": "success", "message": "All notifications marked as read"})
\ No newline at end of file
+            mark_notifications_read(request.user.id)
+            return Response({"status": "success", "message": "All notifications marked as read"})
+
+
+class NotificationMetricsAPIView(APIView):
+    """
+    Delivery counters for this process (see metrics.py).
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
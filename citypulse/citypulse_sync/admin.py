@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+# Register your models here.
+from citypulse_sync.models import SyncHold, Tombstone
+
+admin.site.register(Tombstone)
+admin.site.register(SyncHold)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CitypulseSyncConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'citypulse_sync'
+
+    def ready(self):
+        from . import signals  # noqa: F401
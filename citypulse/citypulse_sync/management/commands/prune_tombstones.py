@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from citypulse_sync.models import SyncHold, Tombstone
+from citypulse_sync.sync import get_sync_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete tombstones older than SYNC['TOMBSTONE_DAYS']; clients syncing from before then get a 410. "
+        "Sync holds left behind by crashed processes are deleted too."
+    )
+
+    def handle(self, *args, **options):
+        config = get_sync_settings()
+        cutoff = timezone.now() - timedelta(days=config['TOMBSTONE_DAYS'])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        SyncHold.objects.filter(started_at__lt=timezone.now() - timedelta(seconds=config['MAX_HOLD_SECONDS'])).delete()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstone(s)."))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_sync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['started_at'], name='synchold_started_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """
+    A deleted row, kept so ?since= syncs can tell clients to drop it.
+    `model` is the app label and model name; `owner_id` is the user whose
+    feed the row belonged to, for per-user lists. Pruned after
+    SYNC['TOMBSTONE_DAYS'] by the prune_tombstones command.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    # No foreign key: the owner may be the thing being deleted
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at', 'id'], name='tombstone_model_deleted_idx'),
+            models.Index(fields=['model', 'owner_id', 'deleted_at', 'id'], name='tombstone_owner_deleted_idx'),
+            # Pruning
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at}"
+
+
+class SyncHold(models.Model):
+    """
+    A long transaction in progress (bulk imports and assignments). Cursors
+    stay behind the oldest hold so rows it stamped early are not skipped
+    when it commits. Holds older than SYNC['MAX_HOLD_SECONDS'] are ignored
+    as left behind by a crash.
+    """
+    started_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['started_at'], name='synchold_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"Sync hold since {self.started_at}"
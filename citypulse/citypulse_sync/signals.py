@@ -0,0 +1,19 @@
+# citypulse_sync/signals.py
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from citypulse_complaints.models import Complaint
+from citypulse_notifications.models import Notification
+from citypulse_workers.models import AssignedTask
+from .models import Tombstone
+from .sync import model_label
+
+
+@receiver(post_delete, sender=Complaint)
+@receiver(post_delete, sender=Notification)
+def record_owned_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=model_label(sender), object_id=instance.pk, owner_id=instance.user_id)
+
+
+@receiver(post_delete, sender=AssignedTask)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=model_label(sender), object_id=instance.pk)
@@ -0,0 +1,201 @@
+# citypulse_sync/sync.py
+"""
+`?since=` sync for list endpoints. Instead of a page of the list, a sync
+returns the rows created or changed after the client's cursor and the ids
+deleted since (from Tombstone rows), so a refresh transfers only what
+changed. Each stream is read in (timestamp, id) order from its own index,
+and the cursor records how far the client has got in both.
+
+A client starts with `?since=0` (everything, no deletions), follows `next`
+while it is set, and keeps the last `since` for its next refresh. A plain
+ISO 8601 timestamp also works. Positions never pass the sync horizon:
+now - SETTLE_SECONDS, giving writes stamped a moment earlier time to
+commit, or earlier while a job is running or a bulk write holds it back
+with hold_horizon(), since those stamp rows long before they commit.
+"""
+import base64
+import binascii
+import json
+from contextlib import contextmanager
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from citypulse_jobs.models import Job
+from .models import SyncHold, Tombstone
+
+SINCE_PARAM = 'since'
+PAGE_SIZE_PARAM = 'page_size'
+
+
+def get_sync_settings():
+    defaults = {
+        'PAGE_SIZE': 500,
+        'MAX_PAGE_SIZE': 2000,
+        'SETTLE_SECONDS': 2,
+        'MAX_HOLD_SECONDS': 600,
+        'TOMBSTONE_DAYS': 30,
+    }
+    defaults.update(getattr(settings, 'SYNC', {}))
+    return defaults
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+class CursorExpired(Exception):
+    pass
+
+
+@contextmanager
+def hold_horizon():
+    """
+    Keep sync positions from passing the start of the block until it ends.
+    Wrap transactions that write many rows, outside the transaction, so the
+    hold is visible to other connections while it runs.
+    """
+    hold = SyncHold.objects.create()
+    try:
+        yield
+    finally:
+        SyncHold.objects.filter(id=hold.id).delete()
+
+
+def sync_horizon():
+    """
+    How far positions may move: SETTLE_SECONDS before now or before the
+    oldest running job or hold, whichever is earlier. Jobs write in one
+    transaction after they are claimed, so a running job counts from
+    locked_at.
+    """
+    config = get_sync_settings()
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=config['MAX_HOLD_SECONDS'])
+    starts = [
+        now,
+        SyncHold.objects.filter(started_at__gte=cutoff).aggregate(oldest=Min('started_at'))['oldest'],
+        Job.objects.filter(status='running', locked_at__gte=cutoff).aggregate(oldest=Min('locked_at'))['oldest'],
+    ]
+    return min(start for start in starts if start is not None) - timedelta(seconds=config['SETTLE_SECONDS'])
+
+
+def encode_cursor(changed, deleted):
+    """
+    A position is (timestamp, id), or (timestamp, None) once every row up
+    to and including that timestamp has been seen.
+    """
+    values = [[position[0].isoformat(), position[1]] if position else None for position in (changed, deleted)]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_position(value):
+    if value is None:
+        return None
+    timestamp, row_id = value
+    parsed = parse_datetime(timestamp)
+    if parsed is None or not (row_id is None or isinstance(row_id, int)):
+        raise ValueError
+    return parsed, row_id
+
+
+def parse_since(value, horizon):
+    """
+    (changed position, deleted position) for a `since` value. Raises
+    ValueError when malformed and CursorExpired when older than the
+    deletion history.
+    """
+    if value == '0':
+        # A client with nothing stored has nothing to delete
+        return None, (horizon, None)
+    timestamp = parse_datetime(value)
+    if timestamp is not None:
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp, dt_timezone.utc)
+        changed = deleted = (timestamp, None)
+    else:
+        try:
+            changed, deleted = map(_decode_position, json.loads(base64.urlsafe_b64decode(value.encode())))
+        except (binascii.Error, ValueError, TypeError):
+            raise ValueError(f"{SINCE_PARAM} must be 0, an ISO 8601 timestamp or a cursor from a previous sync")
+        if deleted is None:
+            raise ValueError(f"{SINCE_PARAM} must be 0, an ISO 8601 timestamp or a cursor from a previous sync")
+    if deleted[0] < timezone.now() - timedelta(days=get_sync_settings()['TOMBSTONE_DAYS']):
+        raise CursorExpired
+    return changed, deleted
+
+
+def after(position, field):
+    if position is None:
+        return Q()
+    timestamp, row_id = position
+    if row_id is None:
+        return Q(**{f'{field}__gt': timestamp})
+    return Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'id__gt': row_id})
+
+
+def read_stream(queryset, position, field, horizon, limit):
+    """
+    Up to `limit` rows after `position`, and the position reached: the
+    last row served, or the horizon when the stream is exhausted. A
+    horizon held back behind `position` leaves it where it is.
+    """
+    rows = list(
+        queryset.filter(after(position, field), **{f'{field}__lte': horizon}).order_by(field, 'id')[:limit + 1]
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (getattr(last, field), last.id), True
+    if position is not None and position[0] > horizon:
+        return rows, position, False
+    return rows, (horizon, None), False
+
+
+def sync_response(request, queryset, serializer_class, owner_id=None, field='updated_at'):
+    """
+    Answer a `?since=` request for `queryset` in four queries: holds,
+    running jobs, changed rows and tombstones. `owner_id` limits
+    tombstones to one user's rows.
+    """
+    config = get_sync_settings()
+    try:
+        page_size = int(request.query_params.get(PAGE_SIZE_PARAM, config['PAGE_SIZE']))
+    except ValueError:
+        return Response({"error": f"{PAGE_SIZE_PARAM} must be an integer"}, status=400)
+    horizon = sync_horizon()
+    try:
+        changed, deleted = parse_since(request.query_params[SINCE_PARAM], horizon)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    except CursorExpired:
+        return Response({
+            "error": f"{SINCE_PARAM} is older than the {config['TOMBSTONE_DAYS']} day deletion history; "
+                     "fetch the full list again",
+        }, status=410)
+    page_size = max(1, min(page_size, config['MAX_PAGE_SIZE']))
+
+    rows, changed, more_rows = read_stream(queryset, changed, field, horizon, page_size)
+    tombstones = Tombstone.objects.filter(model=model_label(queryset.model))
+    if owner_id is not None:
+        tombstones = tombstones.filter(owner_id=owner_id)
+    tombstones, deleted, more_tombstones = read_stream(
+        tombstones.only('id', 'object_id', 'deleted_at'), deleted, 'deleted_at', horizon, page_size
+    )
+
+    since = encode_cursor(changed, deleted)
+    serializer = serializer_class(rows, many=True, context={'request': request})
+    return Response({
+        'results': serializer.data,
+        'deleted': [tombstone.object_id for tombstone in tombstones],
+        'since': since,
+        'next': (
+            replace_query_param(request.build_absolute_uri(), SINCE_PARAM, since)
+            if more_rows or more_tombstones else None
+        ),
+    })
@@ -0,0 +1,177 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from citypulse_complaints.duplicates import link_duplicates
+from citypulse_complaints.models import Complaint
+from citypulse_notifications.models import Notification
+from citypulse_notifications.utils import mark_notifications_read
+from citypulse_workers.models import AssignedTask, Worker
+from citypulse_jobs.models import Job
+from .models import SyncHold, Tombstone
+from .sync import encode_cursor, hold_horizon
+
+
+@override_settings(SYNC={'SETTLE_SECONDS': 0})
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(username='citizen')
+        self.other = User.objects.create_user(username='other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.citizen)
+
+    def make_complaint(self, user=None, title='Pothole'):
+        return Complaint.objects.create(
+            user=user or self.citizen, title=title, description='...',
+            location_lat='17.385000', location_lng='78.486700', category='road', severity='medium',
+        )
+
+    def sync(self, url, since, **params):
+        response = self.client.get(url, {'since': since, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_full_then_delta(self):
+        first = self.make_complaint(title='First')
+        second = self.make_complaint(title='Second')
+        data = self.sync('/complaints/', '0')
+        self.assertEqual([row['id'] for row in data['results']], [first.id, second.id])
+        self.assertEqual(data['deleted'], [])
+        self.assertIsNone(data['next'])
+
+        since = data['since']
+        self.assertEqual(self.sync('/complaints/', since)['results'], [])
+
+        first.title = 'First, edited'
+        first.save()
+        third = self.make_complaint(title='Third')
+        data = self.sync('/complaints/', since)
+        self.assertEqual([row['id'] for row in data['results']], [first.id, third.id])
+        self.assertEqual(data['results'][0]['title'], 'First, edited')
+
+        second_id = second.id
+        second.delete()
+        data = self.sync('/complaints/', data['since'])
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['deleted'], [second_id])
+
+    def test_pages_follow_next(self):
+        complaints = [self.make_complaint(title=f'Complaint {i}') for i in range(5)]
+        seen, since = [], '0'
+        # Holds, running jobs, rows, tombstones
+        with self.assertNumQueries(4):
+            data = self.sync('/complaints/', since, page_size=2)
+        while True:
+            seen += [row['id'] for row in data['results']]
+            if data['next'] is None:
+                break
+            self.assertIn('page_size=2', data['next'])
+            data = self.sync('/complaints/', data['since'], page_size=2)
+        self.assertEqual(seen, [complaint.id for complaint in complaints])
+
+    def test_user_sync_only_sees_own_rows_and_deletes(self):
+        mine = self.make_complaint()
+        theirs = self.make_complaint(user=self.other)
+        since = self.sync('/complaints/user/', '0')['since']
+        mine_id = mine.id
+        mine.delete()
+        theirs.delete()
+        data = self.sync('/complaints/user/', since)
+        self.assertEqual(data['deleted'], [mine_id])
+
+    def test_queryset_updates_are_synced(self):
+        notification = Notification.objects.create(user=self.citizen, message='Hello')
+        Notification.objects.create(user=self.other, message='Not yours')
+        data = self.sync('/notifications/user/', '0')
+        self.assertEqual([row['id'] for row in data['results']], [notification.id])
+
+        mark_notifications_read(self.citizen.id)
+        data = self.sync('/notifications/user/', data['since'])
+        self.assertEqual([row['id'] for row in data['results']], [notification.id])
+        self.assertTrue(data['results'][0]['is_read'])
+
+    def test_duplicate_links_are_synced(self):
+        canonical = self.make_complaint(title='Huge pothole on Main Road')
+        duplicate = self.make_complaint(title='Huge pothole on Main Road')
+        data = self.sync('/complaints/', '0')
+
+        link_duplicates([duplicate])
+        data = self.sync('/complaints/', data['since'])
+        self.assertEqual([(row['id'], row['duplicate_of']) for row in data['results']], [(duplicate.id, canonical.id)])
+
+        canonical_id = canonical.id
+        canonical.delete()
+        data = self.sync('/complaints/', data['since'])
+        self.assertEqual([(row['id'], row['duplicate_of']) for row in data['results']], [(duplicate.id, None)])
+        self.assertEqual(data['deleted'], [canonical_id])
+
+    def test_task_sync(self):
+        worker = Worker.objects.create(
+            user=User.objects.create_user(username='worker'), name='worker', phone='555-0100', specialization='road',
+        )
+        task = AssignedTask.objects.create(complaint=self.make_complaint(), worker=worker)
+        data = self.sync('/tasks/', '0')
+        self.assertEqual([row['id'] for row in data['results']], [task.id])
+        task_id = task.id
+        task.delete()
+        self.assertEqual(self.sync('/tasks/', data['since'])['deleted'], [task_id])
+
+    def test_timestamp_since(self):
+        old = self.make_complaint()
+        Complaint.objects.filter(id=old.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        new = self.make_complaint()
+        since = (timezone.now() - timedelta(minutes=5)).isoformat()
+        data = self.sync('/complaints/', since)
+        self.assertEqual([row['id'] for row in data['results']], [new.id])
+
+    def test_invalid_and_expired_since(self):
+        self.assertEqual(self.client.get('/complaints/', {'since': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get('/complaints/', {'since': '0', 'page_size': 'x'}).status_code, 400)
+        old = timezone.now() - timedelta(days=60)
+        self.assertEqual(self.client.get('/complaints/', {'since': old.isoformat()}).status_code, 410)
+        cursor = encode_cursor(None, (old, None))
+        self.assertEqual(self.client.get('/complaints/', {'since': cursor}).status_code, 410)
+
+    def test_settle_window_holds_back_recent_writes(self):
+        self.make_complaint()
+        with self.settings(SYNC={'SETTLE_SECONDS': 60}):
+            data = self.sync('/complaints/', '0')
+        self.assertEqual(data['results'], [])
+        self.assertEqual(len(self.sync('/complaints/', data['since'])['results']), 1)
+
+    def test_open_bulk_writes_and_running_jobs_hold_cursors_back(self):
+        with hold_horizon():
+            # Stamped now, committed after a client has synced
+            slow = self.make_complaint(title='Slow import')
+            data = self.sync('/complaints/', '0')
+            self.assertEqual(data['results'], [])
+        self.assertFalse(SyncHold.objects.exists())
+        data = self.sync('/complaints/', data['since'])
+        self.assertEqual([row['id'] for row in data['results']], [slow.id])
+
+        # Started before the last sync
+        job = Job.objects.create(name='slow', status='running', locked_at=timezone.now() - timedelta(minutes=1))
+        slow.title = 'Edited by a job'
+        slow.save()
+        since = data['since']
+        data = self.sync('/complaints/', since)
+        self.assertEqual(data['results'], [])
+        # Not moved back behind rows the client already has
+        self.assertEqual(data['since'], since)
+        Job.objects.filter(id=job.id).update(status='done')
+        self.assertEqual(self.sync('/complaints/', data['since'])['results'][0]['title'], 'Edited by a job')
+
+        # A hold left behind by a crash stops counting after MAX_HOLD_SECONDS
+        SyncHold.objects.create(started_at=timezone.now() - timedelta(hours=1))
+        self.make_complaint(title='Later')
+        self.assertEqual(len(self.sync('/complaints/', data['since'])['results']), 2)
+
+    def test_sync_bypasses_list_cache(self):
+        self.make_complaint()
+        self.client.get('/complaints/')
+        data = self.sync('/complaints/', '0')
+        self.assertIn('since', data)
+        self.assertEqual(Tombstone.objects.count(), 0)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CitypulseUsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'citypulse_users'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,8 +1,9 @@
 from rest_framework.permissions import BasePermission
+from .roles import get_user_role
 
 class IsAdminUserRole(BasePermission):
     """
     Custom permission to allow only users with the 'admin' role to access the view.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'profile') and request.user.profile.role == 'admin'
\ No newline at end of file
+        return get_user_role(request.user, request.auth) == 'admin'
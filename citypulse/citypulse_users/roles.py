@@ -0,0 +1,92 @@
+# citypulse_users/roles.py
+"""
+Cached role lookups, so permission checks and admin notifications don't
+query Profile on every request. Roles live in a process-local cache that
+the signals in signals.py update when a profile is saved or deleted here;
+the TTL bounds staleness for changes made by other processes. Access
+tokens also carry the role (see tokens.py), which answers cache misses
+without being cached until the token expires. The admin id set lives in the shared Django
+cache, so every process drops it on the same write.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from citypulse.cache import LocalCache
+from .models import Profile
+
+ROLE_CLAIM = 'role'
+ADMIN_IDS_KEY = 'roles:admin-ids'
+# Cached for users without a profile, since LocalCache returns None on a miss
+NO_ROLE = ''
+
+
+def get_role_cache_settings():
+    defaults = {
+        'ALIAS': 'default',
+        'MAX_SIZE': 10000,
+        'TTL': 300,
+    }
+    defaults.update(getattr(settings, 'ROLE_CACHE', {}))
+    return defaults
+
+
+_config = get_role_cache_settings()
+role_cache = LocalCache(max_size=_config['MAX_SIZE'], ttl=_config['TTL'])
+
+
+def get_role(user_id, token=None):
+    """
+    Role of the user with this id, or None without a profile. Checked in
+    order: this process's cache, the token's role claim, the database.
+    Only database reads are cached: a claim answers this request alone, so
+    an old token can't put back a role changed by another process.
+    """
+    key = str(user_id)
+    role = role_cache.get(key)
+    if role is None and token is not None:
+        role = token.get(ROLE_CLAIM)
+        if role is not None:
+            return role or None
+    if role is None:
+        role = Profile.objects.filter(user_id=user_id).values_list('role', flat=True).first() or NO_ROLE
+        role_cache.set(key, role)
+    return role or None
+
+
+def get_user_role(user, token=None):
+    if not user.is_authenticated:
+        return None
+    return get_role(user.pk, token)
+
+
+def admin_user_ids():
+    """
+    Ids of every admin, cached until a profile changes.
+    """
+    config = get_role_cache_settings()
+    cache = caches[config['ALIAS']]
+    admin_ids = cache.get(ADMIN_IDS_KEY)
+    if admin_ids is None:
+        admin_ids = list(Profile.objects.filter(role='admin').values_list('user_id', flat=True))
+        cache.set(ADMIN_IDS_KEY, admin_ids, config['TTL'])
+    return admin_ids
+
+
+def forget_role(user_id):
+    role_cache.invalidate(str(user_id))
+    caches[get_role_cache_settings()['ALIAS']].delete(ADMIN_IDS_KEY)
+
+
+def profile_changed(user_id, role):
+    """
+    Forget the user's role and the admin set now, and cache the new role
+    once the write commits, so a rolled-back change is never cached.
+    """
+    forget_role(user_id)
+
+    def refresh():
+        forget_role(user_id)
+        role_cache.set(str(user_id), role or NO_ROLE)
+
+    transaction.on_commit(refresh)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from citypulse.serializers import SparseFieldsetMixin
 from django.contrib.auth.models import User
 from .models import Profile
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'password']
@@ -12,10 +13,28 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['id', 'user', 'role', 'phone', 'address']
         extra_kwargs = {
             'user': {'required': False}
-        }
\ No newline at end of file
+        }
+
+class UserListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Flat, read-only user row for list endpoints. Expects a queryset with
+    select_related('profile', 'worker') so each row costs no extra queries.
+    """
+    role = serializers.CharField(source='profile.role', read_only=True, default=None)
+    phone = serializers.CharField(source='profile.phone', read_only=True, default=None)
+    address = serializers.CharField(source='profile.address', read_only=True, default=None)
+    worker_id = serializers.IntegerField(source='worker.id', read_only=True, default=None)
+    specialization = serializers.CharField(source='worker.specialization', read_only=True, default=None)
+
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'role', 'phone', 'address', 'worker_id', 'specialization',
+        ]
\ No newline at end of file
@@ -0,0 +1,33 @@
+# citypulse_users/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from citypulse.cache import invalidate_scopes
+from .models import Profile
+from .roles import forget_role, profile_changed
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def expire_user_responses(sender, **kwargs):
+    invalidate_scopes('users')
+
+
+@receiver(post_save, sender=Profile)
+def refresh_cached_role(sender, instance, **kwargs):
+    profile_changed(instance.user_id, instance.role)
+
+
+@receiver(post_delete, sender=Profile)
+def forget_cached_role(sender, instance, **kwargs):
+    profile_changed(instance.user_id, None)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_role(sender, instance, created=True, **kwargs):
+    # Only new and deleted users; role changes arrive through Profile
+    if created:
+        forget_role(instance.pk)
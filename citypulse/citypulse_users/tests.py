@@ -1,3 +1,329 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from citypulse.cache import get_response_cache
+from citypulse.middleware import JWTAuthMiddleware, get_cached_user, invalidate_cached_user, user_cache
+from citypulse.testing import LIST_ENDPOINT_QUERY_BUDGET, LIST_ENDPOINTS, QueryBudgetMixin, QueryPlanMixin
+from citypulse_complaints.jobs import notify_complaint_created
+from citypulse_complaints.models import Complaint
+from citypulse_notifications.models import Notification
+from citypulse_workers.models import AssignedTask, Worker
+from .models import Profile
+from .permissions import IsAdminUserRole
+from .roles import admin_user_ids, role_cache
+from .tokens import RoleRefreshToken
+
+
+def seed_city(count):
+    for index in range(count):
+        role = ['citizen', 'admin', 'worker'][index % 3]
+        user = User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com')
+        Profile.objects.create(user=user, role=role, phone='555-0100')
+        complaint = Complaint.objects.create(
+            user=user, title=f'Complaint {index}', description='...',
+            location_lat='17.385000', location_lng='78.486700',
+            category='road', severity='medium',
+        )
+        Notification.objects.create(user=user, message='Submitted', complaint=complaint)
+        if role == 'worker':
+            worker = Worker.objects.create(user=user, name=user.username, phone='555-0100', specialization='road')
+            AssignedTask.objects.create(worker=worker, complaint=complaint)
+
+
+class ListAllUsersAPIViewTests(TestCase):
+    def setUp(self):
+        seed_city(6)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(username='user1'))
+
+    def test_flat_rows_include_profile_and_worker(self):
+        response = self.client.get('/list-all-users/')
+        self.assertEqual(response.status_code, 200)
+        rows = {row['username']: row for row in response.data['results']}
+        self.assertEqual(rows['user0']['role'], 'citizen')
+        self.assertIsNone(rows['user0']['worker_id'])
+        self.assertEqual(rows['user2']['role'], 'worker')
+        self.assertEqual(rows['user2']['specialization'], 'road')
+
+    def test_users_without_profile(self):
+        User.objects.create_user(username='orphan')
+        response = self.client.get('/list-all-users/?page_size=200')
+        row = next(row for row in response.data['results'] if row['username'] == 'orphan')
+        self.assertIsNone(row['role'])
+
+
+class ListEndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every list endpoint must serve a full page in a constant number of
+    queries; an N+1 regression shows up here as a budget failure.
+    """
+
+    def setUp(self):
+        seed_city(30)
+        self.client = APIClient()
+        # Authenticate as a user that owns rows in the per-user endpoints
+        self.client.force_authenticate(User.objects.get(username='user2'))
+
+    def test_list_endpoints_stay_within_query_budget(self):
+        for url in LIST_ENDPOINTS:
+            with self.subTest(url=url):
+                with self.assertQueryBudget(LIST_ENDPOINT_QUERY_BUDGET, label=url):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """
+    EXPLAINs the SQL each hot endpoint actually runs (first page and a
+    cursor page) so a dropped or unusable index fails the build.
+    """
+
+    def setUp(self):
+        seed_city(12)
+        self.user = User.objects.get(username='user2')
+        self.worker = Worker.objects.get(user=self.user)
+        # A second row of everything per user, so the per-user lists have a page 2
+        complaint = Complaint.objects.create(
+            user=self.user, title='Another', description='...',
+            location_lat='17.385000', location_lng='78.486700',
+            category='road', severity='low',
+        )
+        Notification.objects.create(user=self.user, message='Submitted', complaint=complaint)
+        self.complaint = complaint
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_hot_endpoints_use_indexes(self):
+        endpoints = LIST_ENDPOINTS + [
+            '/notifications/unread/',
+            '/notifications/unread/count/',
+            '/notifications/time/7/',
+            f'/tasks/worker/{self.worker.id}/',
+            f'/tasks/assigned/?worker_id={self.worker.id}',
+            f'/complaints/{self.complaint.id}/status/',
+            '/complaints/?status=pending',
+            '/complaints/?category=road',
+            '/complaints/?ordering=created_at',
+            f'/complaints/?worker={self.worker.id}',
+            f'/tasks/?worker={self.worker.id}',
+            '/tasks/?ordering=assigned_at',
+            '/notifications/user/?is_read=false',
+        ]
+        for url in endpoints:
+            with self.subTest(url=url):
+                with self.assertIndexedQueries(label=url):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_pages_use_indexes(self):
+        for url in LIST_ENDPOINTS:
+            next_url = self.client.get(f'{url}?page_size=1').data['next']
+            with self.subTest(url=url):
+                with self.assertIndexedQueries(label=next_url):
+                    response = self.client.get(next_url)
+                self.assertEqual(response.status_code, 200)
+
+
+class JWTAuthMiddlewareTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username='citizen')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def connect(self, token):
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+
+        middleware = JWTAuthMiddleware(app)
+        scope = {'type': 'websocket', 'query_string': f'token={token}'.encode()}
+        async_to_sync(middleware)(scope, None, None)
+        return scopes[0]['user']
+
+    def test_user_is_cached_between_handshakes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.connect(self.token), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.connect(self.token), self.user)
+
+    def test_save_invalidates_and_deactivation_rejects(self):
+        self.connect(self.token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.connect(self.token).is_anonymous)
+
+    def test_invalid_token_is_anonymous(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.connect('not-a-token').is_anonymous)
+
+    def test_lookup_racing_a_save_is_not_cached(self):
+        async def get_user(user_id):
+            # The row is read, then saved before the lookup returns
+            invalidate_cached_user(User, self.user)
+            return self.user
+
+        with mock.patch('citypulse.middleware.get_user', get_user):
+            self.assertEqual(async_to_sync(get_cached_user)(self.user.id), self.user)
+        self.assertIsNone(user_cache.get(str(self.user.id)))
+
+    def test_cancelled_handshake_does_not_fail_the_ones_sharing_its_lookup(self):
+        async def get_user(user_id):
+            await release.wait()
+            return self.user
+
+        async def handshakes():
+            first = asyncio.ensure_future(get_cached_user(self.user.id))
+            second = asyncio.ensure_future(get_cached_user(self.user.id))
+            await asyncio.sleep(0)
+            first.cancel()
+            release.set()
+            return await second
+
+        release = asyncio.Event()
+        with mock.patch('citypulse.middleware.get_user', get_user):
+            self.assertEqual(async_to_sync(handshakes)(), self.user)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        seed_city(6)
+        self.user = User.objects.get(username='user0')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_hits_skip_the_view_and_etags_revalidate(self):
+        first = self.client.get('/workers/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get('/workers/')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/workers/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get('/workers/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+        # Query strings are part of the key
+        self.assertEqual(len(self.client.get('/workers/?page_size=1').json()['results']), 1)
+
+    def test_writes_invalidate(self):
+        etag = self.client.get('/workers/')['ETag']
+        worker = Worker.objects.first()
+        worker.phone = '555-0199'
+        worker.save()
+        response = self.client.get('/workers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('555-0199', response.content.decode())
+
+        count = len(self.client.get('/complaints/').json()['results'])
+        Complaint.objects.create(
+            user=self.user, title='New', description='...',
+            location_lat='17.385000', location_lng='78.486700', category='road', severity='low',
+        )
+        self.assertEqual(len(self.client.get('/complaints/').json()['results']), count + 1)
+
+        self.assertEqual(self.client.get('/list-all-users/').json()['results'][0]['phone'], '555-0100')
+        Profile.objects.filter(user=self.user).update(phone='555-0142')
+        # Queryset updates skip signals; saving does not
+        Profile.objects.get(user=self.user).save()
+        self.assertEqual(self.client.get('/list-all-users/').json()['results'][0]['phone'], '555-0142')
+
+    def test_per_user_responses(self):
+        self.assertEqual(self.client.get('/me/').json()['username'], 'user0')
+        other = APIClient()
+        other.force_authenticate(User.objects.get(username='user1'))
+        self.assertEqual(other.get('/me/').json()['username'], 'user1')
+
+        self.user.first_name = 'Asha'
+        self.user.save()
+        self.assertEqual(self.client.get('/me/').json()['first_name'], 'Asha')
+
+    def test_roles_are_part_of_the_key(self):
+        self.client.get('/workers/')
+        admin = APIClient()
+        admin.force_authenticate(User.objects.get(username='user1'))
+        # Same view and query string, but cached for a citizen
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(admin.get('/workers/').status_code, 200)
+        self.assertTrue([query for query in queries if 'citypulse_workers_worker' in query['sql']])
+        with self.assertNumQueries(0):
+            admin.get('/workers/')
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='secret')
+        self.profile = Profile.objects.create(user=self.admin, role='admin')
+        self.citizen = User.objects.create_user(username='citizen')
+        Profile.objects.create(user=self.citizen, role='citizen')
+
+    def is_admin(self, user, token=None):
+        request = APIRequestFactory().get('/')
+        request.user, request.auth = user, token
+        return IsAdminUserRole().has_permission(request, None)
+
+    def test_permission_checks_hit_the_cache(self):
+        with self.assertNumQueries(2):
+            self.assertTrue(self.is_admin(self.admin))
+            self.assertFalse(self.is_admin(self.citizen))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.is_admin(self.admin))
+            self.assertFalse(self.is_admin(self.citizen))
+
+    def test_tokens_carry_the_role(self):
+        response = self.client.post('/api/token/', {'username': 'admin', 'password': 'secret'})
+        access = AccessToken(response.json()['access'])
+        self.assertEqual(access['role'], 'admin')
+        role_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.is_admin(self.admin, access))
+
+    def test_claims_are_not_cached(self):
+        access = RoleRefreshToken.for_user(self.admin).access_token
+        role_cache.clear()
+        # Demoted by another process: this process never saw the save
+        Profile.objects.filter(id=self.profile.id).update(role='citizen')
+        self.assertTrue(self.is_admin(self.admin, access))
+        self.assertIsNone(role_cache.get(str(self.admin.id)))
+        self.assertFalse(self.is_admin(self.admin))
+
+    def test_profile_changes_update_the_cache(self):
+        refresh = RoleRefreshToken.for_user(self.admin)
+        self.assertTrue(self.is_admin(self.admin))
+        self.profile.role = 'citizen'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        # The cached role outranks the stale claim
+        with self.assertNumQueries(0):
+            self.assertFalse(self.is_admin(self.admin, refresh.access_token))
+        self.assertEqual(refresh.access_token['role'], 'citizen')
+
+    def test_admin_recipients_are_cached(self):
+        complaint = Complaint.objects.create(
+            user=self.citizen, title='Pothole', description='...',
+            location_lat='17.385000', location_lng='78.486700', category='road', severity='low',
+        )
+        self.assertEqual(admin_user_ids(), [self.admin.id])
+        with CaptureQueriesContext(connection) as queries:
+            notify_complaint_created(complaint.id)
+        self.assertFalse([query for query in queries if 'citypulse_users_profile' in query['sql']])
+        self.assertEqual(Notification.objects.filter(user=self.admin).count(), 1)
 
-# Create your tests here.
+        other = User.objects.create_user(username='admin2')
+        Profile.objects.create(user=other, role='admin')
+        self.assertEqual(sorted(admin_user_ids()), [self.admin.id, other.id])
+        self.profile.delete()
+        self.assertEqual(admin_user_ids(), [other.id])
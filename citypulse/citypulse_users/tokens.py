@@ -0,0 +1,27 @@
+# citypulse_users/tokens.py
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .roles import ROLE_CLAIM, get_role
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the user's current role, looked
+    up when each access token is minted rather than copied from the refresh
+    token, so a role change reaches clients on their next refresh.
+    """
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        access[ROLE_CLAIM] = get_role(self.payload[api_settings.USER_ID_CLAIM])
+        return access
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -5,6 +6,7 @@ from .permissions import IsAdminUserRole
 from .models import Profile
 from .serializers import UserSerializer, ProfileSerializer
 from citypulse_workers.models import Worker
+from citypulse.cache import cache_response
 
 class AddWorkerOrUserAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUserRole]
@@ -17,18 +19,19 @@ class AddWorkerOrUserAPIView(APIView):
         profile_is_valid = profile_serializer.is_valid()
 
         if user_is_valid and profile_is_valid:
-            user = user_serializer.save()
-            user_data = user_serializer.validated_data
-            profile_data = profile_serializer.validated_data
-            Profile.objects.create(user=user, **profile_data)
-            if profile_data.get('role') == 'worker':
-                Worker.objects.create(
-                    user=user,
-                    name=user_data.get('username'),
-                    phone=profile_data.get('phone'),
-                    email=user_data.get('email'),
-                    specialization=profile_data.get('specialization', 'garbage'),
-                )
+            with transaction.atomic():
+                user = user_serializer.save()
+                user_data = user_serializer.validated_data
+                profile_data = profile_serializer.validated_data
+                Profile.objects.create(user=user, **profile_data)
+                if profile_data.get('role') == 'worker':
+                    Worker.objects.create(
+                        user=user,
+                        name=user_data.get('username'),
+                        phone=profile_data.get('phone'),
+                        email=user_data.get('email'),
+                        specialization=profile_data.get('specialization', 'garbage'),
+                    )
             return Response({"message": "User and profile created successfully."}, status=201)
 
         errors = {
@@ -46,28 +49,26 @@ from .serializers import UserSerializer
 class CurrentUserAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response(scopes=('users',), per_user=True)
     def get(self, request):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .permissions import IsAdminUserRole
-from .serializers import UserSerializer, ProfileSerializer
+from .serializers import UserListSerializer
+from citypulse.pagination import KeysetPagination
 
 class ListAllUsersAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response(scopes=('users', 'workers'))
     def get(self, request):
-        users = User.objects.all()
-        user_data = []
-        for user in users:
-            profile = Profile.objects.filter(user=user).first()
-            user_serializer = UserSerializer(user)
-            profile_serializer = ProfileSerializer(profile)
-            user_data.append({
-                "user": user_serializer.data,
-                "profile": profile_serializer.data if profile else None
-            })
-        return Response(user_data, status=200)
\ No newline at end of file
+        users = User.objects.select_related('profile', 'worker')
+        paginator = KeysetPagination(ordering=('id',))
+        page = paginator.paginate_queryset(users, request)
+        serializer = UserListSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
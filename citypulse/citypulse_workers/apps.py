@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CitypulseWorkersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'citypulse_workers'
+
+    def ready(self):
+        from . import signals  # noqa: F401
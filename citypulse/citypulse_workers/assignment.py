@@ -0,0 +1,339 @@
+# citypulse_workers/assignment.py
+"""
+Automatic task assignment. A complaint goes to the active worker whose
+specialization matches its category and whose cost, open tasks plus
+distance / KM_PER_TASK, is lowest. Worker loads come from an in-memory
+index, so a pick costs no queries; the signals in signals.py keep it in
+step with task and worker changes in this process, and it is reloaded every
+INDEX_TTL seconds to pick up changes made elsewhere.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from citypulse.cache import invalidate_scopes
+from citypulse_analytics.rollups import adjust_complaint_rollups, complaint_rollup_key
+from citypulse_complaints.clusters import OPEN_STATUSES, adjust_cells
+from citypulse_complaints.geo import haversine_m
+from citypulse_complaints.models import Complaint
+from citypulse_complaints.status import record_bulk_transition, transition
+from citypulse_sync.sync import hold_horizon
+from .jobs import notify_tasks_assigned
+from .models import AssignedTask, Worker
+
+# Backlog rows read and written per round trip
+BACKLOG_BATCH_SIZE = 1000
+# Resolved and rejected complaints have to be reopened before they get a task
+ASSIGNABLE_STATUSES = OPEN_STATUSES
+
+
+def get_assignment_settings():
+    defaults = {
+        'KM_PER_TASK': 5,
+        'MAX_OPEN_TASKS': None,
+        'INDEX_TTL': 60,
+    }
+    defaults.update(getattr(settings, 'TASK_ASSIGNMENT', {}))
+    return defaults
+
+
+class WorkerLoad:
+    __slots__ = ('id', 'specialization', 'lat', 'lng', 'open_tasks')
+
+    def __init__(self, id, specialization, lat, lng, open_tasks=0):
+        self.id = id
+        self.specialization = specialization
+        self.lat = float(lat) if lat is not None else None
+        self.lng = float(lng) if lng is not None else None
+        self.open_tasks = open_tasks
+
+
+class WorkerLoadIndex:
+    """
+    Active workers grouped by specialization, with their open task counts.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._workers = None
+        self._by_specialization = defaultdict(dict)
+        self._loaded_at = 0.0
+
+    def load(self):
+        rows = (
+            Worker.objects.filter(active=True)
+            .annotate(open_tasks=Count('assignedtask', filter=Q(assignedtask__completed_at__isnull=True)))
+            .values_list('id', 'specialization', 'location_lat', 'location_lng', 'open_tasks')
+        )
+        with self._lock:
+            self._workers = {}
+            self._by_specialization = defaultdict(dict)
+            for row in rows:
+                self._add(WorkerLoad(*row))
+            self._loaded_at = time.monotonic()
+
+    def _add(self, load):
+        self._workers[load.id] = load
+        self._by_specialization[load.specialization][load.id] = load
+
+    def _ensure_loaded(self):
+        if self._workers is None or time.monotonic() - self._loaded_at > get_assignment_settings()['INDEX_TTL']:
+            self.load()
+
+    def invalidate(self):
+        with self._lock:
+            self._workers = None
+
+    def add_open_tasks(self, worker_id, delta):
+        with self._lock:
+            if self._workers is None:
+                return
+            load = self._workers.get(worker_id)
+            if load is not None:
+                load.open_tasks = max(load.open_tasks + delta, 0)
+
+    def update_worker(self, worker):
+        with self._lock:
+            if self._workers is None:
+                return
+            previous = self._workers.pop(worker.id, None)
+            if previous is not None:
+                self._by_specialization[previous.specialization].pop(worker.id, None)
+            if worker.active:
+                open_tasks = previous.open_tasks if previous is not None else (
+                    AssignedTask.objects.filter(worker_id=worker.id, completed_at__isnull=True).count()
+                )
+                self._add(WorkerLoad(
+                    worker.id, worker.specialization, worker.location_lat, worker.location_lng, open_tasks
+                ))
+
+    def remove_worker(self, worker_id):
+        with self._lock:
+            if self._workers is None:
+                return
+            previous = self._workers.pop(worker_id, None)
+            if previous is not None:
+                self._by_specialization[previous.specialization].pop(worker_id, None)
+
+    def best_worker(self, category, lat=None, lng=None, reserve=False):
+        """
+        Id of the cheapest worker for a complaint, or None if nobody with
+        that specialization has capacity. With reserve=True the pick is
+        counted straight away, for callers that create tasks without
+        signals (bulk_create).
+        """
+        config = get_assignment_settings()
+        km_per_task = config['KM_PER_TASK']
+        max_open = config['MAX_OPEN_TASKS']
+        with self._lock:
+            self._ensure_loaded()
+            best, best_cost = None, None
+            for load in self._by_specialization.get(category, {}).values():
+                if max_open is not None and load.open_tasks >= max_open:
+                    continue
+                cost = load.open_tasks
+                # Distance only counts when both ends have a location
+                if None not in (lat, lng, load.lat, load.lng):
+                    cost += haversine_m(lat, lng, load.lat, load.lng) / 1000 / km_per_task
+                if best is None or (cost, load.id) < (best_cost, best.id):
+                    best, best_cost = load, cost
+            if best is None:
+                return None
+            if reserve:
+                best.open_tasks += 1
+            return best.id
+
+
+worker_load_index = WorkerLoadIndex()
+
+
+class NotAssignable(Exception):
+    pass
+
+
+def assignment_error(status, has_open_task):
+    """
+    Why a complaint in this state can't be given a new task, or None.
+    A second open task would be counted twice in the load index.
+    """
+    if status not in ASSIGNABLE_STATUSES:
+        return f"Complaint is {status} and can't be assigned"
+    if has_open_task:
+        return "Complaint already has an open task"
+    return None
+
+
+def open_task_exists():
+    return Exists(AssignedTask.objects.filter(complaint=OuterRef('pk'), completed_at__isnull=True))
+
+
+def assign_complaint(complaint, worker=None):
+    """
+    Create a task for the complaint, picking the worker when none is given,
+    and mark a pending complaint as assigned. Returns the task, or None
+    when no worker is available; raises NotAssignable when the complaint
+    is closed or already has an open task.
+    """
+    with transaction.atomic():
+        # Locked so concurrent requests can't both give it a task
+        status, has_open_task = (
+            Complaint.objects.select_for_update().filter(id=complaint.id)
+            .annotate(has_open_task=open_task_exists()).values_list('status', 'has_open_task').get()
+        )
+        error = assignment_error(status, has_open_task)
+        if error is not None:
+            raise NotAssignable(error)
+        complaint.status = status
+        if worker is None:
+            worker_id = worker_load_index.best_worker(
+                complaint.category, float(complaint.location_lat), float(complaint.location_lng)
+            )
+            if worker_id is None:
+                return None
+            worker = Worker(id=worker_id)
+        task = AssignedTask.objects.create(worker=worker, complaint=complaint)
+        if complaint.status == 'pending':
+            transition(complaint, 'assigned')
+        notify_tasks_assigned.enqueue_on_commit([task.id])
+    return task
+
+
+def _write_assignments(tasks, moved):
+    """
+    Save a batch of unsaved tasks with one INSERT, and move the `moved`
+    complaints, rows of (id, category, severity, geohash, created_at) that
+    were pending, to assigned with one UPDATE, one history INSERT and bulk
+    adjustments of the map clusters and dashboard rollups. Queryset writes
+    skip the per-row signals, hence the explicit adjustments and cache
+    invalidation.
+
+    The complaints were read without locks, so they are locked and read
+    again first: tasks are dropped, and their picks released from the
+    index, for complaints closed or given an open task since, or no longer
+    pending when they were about to be moved. Sync cursors are held back
+    until the batch commits. Returns (saved tasks, dropped complaint ids).
+    """
+    with hold_horizon(), transaction.atomic():
+        # Complaints that can still take the task: not closed, no open task
+        statuses = {
+            complaint_id: status
+            for complaint_id, status, has_open_task in Complaint.objects.select_for_update()
+            .filter(id__in=[task.complaint_id for task in tasks])
+            .annotate(has_open_task=open_task_exists()).values_list('id', 'status', 'has_open_task')
+            if assignment_error(status, has_open_task) is None
+        }
+        moved = [row for row in moved if statuses.get(row[0]) == 'pending']
+        moved_ids = {row[0] for row in moved}
+        kept, dropped = [], []
+        for task in tasks:
+            status = statuses.get(task.complaint_id)
+            if status is None or (status == 'pending' and task.complaint_id not in moved_ids):
+                worker_load_index.add_open_tasks(task.worker_id, -1)
+                dropped.append(task.complaint_id)
+            else:
+                kept.append(task)
+
+        cluster_moves, rollup_moves = defaultdict(int), defaultdict(int)
+        for complaint_id, category, severity, geohash, created_at in moved:
+            cluster_moves[(geohash, category, severity, 'pending')] -= 1
+            cluster_moves[(geohash, category, severity, 'assigned')] += 1
+            rollup_moves[complaint_rollup_key(created_at, category, severity, 'pending')] -= 1
+            rollup_moves[complaint_rollup_key(created_at, category, severity, 'assigned')] += 1
+        complaint_ids = [row[0] for row in moved]
+        tasks = AssignedTask.objects.bulk_create(kept)
+        Complaint.objects.filter(id__in=complaint_ids, status='pending').update(
+            status='assigned', updated_at=timezone.now()
+        )
+        record_bulk_transition(complaint_ids, 'assigned')
+        adjust_cells(cluster_moves)
+        adjust_complaint_rollups(rollup_moves)
+        invalidate_scopes('complaints', 'tasks')
+    return tasks, dropped
+
+
+def assign_backlog(limit=None):
+    """
+    Assign every pending, canonical complaint without an open task, oldest
+    first, in one pass: picks are made against the in-memory index, then
+    each batch is written by _write_assignments(). Workers get one
+    notification for everything they were given. Returns (assigned,
+    unassigned).
+    """
+    backlog = (
+        Complaint.objects.filter(status='pending', duplicate_of__isnull=True)
+        .filter(~open_task_exists())
+        .order_by('created_at', 'id')
+        .values_list('id', 'category', 'severity', 'geohash', 'location_lat', 'location_lng', 'created_at')
+    )
+    if limit is not None:
+        backlog = backlog[:limit]
+
+    task_ids, unassigned = [], 0
+    rows = list(backlog)
+    try:
+        for start in range(0, len(rows), BACKLOG_BATCH_SIZE):
+            tasks, moved = [], []
+            for complaint_id, category, severity, geohash, lat, lng, created_at in rows[start:start + BACKLOG_BATCH_SIZE]:
+                worker_id = worker_load_index.best_worker(category, float(lat), float(lng), reserve=True)
+                if worker_id is None:
+                    unassigned += 1
+                    continue
+                tasks.append(AssignedTask(worker_id=worker_id, complaint_id=complaint_id))
+                moved.append((complaint_id, category, severity, geohash, created_at))
+            written, _ = _write_assignments(tasks, moved)
+            task_ids += [task.id for task in written]
+    except Exception:
+        # The index already counted picks that were never written
+        worker_load_index.invalidate()
+        raise
+    if task_ids:
+        notify_tasks_assigned.enqueue_on_commit(task_ids)
+    return len(task_ids), unassigned
+
+
+def assign_complaints(assignments):
+    """
+    Assign a list of (complaint_id, worker_id or None) pairs in batches of
+    BACKLOG_BATCH_SIZE, picking a worker from the index where none is
+    given. The caller checks that each complaint exists, is listed once and
+    passes assignment_error(), and that the workers are active. Pending
+    complaints become assigned; others just get the task.
+    Returns (tasks, unassigned complaint ids).
+    """
+    task_list, unassigned = [], []
+    try:
+        for start in range(0, len(assignments), BACKLOG_BATCH_SIZE):
+            batch = assignments[start:start + BACKLOG_BATCH_SIZE]
+            complaints = {
+                row[0]: row
+                for row in Complaint.objects.filter(id__in=[complaint_id for complaint_id, _ in batch]).values_list(
+                    'id', 'category', 'severity', 'geohash', 'location_lat', 'location_lng', 'created_at', 'status'
+                )
+            }
+            tasks, moved = [], []
+            for complaint_id, worker_id in batch:
+                _, category, severity, geohash, lat, lng, created_at, status = complaints[complaint_id]
+                if worker_id is None:
+                    worker_id = worker_load_index.best_worker(category, float(lat), float(lng), reserve=True)
+                    if worker_id is None:
+                        unassigned.append(complaint_id)
+                        continue
+                else:
+                    worker_load_index.add_open_tasks(worker_id, 1)
+                tasks.append(AssignedTask(worker_id=worker_id, complaint_id=complaint_id))
+                if status == 'pending':
+                    moved.append((complaint_id, category, severity, geohash, created_at))
+            written, dropped = _write_assignments(tasks, moved)
+            task_list += written
+            unassigned += dropped
+    except Exception:
+        worker_load_index.invalidate()
+        raise
+    if task_list:
+        notify_tasks_assigned.enqueue_on_commit([task.id for task in task_list])
+    return task_list, unassigned
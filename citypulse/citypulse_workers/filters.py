@@ -0,0 +1,20 @@
+# citypulse_workers/filters.py
+from citypulse.filters import DateFilter, FilterSet, ListFilter, NullFilter
+from citypulse_complaints.models import ComplaintStatus
+
+
+class TaskFilter(FilterSet):
+    filters = {
+        'worker': ListFilter('worker_id', parse=int),
+        'complaint': ListFilter('complaint_id', parse=int),
+        'completed': NullFilter('completed_at'),
+        'complaint_status': ListFilter(
+            'complaint__status', choices={value for value, _ in ComplaintStatus.STATUS_CHOICES}
+        ),
+        'from': DateFilter('assigned_at'),
+        'to': DateFilter('assigned_at', after=False),
+    }
+    orderings = {
+        '-assigned_at': ('-assigned_at', '-id'),
+        'assigned_at': ('assigned_at', 'id'),
+    }
@@ -0,0 +1,31 @@
+# citypulse_workers/jobs.py
+from collections import defaultdict
+
+from citypulse_jobs.queue import job
+from citypulse_notifications.models import Notification
+from citypulse_notifications.utils import send_notifications
+from .models import AssignedTask
+
+
+@job
+def notify_tasks_assigned(task_ids):
+    """
+    Tell workers about new tasks with one notification each, however many
+    of the tasks are theirs.
+    """
+    by_user = defaultdict(list)
+    rows = AssignedTask.objects.filter(id__in=task_ids).values_list('worker__user_id', 'complaint_id', 'complaint__title')
+    for user_id, complaint_id, title in rows:
+        by_user[user_id].append((complaint_id, title))
+
+    notifications = []
+    for user_id, tasks in by_user.items():
+        if len(tasks) == 1:
+            complaint_id, title = tasks[0]
+            notifications.append(Notification(
+                user_id=user_id, complaint_id=complaint_id, message=f"You have been assigned '{title}'."
+            ))
+        else:
+            notifications.append(Notification(user_id=user_id, message=f"You have been assigned {len(tasks)} new tasks."))
+    if notifications:
+        send_notifications(notifications)
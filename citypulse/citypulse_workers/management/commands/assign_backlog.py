@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from citypulse_workers.assignment import assign_backlog
+
+
+class Command(BaseCommand):
+    help = "Assign every pending complaint without an open task to the best available worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Assign at most this many complaints.")
+
+    def handle(self, *args, **options):
+        assigned, unassigned = assign_backlog(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Assigned {assigned} complaint(s); {unassigned} left without a worker."))
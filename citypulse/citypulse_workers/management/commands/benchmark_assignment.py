@@ -0,0 +1,81 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from citypulse_complaints.clusters import rebuild_cells
+from citypulse_complaints.models import Complaint, ComplaintCell
+from citypulse_workers.assignment import assign_backlog, worker_load_index
+from citypulse_workers.models import AssignedTask, Worker
+
+CENTRE_LAT, CENTRE_LNG = 17.385, 78.4867
+SPREAD = 0.35
+CATEGORIES = ['garbage', 'road', 'water', 'lights']
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark batch assignment of a pending backlog in a throwaway test "
+        "database (the project database is not touched)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=200)
+        parser.add_argument('--complaints', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(random.Random(options['seed']), options['workers'], options['complaints'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def point(self, rng):
+        return (
+            round(CENTRE_LAT + rng.uniform(-SPREAD, SPREAD), 6),
+            round(CENTRE_LNG + rng.uniform(-SPREAD, SPREAD), 6),
+        )
+
+    def run(self, rng, worker_count, complaint_count):
+        users = User.objects.bulk_create([User(username=f'worker{index}') for index in range(worker_count)])
+        workers = []
+        for index, user in enumerate(users):
+            lat, lng = self.point(rng)
+            workers.append(Worker(
+                user=user, name=user.username, phone='555-0100', specialization=CATEGORIES[index % 4],
+                location_lat=lat, location_lng=lng,
+            ))
+        Worker.objects.bulk_create(workers)
+
+        citizen = User.objects.create_user(username='citizen')
+        complaints = []
+        for index in range(complaint_count):
+            lat, lng = self.point(rng)
+            complaint = Complaint(
+                user=citizen, title=f'Complaint {index}', description='...',
+                location_lat=lat, location_lng=lng,
+                category=rng.choice(CATEGORIES), severity=rng.choice(['low', 'medium', 'high']),
+            )
+            complaint.set_geohash()
+            complaints.append(complaint)
+        Complaint.objects.bulk_create(complaints, batch_size=1000)
+        rebuild_cells(Complaint, ComplaintCell)
+        worker_load_index.invalidate()
+
+        started = time.perf_counter()
+        assigned, unassigned = assign_backlog()
+        elapsed = time.perf_counter() - started
+
+        loads = sorted(
+            AssignedTask.objects.values('worker').annotate(count=Count('id')).values_list('count', flat=True)
+        )
+        self.stdout.write(
+            f"Assigned {assigned} of {complaint_count} complaints to {worker_count} workers in {elapsed:.2f}s "
+            f"({assigned / elapsed:.0f} complaints/s); {unassigned} unassigned; "
+            f"tasks per worker min {loads[0]}, max {loads[-1]}"
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0010_hot_filter_indexes'),
+        ('citypulse_workers', '0002_worker_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignedtask',
+            index=models.Index(fields=['-assigned_at', '-id'], name='task_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignedtask',
+            index=models.Index(fields=['worker', 'completed_at'], name='task_worker_completed_idx'),
+        ),
+    ]
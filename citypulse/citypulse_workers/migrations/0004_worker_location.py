@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_workers', '0003_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='worker',
+            name='location_lat',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='location_lng',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+    ]
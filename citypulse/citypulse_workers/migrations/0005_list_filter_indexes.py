@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_complaints', '0016_list_filter_indexes'),
+        ('citypulse_workers', '0004_worker_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignedtask',
+            index=models.Index(fields=['worker', '-assigned_at', '-id'], name='task_worker_assigned_idx'),
+        ),
+    ]
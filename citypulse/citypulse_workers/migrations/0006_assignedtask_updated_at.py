@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    AssignedTask = apps.get_model('citypulse_workers', 'AssignedTask')
+    AssignedTask.objects.update(updated_at=Coalesce('completed_at', 'assigned_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('citypulse_workers', '0005_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignedtask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='assignedtask',
+            index=models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ),
+    ]
@@ -15,6 +15,9 @@ class Worker(models.Model):
     email = models.EmailField(null=True, blank=True)
     specialization = models.CharField(max_length=50, choices=SPECIALIZATION_CHOICES)
     active = models.BooleanField(default=True)
+    # Depot or home base, used to prefer nearby workers when assigning
+    location_lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    location_lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -27,6 +30,20 @@ class AssignedTask(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE)
     assigned_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by every write; drives ?since= sync
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order for /tasks/
+            models.Index(fields=['-assigned_at', '-id'], name='task_assigned_idx'),
+            # A worker's tasks, and their open ones (completed_at IS NULL)
+            models.Index(fields=['worker', 'completed_at'], name='task_worker_completed_idx'),
+            # /tasks/?worker= in list order
+            models.Index(fields=['worker', '-assigned_at', '-id'], name='task_worker_assigned_idx'),
+            # ?since= sync
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.worker.name} -> {self.complaint.title}"
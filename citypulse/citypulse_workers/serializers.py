@@ -1,14 +1,15 @@
 from rest_framework import serializers
+from citypulse.serializers import SparseFieldsetMixin
 from .models import Worker, AssignedTask
 
-class WorkerSerializer(serializers.ModelSerializer):
+class WorkerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Worker
-        fields = ['id', 'name', 'phone', 'email', 'specialization', 'active']
+        fields = ['id', 'name', 'phone', 'email', 'specialization', 'active', 'location_lat', 'location_lng']
 
-class AssignedTaskSerializer(serializers.ModelSerializer):
+class AssignedTaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     worker = WorkerSerializer(read_only=True)
 
     class Meta:
         model = AssignedTask
-        fields = ['id', 'worker', 'complaint', 'assigned_at', 'completed_at']
\ No newline at end of file
+        fields = ['id', 'worker', 'complaint', 'assigned_at', 'completed_at', 'updated_at']
\ No newline at end of file
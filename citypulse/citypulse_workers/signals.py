@@ -0,0 +1,60 @@
+# citypulse_workers/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from citypulse.cache import invalidate_scopes
+from .assignment import worker_load_index
+from .models import AssignedTask, Worker
+
+# Index updates wait for the commit, so a rolled back assignment never counts
+
+
+@receiver(pre_save, sender=AssignedTask)
+def remember_task_state(sender, instance, **kwargs):
+    instance._was_open = None
+    instance._previous_task = None
+    if not instance._state.adding:
+        # (worker_id, assigned_at, completed_at) as stored
+        instance._previous_task = (
+            AssignedTask.objects.filter(pk=instance.pk)
+            .values_list('worker_id', 'assigned_at', 'completed_at')
+            .first()
+        )
+        instance._was_open = instance._previous_task is not None and instance._previous_task[2] is None
+
+
+@receiver(post_save, sender=AssignedTask)
+def count_task_load(sender, instance, created, **kwargs):
+    is_open = instance.completed_at is None
+    was_open = False if created else instance._was_open
+    if is_open != was_open:
+        delta = 1 if is_open else -1
+        transaction.on_commit(lambda: worker_load_index.add_open_tasks(instance.worker_id, delta))
+
+
+@receiver(post_delete, sender=AssignedTask)
+def release_task_load(sender, instance, **kwargs):
+    if instance.completed_at is None:
+        transaction.on_commit(lambda: worker_load_index.add_open_tasks(instance.worker_id, -1))
+
+
+@receiver(post_save, sender=Worker)
+def refresh_worker_load(sender, instance, **kwargs):
+    transaction.on_commit(lambda: worker_load_index.update_worker(instance))
+
+
+@receiver(post_delete, sender=Worker)
+def drop_worker_load(sender, instance, **kwargs):
+    transaction.on_commit(lambda: worker_load_index.remove_worker(instance.id))
+
+
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+def expire_worker_responses(sender, **kwargs):
+    invalidate_scopes('workers')
+
+
+@receiver(post_save, sender=AssignedTask)
+@receiver(post_delete, sender=AssignedTask)
+def expire_task_responses(sender, **kwargs):
+    invalidate_scopes('tasks')
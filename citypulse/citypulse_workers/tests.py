@@ -1,3 +1,342 @@
+import json
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from citypulse.cache import get_response_cache
+from citypulse_complaints.clusters import rebuild_cells
+from citypulse_complaints.status import transition
+from citypulse_complaints.models import Complaint, ComplaintCell
+from citypulse_users.models import Profile
+from citypulse_jobs.worker import JobWorker
+from citypulse_notifications.models import Notification
+from .assignment import _write_assignments, assign_backlog, worker_load_index
+from .models import AssignedTask, Worker
+
+
+class AssignmentTestMixin:
+    def setUp(self):
+        super().setUp()
+        worker_load_index.invalidate()
+        self.addCleanup(worker_load_index.invalidate)
+        self.citizen = User.objects.create_user(username='citizen')
+        self.admin = User.objects.create_user(username='admin')
+        Profile.objects.create(user=self.admin, role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def make_worker(self, name, specialization='road', lat=None, lng=None, active=True):
+        user = User.objects.create_user(username=name)
+        return Worker.objects.create(
+            user=user, name=name, phone='555-0100', specialization=specialization,
+            location_lat=lat, location_lng=lng, active=active,
+        )
+
+    def make_complaint(self, category='road', lat='17.385000', lng='78.486700'):
+        return Complaint.objects.create(
+            user=self.citizen, title='Complaint', description='...',
+            location_lat=lat, location_lng=lng, category=category, severity='medium',
+        )
+
+
+class TaskAssignmentViewTests(AssignmentTestMixin, TestCase):
+    def test_assigns_given_worker(self):
+        worker = self.make_worker('alice')
+        complaint = self.make_complaint()
+        response = self.client.post('/task/assign/', {'complaint_id': complaint.id, 'worker_id': worker.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['worker']['id'], worker.id)
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.status, 'assigned')
+        self.assertEqual(self.client.get('/task/assign/').status_code, 405)
+
+    def test_picks_least_loaded_nearby_specialist(self):
+        self.make_worker('plumber', specialization='water', lat='17.385000', lng='78.486700')
+        near = self.make_worker('near', lat='17.386000', lng='78.486700')
+        far = self.make_worker('far', lat='17.585000', lng='78.486700')
+        # Another worker in the same spot, but inactive
+        self.make_worker('idle', lat='17.385000', lng='78.486700', active=False)
+
+        picks = []
+        for _ in range(4):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/task/assign/', {'complaint_id': self.make_complaint().id}, format='json')
+            self.assertEqual(response.status_code, 201)
+            picks.append(response.data['worker']['name'])
+        # ~22km away costs about four open tasks (KM_PER_TASK = 5)
+        self.assertEqual(picks, ['near', 'near', 'near', 'near'])
+
+        # Completing tasks is seen by the index through the signals
+        with self.captureOnCommitCallbacks(execute=True):
+            for task in AssignedTask.objects.filter(worker=near)[:3]:
+                task.completed_at = task.assigned_at
+                task.save()
+        self.assertEqual(worker_load_index.best_worker('road', 17.385, 78.4867), near.id)
+        self.assertEqual(worker_load_index.best_worker('lights'), None)
+
+    def test_no_worker_available(self):
+        complaint = self.make_complaint(category='lights')
+        response = self.client.post('/task/assign/', {'complaint_id': complaint.id}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.post('/task/assign/', {}, format='json').status_code, 400)
+
+    def test_rejects_non_integer_ids(self):
+        complaint = self.make_complaint()
+        for data in [{'complaint_id': 'abc'}, {'complaint_id': complaint.id, 'worker_id': 'abc'}]:
+            response = self.client.post('/task/assign/', data, format='json')
+            self.assertEqual(response.status_code, 400, data)
+        self.assertFalse(AssignedTask.objects.exists())
+
+    def test_rejects_complaints_with_open_task_or_closed(self):
+        worker = self.make_worker('alice')
+        complaint = self.make_complaint()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/task/assign/', {'complaint_id': complaint.id}, format='json').status_code, 201)
+            response = self.client.post('/task/assign/', {'complaint_id': complaint.id, 'worker_id': worker.id}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {"error": "Complaint already has an open task"})
+        self.assertEqual(AssignedTask.objects.filter(complaint=complaint).count(), 1)
+        self.assertEqual(worker_load_index._workers[worker.id].open_tasks, 1)
+
+        resolved = self.make_complaint()
+        Complaint.objects.filter(id=resolved.id).update(status='resolved')
+        response = self.client.post('/task/assign/', {'complaint_id': resolved.id}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data, {"error": "Complaint is resolved and can't be assigned"})
+
+    def test_closing_a_complaint_closes_its_task(self):
+        worker = self.make_worker('alice')
+        complaint = self.make_complaint()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/task/assign/', {'complaint_id': complaint.id}, format='json')
+        self.assertEqual(worker_load_index._workers[worker.id].open_tasks, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/complaints/{complaint.id}/status/', {'status': 'resolved'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(AssignedTask.objects.get(complaint=complaint).completed_at)
+        self.assertEqual(worker_load_index._workers[worker.id].open_tasks, 0)
+
+        # Reopened, then assigned again
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(complaint, 'pending')
+            response = self.client.post('/task/assign/', {'complaint_id': complaint.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(AssignedTask.objects.filter(complaint=complaint, completed_at__isnull=True).count(), 1)
+        self.assertEqual(worker_load_index._workers[worker.id].open_tasks, 1)
+
+        # Unassigned: back in the backlog
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(complaint, 'pending')
+        self.assertEqual(worker_load_index._workers[worker.id].open_tasks, 0)
+        self.assertEqual(assign_backlog(), (1, 0))
+
+    def test_only_admins_assign(self):
+        worker = self.make_worker('alice')
+        complaint = self.make_complaint()
+        self.client.force_authenticate(self.citizen)
+        for url, data in [
+            ('/task/assign/', {'complaint_id': complaint.id, 'worker_id': worker.id}),
+            ('/tasks/assign-backlog/', {}),
+            ('/tasks/bulk-assign/', [{'complaint_id': complaint.id}]),
+        ]:
+            self.assertEqual(self.client.post(url, data, format='json').status_code, 403, url)
+        self.assertFalse(AssignedTask.objects.exists())
+
+
+class AssignBacklogTests(AssignmentTestMixin, TestCase):
+    def test_backlog_is_spread_over_workers_in_one_pass(self):
+        workers = [self.make_worker(f'road{index}') for index in range(3)]
+        self.make_worker('sparky', specialization='lights')
+        for _ in range(9):
+            self.make_complaint()
+        self.make_complaint(category='lights')
+        self.make_complaint(category='water')
+        already_assigned = self.make_complaint()
+        AssignedTask.objects.create(worker=workers[0], complaint=already_assigned)
+        duplicate = self.make_complaint()
+        duplicate.duplicate_of = already_assigned
+        duplicate.save()
+
+        # Admin role, backlog, worker loads, then one batch: status re-read
+        # under lock, task INSERT, status UPDATE, history INSERT, and for
+        # both the cells and the dashboard rollups an INSERT + SELECT + one
+        # UPDATE per net delta, in a savepoint between adding and removing
+        # a sync hold
+        with self.assertNumQueries(23):
+            response = self.client.post('/tasks/assign-backlog/', {}, format='json')
+        self.assertEqual(response.data, {'assigned': 10, 'unassigned': 1})
+
+        loads = {worker.name: AssignedTask.objects.filter(worker=worker).count() for worker in Worker.objects.all()}
+        self.assertEqual(loads, {'road0': 4, 'road1': 3, 'road2': 3, 'sparky': 1})
+        self.assertEqual(Complaint.objects.filter(status='pending').count(), 3)
+
+        # Clusters moved in bulk match a recount
+        counts = sorted(ComplaintCell.objects.filter(count__gt=0).values_list('geohash', 'status', 'count'))
+        rebuild_cells(Complaint, ComplaintCell)
+        self.assertEqual(sorted(ComplaintCell.objects.values_list('geohash', 'status', 'count')), counts)
+
+        self.assertEqual(assign_backlog(), (0, 1))
+
+    def test_rejects_limits_below_one(self):
+        self.make_worker('alice')
+        self.make_complaint()
+        for limit in [0, -1, 'abc']:
+            response = self.client.post('/tasks/assign-backlog/', {'limit': limit}, format='json')
+            self.assertEqual(response.status_code, 400, limit)
+        self.assertFalse(AssignedTask.objects.exists())
+
+    def test_complaints_closed_after_the_backlog_read_are_left_alone(self):
+        worker = self.make_worker('alice')
+        complaint = self.make_complaint()
+        moved = [(complaint.id, 'road', 'medium', complaint.geohash, complaint.created_at)]
+        worker_id = worker_load_index.best_worker('road', reserve=True)
+        # Rejected by someone else between the read and the write
+        transition(complaint, 'rejected')
+        cells = sorted(ComplaintCell.objects.values_list('geohash', 'status', 'count'))
+
+        tasks, dropped = _write_assignments([AssignedTask(worker_id=worker_id, complaint_id=complaint.id)], moved)
+        self.assertEqual((tasks, dropped), ([], [complaint.id]))
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.status, 'rejected')
+        self.assertFalse(AssignedTask.objects.exists())
+        self.assertEqual(sorted(ComplaintCell.objects.values_list('geohash', 'status', 'count')), cells)
+        self.assertEqual(worker_load_index._workers[worker.id].open_tasks, 0)
+
+    def test_complaints_given_a_task_after_the_backlog_read_are_left_alone(self):
+        alice, bob = self.make_worker('alice'), self.make_worker('bob')
+        complaint = self.make_complaint()
+        moved = [(complaint.id, 'road', 'medium', complaint.geohash, complaint.created_at)]
+        worker_id = worker_load_index.best_worker('road', reserve=True)
+        # Assigned by a concurrent run between the read and the write
+        with self.captureOnCommitCallbacks(execute=True):
+            other = AssignedTask.objects.create(worker_id=alice.id if worker_id == bob.id else bob.id, complaint=complaint)
+
+        tasks, dropped = _write_assignments([AssignedTask(worker_id=worker_id, complaint_id=complaint.id)], moved)
+        self.assertEqual((tasks, dropped), ([], [complaint.id]))
+        self.assertEqual(list(AssignedTask.objects.filter(complaint=complaint)), [other])
+        self.assertEqual(worker_load_index._workers[worker_id].open_tasks, 0)
+        self.assertEqual(worker_load_index._workers[other.worker_id].open_tasks, 1)
+
+
+class TaskListFilterTests(AssignmentTestMixin, TestCase):
+    def test_filters(self):
+        first, second = self.make_worker('first'), self.make_worker('second')
+        done = AssignedTask.objects.create(worker=first, complaint=self.make_complaint())
+        done.completed_at = done.assigned_at
+        done.save()
+        open_task = AssignedTask.objects.create(worker=first, complaint=self.make_complaint())
+        other = AssignedTask.objects.create(worker=second, complaint=self.make_complaint())
+
+        def ids(query):
+            response = self.client.get(f'/tasks/?{query}')
+            self.assertEqual(response.status_code, 200, response.data)
+            return [row['id'] for row in response.data['results']]
+
+        self.assertEqual(ids(f'worker={first.id}'), [open_task.id, done.id])
+        self.assertEqual(ids(f'worker={first.id}&completed=false'), [open_task.id])
+        self.assertEqual(ids('completed=true'), [done.id])
+        self.assertEqual(ids(f'worker={first.id},{second.id}&ordering=assigned_at'), [done.id, open_task.id, other.id])
+        self.assertEqual(ids(f'complaint={other.complaint_id}'), [other.id])
+        self.assertEqual(self.client.get('/tasks/?completed=maybe').status_code, 400)
+
+    def test_complaint_status_filter_follows_complaint_changes(self):
+        get_response_cache().clear()
+        task = AssignedTask.objects.create(worker=self.make_worker('alice'), complaint=self.make_complaint())
+        transition(task.complaint, 'assigned')
+
+        def ids():
+            return [row['id'] for row in self.client.get('/tasks/?complaint_status=assigned').json()['results']]
+
+        self.assertEqual(ids(), [task.id])
+        transition(task.complaint, 'in_progress')
+        self.assertEqual(ids(), [])
+
+
+class TaskExportTests(AssignmentTestMixin, TestCase):
+    def test_ndjson_export(self):
+        worker = self.make_worker('alice')
+        task = AssignedTask.objects.create(worker=worker, complaint=self.make_complaint())
+        AssignedTask.objects.create(worker=worker, complaint=self.make_complaint())
+        AssignedTask.objects.filter(id=task.id).update(assigned_at='2026-01-05T08:00:00Z')
+
+        response = self.client.get('/tasks/export/?output=ndjson&to=2026-01-31')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines, [{
+            'id': task.id, 'worker_id': worker.id, 'worker__name': 'alice', 'complaint_id': task.complaint_id,
+            'assigned_at': '2026-01-05T08:00:00Z', 'completed_at': None,
+        }])
+
+
+class BulkTaskAssignmentTests(AssignmentTestMixin, TestCase):
+    def test_assigns_and_notifies_each_worker_once(self):
+        road = self.make_worker('road0', lat='17.385000', lng='78.486700')
+        lights = self.make_worker('sparky', specialization='lights')
+        complaints = [self.make_complaint() for _ in range(3)]
+        in_progress = self.make_complaint()
+        Complaint.objects.filter(id=in_progress.id).update(status='in_progress')
+        no_worker = self.make_complaint(category='water')
+
+        items = [{'complaint_id': complaint.id} for complaint in complaints]
+        items += [
+            {'complaint_id': in_progress.id, 'worker_id': lights.id},
+            {'complaint_id': no_worker.id},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/tasks/bulk-assign/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(task['complaint_id'], task['worker_id']) for task in response.data['assigned']],
+            [(complaint.id, road.id) for complaint in complaints] + [(in_progress.id, lights.id)],
+        )
+        self.assertEqual(response.data['unassigned'], [no_worker.id])
+        self.assertEqual(
+            dict(Complaint.objects.values_list('id', 'status')),
+            {**{complaint.id: 'assigned' for complaint in complaints}, in_progress.id: 'in_progress', no_worker.id: 'pending'},
+        )
+        self.assertEqual(ComplaintCell.objects.get(precision=1, category='road', status='assigned').count, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobWorker().run_once()
+        self.assertEqual(
+            list(Notification.objects.filter(user=road.user).values_list('message', flat=True)),
+            ["You have been assigned 3 new tasks."],
+        )
+        self.assertEqual(Notification.objects.get(user=lights.user).complaint_id, in_progress.id)
+
+    def test_bad_items_assign_nothing(self):
+        idle = self.make_worker('idle', active=False)
+        complaint = self.make_complaint()
+        items = [
+            {'complaint_id': complaint.id},
+            {'complaint_id': complaint.id + 100},
+            {'complaint_id': complaint.id, 'worker_id': idle.id},
+            {'worker_id': idle.id},
+        ]
+        response = self.client.post('/tasks/bulk-assign/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3])
+        response = self.client.post('/tasks/bulk-assign/', items[:3], format='json')
+        self.assertEqual(
+            response.data['errors'],
+            [{'index': 1, 'error': 'Complaint not found'}, {'index': 2, 'error': 'Complaint is listed more than once'}],
+        )
+        response = self.client.post('/tasks/bulk-assign/', [items[0], {'complaint_id': self.make_complaint().id, 'worker_id': idle.id}], format='json')
+        self.assertEqual(response.data['errors'], [{'index': 1, 'error': 'Worker not found or inactive'}])
+        self.assertFalse(AssignedTask.objects.exists())
 
-# Create your tests here.
+    def test_rejects_complaints_with_open_task_or_closed(self):
+        worker = self.make_worker('alice')
+        assigned, resolved, pending = self.make_complaint(), self.make_complaint(), self.make_complaint()
+        AssignedTask.objects.create(worker=worker, complaint=assigned)
+        Complaint.objects.filter(id=resolved.id).update(status='resolved')
+        items = [{'complaint_id': complaint.id} for complaint in (pending, assigned, resolved)]
+        response = self.client.post('/tasks/bulk-assign/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [
+            {'index': 1, 'error': 'Complaint already has an open task'},
+            {'index': 2, 'error': "Complaint is resolved and can't be assigned"},
+        ])
+        self.assertEqual(AssignedTask.objects.count(), 1)
@@ -2,15 +2,21 @@ from django.urls import path
 from .views import (
     AllWorkersAPIView,
     AllTasksAPIView,
+    TaskExportView,
     WorkerAssignedTasksAPIView,
     AssignedTasksByWorkerAPIView,
-    TaskassignmentView
+    TaskassignmentView,
+    AssignBacklogView,
+    BulkTaskAssignmentView
 )
 
 urlpatterns = [
     path('workers/', AllWorkersAPIView.as_view(), name='all-workers'),
     path('tasks/', AllTasksAPIView.as_view(), name='all-tasks'),
+    path('tasks/export/', TaskExportView.as_view(), name='task-export'),
     path('tasks/worker/<int:worker_id>/', WorkerAssignedTasksAPIView.as_view(), name='worker-assigned-tasks'),
     path('tasks/assigned/', AssignedTasksByWorkerAPIView.as_view(), name='assigned-tasks-by-worker'),
     path('task/assign/', TaskassignmentView.as_view(), name='task-assignment'),
+    path('tasks/assign-backlog/', AssignBacklogView.as_view(), name='assign-backlog'),
+    path('tasks/bulk-assign/', BulkTaskAssignmentView.as_view(), name='bulk-task-assignment'),
 ]
\ No newline at end of file
@@ -1,39 +1,188 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser
 from .models import Worker, AssignedTask
 from .serializers import WorkerSerializer, AssignedTaskSerializer
+from citypulse.cache import cache_response
+from citypulse.export import EXPORT_FORMATS, date_range_filter, export_response
+from citypulse.pagination import KeysetPagination
+from citypulse.parsers import NDJSONParser
+from citypulse_users.permissions import IsAdminUserRole
+from citypulse_sync.sync import SINCE_PARAM, sync_response
+from citypulse_complaints.models import Complaint
+from .filters import TaskFilter
+from .assignment import NotAssignable, assign_backlog, assign_complaint, assign_complaints, assignment_error, open_task_exists
+
+BULK_ASSIGN_MAX_ITEMS = 10_000
+TASK_EXPORT_COLUMNS = ('id', 'worker_id', 'worker__name', 'complaint_id', 'assigned_at', 'completed_at')
 
 class TaskassignmentView(APIView):
-    permission_classes = [IsAuthenticated]
+    """
+    Assign a complaint to `worker_id`, or to the best available worker when
+    no worker is given.
+    """
+    permission_classes = [IsAdminUserRole]
 
-    def get(self, request):
-        complaint_id=request.data.get('complaint_id')
-        worker_id=request.data.get('worker_id')
-        if not complaint_id or not worker_id:   
-            return Response({"error": "complaint_id and worker_id are required"}, status=400)
-        
-        
-        task = AssignedTask.objects.create(worker=worker_id,complaint=complaint_id)
-        task.save()
+    def post(self, request):
+        complaint_id = request.data.get('complaint_id')
+        worker_id = request.data.get('worker_id')
+        if not complaint_id:
+            return Response({"error": "complaint_id is required"}, status=400)
+        try:
+            complaint_id = int(complaint_id)
+            worker_id = int(worker_id) if worker_id else None
+        except (TypeError, ValueError):
+            return Response({"error": "complaint_id and worker_id must be integers"}, status=400)
+
+        complaint = Complaint.objects.filter(id=complaint_id).first()
+        if complaint is None:
+            return Response({"error": "Complaint not found"}, status=404)
+        worker = None
+        if worker_id:
+            worker = Worker.objects.filter(id=worker_id, active=True).first()
+            if worker is None:
+                return Response({"error": "Worker not found or inactive"}, status=404)
+
+        try:
+            task = assign_complaint(complaint, worker)
+        except NotAssignable as e:
+            return Response({"error": str(e)}, status=409)
+        if task is None:
+            return Response({"error": f"No active {complaint.category} worker is available"}, status=409)
+        task = AssignedTask.objects.select_related('worker').get(id=task.id)
         serializer = AssignedTaskSerializer(task)
-        return Response(serializer.data)
+        return Response(serializer.data, status=201)
+
+
+class AssignBacklogView(APIView):
+    """
+    Assign every pending complaint without an open task in one pass.
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def post(self, request):
+        limit = request.data.get('limit')
+        try:
+            limit = int(limit) if limit is not None else None
+        except (TypeError, ValueError):
+            return Response({"error": "limit must be an integer"}, status=400)
+        if limit is not None and limit < 1:
+            return Response({"error": "limit must be at least 1"}, status=400)
+        assigned, unassigned = assign_backlog(limit=limit)
+        return Response({"assigned": assigned, "unassigned": unassigned})
+
+class BulkTaskAssignmentView(APIView):
+    """
+    Assign many complaints in one request: a JSON array or NDJSON body of
+    {complaint_id, worker_id?} items. Nothing is assigned unless every item
+    refers to a different, assignable complaint and, when given, an active
+    worker.
+    """
+    permission_classes = [IsAdminUserRole]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "Expected a list of assignments"}, status=400)
+        if len(items) > BULK_ASSIGN_MAX_ITEMS:
+            return Response({"error": f"At most {BULK_ASSIGN_MAX_ITEMS} assignments per request"}, status=400)
+
+        assignments, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                complaint_id = int(item['complaint_id'])
+                worker_id = item.get('worker_id')
+                worker_id = int(worker_id) if worker_id is not None else None
+            except (KeyError, TypeError, ValueError, AttributeError):
+                errors.append({"index": index, "error": "complaint_id is required and ids must be integers"})
+                continue
+            assignments.append((complaint_id, worker_id))
+        if errors:
+            return Response({"errors": errors}, status=400)
+
+        # Two lookups for the whole request rather than two per item
+        complaints = {
+            complaint_id: (status, has_open_task)
+            for complaint_id, status, has_open_task in Complaint.objects.filter(
+                id__in={complaint_id for complaint_id, _ in assignments}
+            ).annotate(has_open_task=open_task_exists()).values_list('id', 'status', 'has_open_task')
+        }
+        worker_ids = set(Worker.objects.filter(
+            id__in={worker_id for _, worker_id in assignments if worker_id is not None}, active=True
+        ).values_list('id', flat=True))
+        seen = set()
+        for index, (complaint_id, worker_id) in enumerate(assignments):
+            if complaint_id not in complaints:
+                error = "Complaint not found"
+            elif complaint_id in seen:
+                error = "Complaint is listed more than once"
+            else:
+                error = assignment_error(*complaints[complaint_id])
+            if error is None and worker_id is not None and worker_id not in worker_ids:
+                error = "Worker not found or inactive"
+            if error is not None:
+                errors.append({"index": index, "error": error})
+            seen.add(complaint_id)
+        if errors:
+            return Response({"errors": errors}, status=400)
+
+        tasks, unassigned = assign_complaints(assignments)
+        return Response({
+            "assigned": [
+                {"task_id": task.id, "complaint_id": task.complaint_id, "worker_id": task.worker_id} for task in tasks
+            ],
+            "unassigned": unassigned,
+        }, status=201)
 
 class AllWorkersAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_response(scopes=('workers',))
     def get(self, request):
         workers = Worker.objects.all()
-        serializer = WorkerSerializer(workers, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination(ordering=('id',))
+        page = paginator.paginate_queryset(workers, request)
+        serializer = WorkerSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
 class AllTasksAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # ?complaint_status= reads complaints, so their writes retire these pages too
+    @cache_response(scopes=('tasks', 'workers', 'complaints'), skip_params=(SINCE_PARAM,))
     def get(self, request):
-        tasks = AssignedTask.objects.all()
-        serializer = AssignedTaskSerializer(tasks, many=True)
-        return Response(serializer.data)
+        if SINCE_PARAM in request.query_params:
+            return sync_response(request, AssignedTask.objects.select_related('worker'), AssignedTaskSerializer)
+        filterset = TaskFilter(request.query_params)
+        try:
+            tasks = filterset.filter_queryset(AssignedTask.objects.select_related('worker'))
+            ordering = filterset.get_ordering()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        paginator = KeysetPagination(ordering=ordering)
+        page = paginator.paginate_queryset(tasks, request)
+        serializer = AssignedTaskSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+class TaskExportView(APIView):
+    """
+    Stream tasks as CSV or NDJSON (`?output=`, default csv), oldest first,
+    optionally limited to `?from=` / `?to=` assignment dates.
+    """
+    permission_classes = [IsAdminUserRole]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({"error": f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+        try:
+            filters = date_range_filter(request.query_params, 'assigned_at')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        tasks = AssignedTask.objects.filter(filters).order_by('assigned_at', 'id')
+        return export_response(tasks, TASK_EXPORT_COLUMNS, output, 'tasks')
 
 class WorkerAssignedTasksAPIView(APIView):
     permission_classes = [IsAuthenticated]